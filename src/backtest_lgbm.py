@@ -0,0 +1,24 @@
+from src.data import DataLoader
+from src.pipelines import PipelineBuilder
+from src.training.backtest import WalkForwardBacktest
+from src.utils.logging import setup_logger
+from src.config import CONFIG
+import mlflow
+
+logger = setup_logger(CONFIG.logger_name, CONFIG.get_path('train_log'))
+
+def main():
+    mlflow.set_experiment("store-sales")
+    with mlflow.start_run(run_name="LGBM_Backtest"):
+        logger.info("📦 Cargando datos...")
+        df = DataLoader().load_train_parquet()
+        backtest = WalkForwardBacktest.from_config(PipelineBuilder().build_preprocessor_pipeline())
+        mlflow.log_params({f"backtest_{k}": v for k, v in CONFIG.get_section("backtest").items()})
+        report = backtest.run(df)
+        for row in report.itertuples():
+            mlflow.log_metric("RMSLE_fold", row.rmsle, step=row.fold)
+        mlflow.log_metric("RMSLE_backtest", report["rmsle"].mean())
+        logger.info(f"✅ Backtest finalizado: RMSLE medio {report['rmsle'].mean():.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,10 @@ class ConfigLoader:
     def get_path(self, key: str):
         return self._config["paths"].get(key)
 
+    def get_section(self, key: str):
+        """Devuelve un bloque de primer nivel del config (o {} si no existe)."""
+        return self._config.get(key) or {}
+
     def get_variable(self, key: str, subkey: str = None, flatten: bool = False):
         """
         Accede a una variable del bloque 'variables' del config.
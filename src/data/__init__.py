@@ -1 +1,5 @@
-from .load import DataLoader
\ No newline at end of file
+from .load import DataLoader
+from .cache import DatasetCache
+from .schema import SchemaRegistry
+from .store import PartitionedStore
+from .series_store import SeriesStore
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import requests
+
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def is_remote(path) -> bool:
+    """Indica si la ruta apunta a una fuente HTTP(S)."""
+    return str(path).startswith(("http://", "https://"))
+
+
+def default_reader(path):
+    """Lector por extensión para las fuentes crudas (CSV o Parquet)."""
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def remote_validator(url, timeout=10):
+    """Obtiene el validador remoto con un HEAD. Devuelve None si no hay conexión."""
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning(f"⚠️ No se pudo revalidar {url}: {e}")
+        return None
+    headers = response.headers
+    return {
+        "etag": headers.get("X-Linked-Etag") or headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "size": headers.get("X-Linked-Size") or headers.get("Content-Length"),
+    }
+
+
+class DatasetCache:
+    """
+    Caché local de fuentes remotas guardadas como Arrow IPC/Feather sin compresión,
+    de modo que se puedan abrir con memory-map.
+
+    Cada URL se asocia a un validador remoto (ETag, o Last-Modified + tamaño) y al
+    checksum SHA-256 del archivo descargado, que da nombre al objeto en disco.
+    En cada lectura se revalida con un HEAD; si no hay red (o `offline=True`)
+    se sirve la copia local. Varias instancias (o procesos) pueden compartir el
+    directorio: cada escritura fusiona su entrada con el manifest en disco bajo un lock.
+    """
+    MANIFEST = "manifest.json"
+
+    def __init__(self, cache_dir="data/cache", offline=False, timeout=10):
+        self.cache_dir = Path(cache_dir)
+        self.offline = offline
+        self.timeout = timeout
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest = self._load_manifest()
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        """Crea la caché según el bloque `cache` del config, o None si está desactivada."""
+        params = config.get_section("cache")
+        if not params.get("enabled", False):
+            return None
+        return cls(
+            cache_dir=config.get_path("cache_dir") or "data/cache",
+            offline=params.get("offline", False),
+            timeout=params.get("timeout", 10),
+        )
+
+    def _load_manifest(self):
+        path = self.cache_dir / self.MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Lock entre procesos sobre el manifest (archivo creado con O_EXCL)."""
+        path = self.cache_dir / (self.MANIFEST + ".lock")
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.time() > deadline:
+                    # Un lock más viejo que el timeout quedó de un proceso interrumpido
+                    logger.warning(f"⚠️ Se descarta el lock vencido {path}")
+                    path.unlink(missing_ok=True)
+                    deadline = time.time() + self.timeout
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            path.unlink(missing_ok=True)
+
+    def _save_manifest(self, url, entry):
+        """Fusiona la entrada con el manifest en disco, sin pisar las de otras instancias."""
+        with self._manifest_lock():
+            manifest = self._load_manifest()
+            manifest[url] = entry
+            # Escritura atómica: varios procesos pueden leer la caché a la vez
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, self.cache_dir / self.MANIFEST)
+        self._manifest = manifest
+
+    def _remote_validator(self, url):
+        return remote_validator(url, self.timeout)
+
+    def _object_path(self, entry):
+        return self.cache_dir / entry["file"]
+
+    def _hit(self, url, entry):
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += entry["source_bytes"]
+        logger.info(f"📦 Caché hit: {url}")
+        return self._object_path(entry)
+
+    def _download(self, url, reader, validator):
+        """Descarga la fuente, calcula su checksum y la guarda como Feather."""
+        start_time = time.time()
+        sha = hashlib.sha256()
+        n_bytes = 0
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=Path(url).suffix)
+        try:
+            with requests.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                with os.fdopen(fd, "wb") as f:
+                    for block in response.iter_content(chunk_size=1 << 20):
+                        sha.update(block)
+                        n_bytes += len(block)
+                        f.write(block)
+
+            digest = sha.hexdigest()
+            file_name = f"{digest[:32]}.feather"
+            target = self.cache_dir / file_name
+            # Direccionado por contenido: si el objeto ya existe no se vuelve a parsear
+            if not target.exists():
+                data = reader(tmp)
+                table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+                feather.write_feather(table, str(target) + ".tmp", compression="uncompressed")
+                os.replace(str(target) + ".tmp", target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self._save_manifest(url, {
+            "file": file_name,
+            "sha256": digest,
+            "validator": validator,
+            "source_bytes": n_bytes,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        self.stats["misses"] += 1
+        logger.info(f"⬇️ Caché miss: {url} ({n_bytes / 1e6:.1f} MB en {time.time() - start_time:.1f} s)")
+        return target
+
+    def fetch(self, url, reader=default_reader):
+        """
+        Devuelve la ruta local (Feather) de la fuente, descargándola solo si cambió.
+
+        Args:
+            url (str): URL de la fuente.
+            reader (callable): Función `reader(ruta_local) -> DataFrame | pa.Table`
+                usada para parsear el archivo descargado. Debe ser estable para cada URL.
+        """
+        entry = self._manifest.get(url)
+        if entry is None or not self._object_path(entry).exists():
+            # Otra instancia pudo descargarla después de que esta leyera el manifest
+            self._manifest = self._load_manifest()
+            entry = self._manifest.get(url)
+        cached = entry is not None and self._object_path(entry).exists()
+
+        if self.offline:
+            if not cached:
+                raise FileNotFoundError(f"'{url}' no está en caché y el modo offline está activo.")
+            return self._hit(url, entry)
+
+        validator = self._remote_validator(url)
+        if cached and (validator is None or validator == entry["validator"]):
+            return self._hit(url, entry)
+        if validator is None:
+            raise ConnectionError(f"No se pudo acceder a '{url}' y no hay copia en caché.")
+        return self._download(url, reader, validator)
+
+    def version(self, url):
+        """
+        Validador vigente de la fuente sin descargarla: el remoto (HEAD) o, sin red o en
+        modo offline, el registrado en el manifest. None si no se conoce ninguno.
+        """
+        validator = None if self.offline else self._remote_validator(url)
+        entry = self._manifest.get(url)
+        return validator or (entry["validator"] if entry else None)
+
+    def read_table(self, url, reader=default_reader, columns=None):
+        """Lee la fuente como `pa.Table` con memory-map sobre la copia local."""
+        return feather.read_table(self.fetch(url, reader), columns=columns, memory_map=True)
+
+    def read(self, url, reader=default_reader, columns=None):
+        """Lee la fuente como DataFrame de pandas."""
+        return self.read_table(url, reader, columns).to_pandas()
+
+    def report(self):
+        """Registra y devuelve los contadores de la caché."""
+        logger.info(
+            f"📦 Caché: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+            f"{self.stats['bytes_saved'] / 1e6:.1f} MB ahorrados"
+        )
+        return dict(self.stats)
+
+
+@lru_cache(maxsize=None)
+def get_default_cache():
+    """Caché compartida por el proceso, construida a partir de CONFIG."""
+    return DatasetCache.from_config(CONFIG)
+
+
+def source_version(path):
+    """
+    Versión de una fuente para usarla en claves de caché derivadas: el validador remoto
+    (ETag, o Last-Modified + tamaño) para URLs servidas por la caché, o tamaño y fecha de
+    modificación para archivos locales. None si no se puede determinar.
+    Para URLs hace un HEAD (salvo caché offline): llamarla solo cuando haga falta la versión.
+    """
+    if is_remote(path):
+        cache = get_default_cache()
+        return cache.version(path) if cache is not None else remote_validator(path)
+    if os.path.exists(path):
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return None
+
+
+def read_source(path, reader=default_reader):
+    """
+    Lee una fuente pasando por la caché cuando es remota y la caché está activa.
+    Las rutas locales se leen directamente.
+    """
+    cache = get_default_cache()
+    if cache is not None and is_remote(path):
+        return cache.read(path, reader)
+    return reader(path)
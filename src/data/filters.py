@@ -0,0 +1,39 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+def date_scalar(value, field_type):
+    """Convierte una fecha al escalar comparable con una columna de tipo `field_type`."""
+    value = pd.Timestamp(value)
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        # Fechas ISO como texto: la comparación lexicográfica coincide con la cronológica
+        return value.strftime("%Y-%m-%d")
+    if pa.types.is_date(field_type):
+        return pa.scalar(value.date(), type=field_type)
+    return pa.scalar(value, type=field_type)
+
+
+def combine(conditions):
+    """Une con AND una lista de expresiones. Devuelve None si la lista está vacía."""
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return expr
+
+
+def build_filter(schema, date_column="date", start_date=None, end_date=None, stores=None, families=None):
+    """
+    Construye la expresión de filtro de pyarrow para una ventana de fechas
+    [start_date, end_date] y conjuntos de tiendas y familias. Devuelve None si no hay filtros.
+    """
+    conditions = []
+    if start_date is not None:
+        conditions.append(ds.field(date_column) >= date_scalar(start_date, schema.field(date_column).type))
+    if end_date is not None:
+        conditions.append(ds.field(date_column) <= date_scalar(end_date, schema.field(date_column).type))
+    if stores is not None:
+        conditions.append(ds.field("store_nbr").isin(list(stores)))
+    if families is not None:
+        conditions.append(ds.field("family").isin(list(families)))
+    return combine(conditions)
@@ -1,36 +1,207 @@
+from functools import partial
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 from src.config import CONFIG
+from src.data.cache import DatasetCache, is_remote
+from src.data.filters import build_filter
+from src.data.schema import SchemaRegistry, default_pandas_mb, frame_memory_mb
+from src.data.store import PartitionedStore
+
+def _dataset_format(path):
+    suffix = str(path).rsplit(".", 1)[-1]
+    return suffix if suffix in ("parquet", "csv") else "ipc"
 
 class DataLoader:
-    def __init__(self, config=CONFIG):
+    def __init__(self, config=CONFIG, cache=None, compact=None):
         self.config = config
         self.index = config.get_variable('index')
+        self.date = config.get_variable('date')
+        # Caché local de las fuentes remotas (None si está desactivada en el config)
+        self.cache = cache if cache is not None else DatasetCache.from_config(config)
+        # Tipos compactos (category / enteros estrechos / float32) al leer
+        self.compact = config.get_section("data").get("compact_dtypes", False) if compact is None else compact
+
+    def _registry(self):
+        return SchemaRegistry.from_config(self.config)
+
+    def _read(self, key, reader, columns=None):
+        path = self.config.get_path(key)
+        if self.cache is not None and is_remote(path):
+            return self.cache.read(path, reader, columns=columns)
+        return reader(path, columns=columns) if columns else reader(path)
+
+    def _dataset(self, key, reader):
+        """
+        Abre la fuente como `pyarrow.dataset` para poder empujar filtros y proyección.
+        Con caché se usa la copia Feather local (memory-map); los Parquet locales
+        aprovechan además las estadísticas de cada row group.
+        """
+        path = self.config.get_path(key)
+        if self.cache is not None and is_remote(path):
+            return ds.dataset(self.cache.fetch(path, reader), format="ipc")
+        if is_remote(path):
+            # Sin caché no hay acceso aleatorio al remoto: se descarga entero en memoria
+            return ds.dataset(pa.Table.from_pandas(reader(path), preserve_index=False))
+        return ds.dataset(path, format=_dataset_format(path))
+
+    def build_filter(self, schema, start_date=None, end_date=None, stores=None, families=None):
+        """
+        Construye la expresión de filtro de pyarrow para una ventana de fechas
+        [start_date, end_date] y conjuntos de tiendas y familias. Devuelve None si no hay filtros.
+        """
+        return build_filter(schema, self.date, start_date, end_date, stores, families)
+
+    def _with_index(self, dataset, columns):
+        if columns is not None and self.index in dataset.schema.names and self.index not in columns:
+            return [self.index] + list(columns)
+        return columns
+
+    def _to_frame(self, table, registry=None, label=None):
+        if registry is None:
+            df = table.to_pandas()
+        else:
+            before_mb = default_pandas_mb(table) if label else None
+            df = registry.to_pandas(table)
+        if self.date in df.columns:
+            df[self.date] = pd.to_datetime(df[self.date]).astype("datetime64[ns]")
+        df = df.set_index(self.index)
+        if registry is not None and label:
+            registry.memory_report(before_mb, df, label)
+        return df
+
+    def _load_parquet(self, key, columns=None, n_rows=None, **filters):
+        dataset = self._dataset(key, pd.read_parquet)
+        expr = self.build_filter(dataset.schema, **filters)
+        columns = self._with_index(dataset, columns)
+        if n_rows:
+            # head() deja de leer en cuanto junta n_rows filas que cumplen el filtro
+            table = dataset.head(n_rows, columns=columns, filter=expr)
+        else:
+            table = dataset.to_table(columns=columns, filter=expr)
+        registry = self._registry().fit(table) if self.compact else None
+        return self._to_frame(table, registry, label=key)
+
+    def _iter(self, key, reader, batch_rows, by, columns, **filters):
+        if by not in ("row_group", "date"):
+            raise ValueError(f"'by' debe ser 'row_group' o 'date', no '{by}'.")
+        dataset = self._dataset(key, reader)
+        expr = self.build_filter(dataset.schema, **filters)
+        columns = self._with_index(dataset, columns)
+        # Esquema fijo para todos los lotes, incluso los que llegan vacíos
+        names = columns if columns is not None else dataset.schema.names
+        schema = pa.schema([dataset.schema.field(name) for name in names])
+        # Tipos y categorías medidos sobre todo el dataset: iguales en cada lote
+        registry = self._registry().fit(dataset) if self.compact else None
+        batches = (
+            pa.Table.from_batches([batch], schema=schema)
+            for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=batch_rows)
+            if batch.num_rows
+        )
+        if by == "row_group":
+            for table in batches:
+                yield self._to_frame(table, registry)
+            return
+
+        # Por fecha: cada lote contiene fechas completas (requiere la fuente ordenada por fecha)
+        pending = []
+        pending_rows = 0
+        last_emitted = None
+        for table in batches:
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows < batch_rows:
+                continue
+            table = pa.concat_tables(pending)
+            dates = table.column(self.date).to_numpy()
+            if last_emitted is not None and dates[0] <= last_emitted:
+                raise ValueError("La fuente no está ordenada por fecha; use by='row_group'.")
+            cut = int(np.searchsorted(dates, dates[-1], side="left"))
+            if cut == 0:
+                # Una sola fecha supera batch_rows: se espera a que cierre
+                pending = [table]
+                continue
+            last_emitted = dates[cut - 1]
+            yield self._to_frame(table.slice(0, cut), registry)
+            pending = [table.slice(cut)]
+            pending_rows = table.num_rows - cut
+        if pending_rows:
+            yield self._to_frame(pa.concat_tables(pending), registry)
+
+    def iter_train(self, batch_rows=500_000, by="row_group", columns=None, source="parquet", **filters):
+        """
+        Itera el entrenamiento en lotes acotados de DataFrames con esquema estable.
+        Parámetros:
+            batch_rows (int): tamaño máximo aproximado de cada lote
+            by (str): 'row_group' (lotes del lector) o 'date' (lotes con fechas completas)
+            columns (list, opcional): columnas a cargar
+            source (str): 'parquet' o 'csv'
+            **filters: mismos filtros que `load_train_parquet` (start_date, end_date, stores, families)
+        """
+        if source == "csv":
+            return self._iter("train", partial(pd.read_csv, parse_dates=[self.date]), batch_rows, by, columns, **filters)
+        return self._iter("train_parquet", pd.read_parquet, batch_rows, by, columns, **filters)
+
+    def iter_test(self, batch_rows=500_000, by="row_group", columns=None, source="parquet", **filters):
+        """Itera el test en lotes acotados, con los mismos parámetros que `iter_train`."""
+        if source == "csv":
+            return self._iter("test", partial(pd.read_csv, parse_dates=[self.date]), batch_rows, by, columns, **filters)
+        return self._iter("test_parquet", pd.read_parquet, batch_rows, by, columns, **filters)
+
+    def _read_csv(self, key, n_rows=None):
+        path = self.config.get_path(key)
+        if self.cache is not None and is_remote(path):
+            # Se cachea el archivo completo; n_rows se aplica sobre la copia local
+            table = self.cache.read_table(path, partial(pd.read_csv, parse_dates=["date"]))
+            table = table.slice(0, n_rows) if n_rows else table
+            registry = self._registry().fit(table) if self.compact else None
+            return self._to_frame(table, registry, label=key)
+        df = pd.read_csv(path, parse_dates=["date"], nrows=n_rows, index_col=self.index)
+        if self.compact:
+            registry = self._registry()
+            before_mb = frame_memory_mb(df)
+            df = registry.apply(df)
+            registry.memory_report(before_mb, df, key)
+        return df
 
     def load_train_data(self, n_rows=None):
-        return pd.read_csv(self.config.get_path("train"), parse_dates=["date"], nrows=n_rows, index_col=self.index)
+        return self._read_csv("train", n_rows)
 
     def load_test_data(self, n_rows=None):
-        return pd.read_csv(self.config.get_path("test"), parse_dates=["date"], nrows=n_rows, index_col=self.index)
+        return self._read_csv("test", n_rows)
 
     def load_store_metadata(self):
-        return pd.read_csv(self.config.get_path("store_metadata"))
-    
-    def load_train_parquet(self, columns=None, n_rows=None):
+        return self._read("store_metadata", pd.read_csv)
+
+    def load_train_parquet(self, columns=None, n_rows=None, start_date=None, end_date=None, stores=None, families=None):
         """
         Carga el archivo de entrenamiento en formato Parquet.
+        Los filtros se empujan al lector de pyarrow: las filas descartadas no llegan a pandas.
         Parámetros:
             columns (list, opcional): columnas a cargar del Parquet (para optimizar memoria)
+            n_rows (int, opcional): máximo de filas a devolver
+            start_date, end_date (str | Timestamp, opcional): ventana de fechas (inclusiva)
+            stores (iterable, opcional): valores de store_nbr a conservar
+            families (iterable, opcional): valores de family a conservar
         """
-        df = pd.read_parquet(self.config.get_path("train_parquet"), columns=columns)
-        df["date"] = pd.to_datetime(df["date"])
-        return df.set_index(self.index).iloc[:n_rows] if n_rows else df.set_index(self.index)
-    
-    def load_test_parquet(self, columns=None, n_rows=None):
+        return self._load_parquet("train_parquet", columns, n_rows, start_date=start_date,
+                                  end_date=end_date, stores=stores, families=families)
+
+    def load_test_parquet(self, columns=None, n_rows=None, start_date=None, end_date=None, stores=None, families=None):
         """
-        Carga el archivo de entrenamiento en formato Parquet.
-        Parámetros:
-            columns (list, opcional): columnas a cargar del Parquet (para optimizar memoria)
+        Carga el archivo de test en formato Parquet, con los mismos filtros que `load_train_parquet`.
+        """
+        return self._load_parquet("test_parquet", columns, n_rows, start_date=start_date,
+                                  end_date=end_date, stores=stores, families=families)
+
+    def load_train_store(self, columns=None, start_date=None, end_date=None, stores=None, families=None):
+        """
+        Carga el entrenamiento desde el almacén particionado local (`paths.train_store`).
+        Solo se abren las particiones year/month (y store_nbr) que cubre la consulta.
         """
-        df = pd.read_parquet(self.config.get_path("test_parquet"), columns=columns)
-        df["date"] = pd.to_datetime(df["date"])
-        return df.set_index(self.index).iloc[:n_rows] if n_rows else df.set_index(self.index)
+        store = PartitionedStore.from_config(self.config)
+        table = store.read_table(columns, start_date, end_date, stores, families)
+        table = table.sort_by(self.date)
+        registry = self._registry().fit(table) if self.compact else None
+        return self._to_frame(table, registry, label="train_store")
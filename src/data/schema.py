@@ -0,0 +1,142 @@
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+_INT_TYPES = [
+    (pa.uint8(), np.iinfo(np.uint8)), (pa.int8(), np.iinfo(np.int8)),
+    (pa.uint16(), np.iinfo(np.uint16)), (pa.int16(), np.iinfo(np.int16)),
+    (pa.uint32(), np.iinfo(np.uint32)), (pa.int32(), np.iinfo(np.int32)),
+]
+
+
+def narrowest_int(min_value, max_value):
+    """Devuelve el tipo entero de Arrow más pequeño que contiene el rango [min_value, max_value]."""
+    for arrow_type, info in _INT_TYPES:
+        if min_value >= info.min and max_value <= info.max:
+            return arrow_type
+    return pa.int64()
+
+
+def frame_memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def default_pandas_mb(table):
+    """
+    Estima la memoria que ocuparía `table.to_pandas()` con los tipos por defecto
+    (int64/float64 y un objeto `str` por fila), sin llegar a materializarlo.
+    """
+    total = 0
+    for field, column in zip(table.schema, table.columns):
+        arrow_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            lengths = pc.sum(pc.utf8_length(column.cast(arrow_type))).as_py() or 0
+            # Puntero de 8 bytes + cabecera de un str ASCII de CPython (49 bytes) + caracteres
+            total += len(column) * (8 + 49) + lengths
+        else:
+            total += len(column) * 8
+    return total / 1e6
+
+
+class SchemaRegistry:
+    """
+    Registro de tipos compactos construido a partir del bloque `variables` del config.
+
+    - Categóricas de texto (family, city, state, type) → `category` de pandas.
+    - Identificadores enteros (store_nbr, cluster, id) y demás enteros → el entero más estrecho.
+    - Numéricas de punto flotante (dcoilwtico, ...) → float32.
+    - El target (sales) queda en float64: en float32 se pierden los centavos por encima de ~100k.
+
+    `fit` fija los tipos y las categorías sobre una tabla o un `pyarrow.dataset` completo,
+    de forma que todos los lotes leídos después compartan el mismo esquema.
+    """
+    def __init__(self, categorical=None, target="sales", date="date", index="id"):
+        self.categorical = list(categorical or [])
+        self.target = target
+        self.date = date
+        self.index = index
+        self.types_ = {}
+        self.categories_ = {}
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        return cls(
+            categorical=config.get_variable('categorical', flatten=True),
+            target=config.get_variable('target'),
+            date=config.get_variable('date'),
+            index=config.get_variable('index'),
+        )
+
+    def _is_text(self, arrow_type):
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+    def fit(self, data):
+        """
+        Calcula el tipo compacto de cada columna.
+        Args:
+            data (pa.Table | pyarrow.dataset.Dataset): datos sobre los que se miden rangos y categorías.
+        """
+        schema = data.schema
+        text = [f.name for f in schema if f.name in self.categorical and self._is_text(f.type)]
+        ints = [f.name for f in schema if f.name != self.date and pa.types.is_integer(f.type)]
+        # Sobre un dataset solo se leen (una vez) las columnas que hay que medir
+        source = data if isinstance(data, pa.Table) else data.to_table(columns=text + ints)
+
+        self.types_, self.categories_ = {}, {}
+        for name in text:
+            self.categories_[name] = sorted(pc.unique(source.column(name)).drop_null().to_pylist())
+        for name in ints:
+            bounds = pc.min_max(source.column(name)).as_py()
+            if bounds["min"] is not None:
+                self.types_[name] = narrowest_int(bounds["min"], bounds["max"])
+        for field in schema:
+            if field.name != self.date and pa.types.is_floating(field.type):
+                self.types_[field.name] = pa.float32()
+        if self.target in schema.names:
+            self.types_[self.target] = pa.float64()
+        return self
+
+    def to_pandas(self, table):
+        """Convierte una tabla de Arrow a pandas aplicando los tipos compactos."""
+        if not self.types_ and not self.categories_:
+            self.fit(table)
+        for name, arrow_type in self.types_.items():
+            if name in table.column_names and table.schema.field(name).type != arrow_type:
+                i = table.column_names.index(name)
+                table = table.set_column(i, name, table.column(name).cast(arrow_type))
+        for name in self.categories_:
+            if name in table.column_names and not pa.types.is_dictionary(table.schema.field(name).type):
+                # Diccionario en Arrow: pandas recibe códigos + categorías, nunca un objeto por fila
+                i = table.column_names.index(name)
+                table = table.set_column(i, name, pc.dictionary_encode(table.column(name)))
+        df = table.to_pandas()
+        for name, categories in self.categories_.items():
+            if name in df.columns:
+                df[name] = df[name].cat.set_categories(categories)
+        return df
+
+    def apply(self, df):
+        """Aplica los tipos compactos a un DataFrame de pandas ya cargado."""
+        if not self.types_ and not self.categories_:
+            self.fit(pa.Table.from_pandas(df, preserve_index=False))
+        for name, arrow_type in self.types_.items():
+            if name in df.columns:
+                df[name] = df[name].astype(arrow_type.to_pandas_dtype())
+        for name, categories in self.categories_.items():
+            if name in df.columns:
+                df[name] = pd.Categorical(df[name], categories=categories)
+        return df
+
+    def memory_report(self, before_mb, df_after, label=""):
+        """Registra la memoria antes y después de compactar y devuelve ambos valores en MB."""
+        after_mb = frame_memory_mb(df_after)
+        ratio = before_mb / after_mb if after_mb else float("nan")
+        logger.info(f"🧮 Memoria {label}: {before_mb:.1f} MB → {after_mb:.1f} MB (x{ratio:.1f})")
+        return {"before_mb": before_mb, "after_mb": after_mb}
@@ -0,0 +1,105 @@
+import logging
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def sliding_windows(values, timesteps):
+    """
+    Ventanas históricas de `timesteps` filas sobre una matriz (fechas, variables).
+
+    Devuelve una vista por strides de forma (fechas - timesteps, timesteps, variables):
+    la ventana i son las filas [i, i + timesteps), es decir, el historial previo a la
+    fila i + timesteps. No se copia ningún dato.
+    """
+    if len(values) <= timesteps:
+        return np.empty((0, timesteps) + values.shape[1:], dtype=values.dtype)
+    # sliding_window_view deja el eje de la ventana al final: (n - t + 1, variables, t)
+    windows = sliding_window_view(values, timesteps, axis=0)
+    return windows[:-1].swapaxes(1, 2)
+
+
+class SeriesStore:
+    """
+    Todas las series (store_nbr × family) en un único arreglo denso float32
+    de forma (series, fechas, variables).
+
+    Se construye con una sola dispersión de las filas sobre la grilla serie × fecha;
+    a partir de ahí obtener una serie es indexar el primer eje (O(1) y sin copia),
+    en lugar de evaluar una máscara booleana sobre todo el DataFrame por cada serie.
+
+    Attributes:
+        values (np.ndarray): (n_series, n_dates, n_features) con NaN donde no hay dato.
+        mask (np.ndarray): (n_series, n_dates) True donde la fila existe en el origen.
+        keys (pd.MultiIndex): clave (store_nbr, family) de cada serie, en orden de id.
+        dates (pd.DatetimeIndex): fechas ordenadas del eje 1.
+        features (list): nombres de las variables del eje 2.
+    """
+    def __init__(self, values, mask, keys, dates, features):
+        self.values = values
+        self.mask = mask
+        self.keys = keys
+        self.dates = dates
+        self.features = list(features)
+        self._dense = mask.all(axis=1)
+
+    @classmethod
+    def from_frame(cls, df, series_columns=("store_nbr", "family"), date="date", features=None, dtype=np.float32):
+        """
+        Args:
+            df (pd.DataFrame): una fila por serie y fecha.
+            series_columns (tuple): columnas que identifican la serie.
+            date (str): columna de fecha (o nivel del índice).
+            features (list, opcional): variables a guardar; por defecto el resto de columnas, en su orden.
+        """
+        series_columns = list(series_columns)
+        if features is None:
+            features = [c for c in df.columns if c not in series_columns + [date]]
+        series_ids, keys = pd.MultiIndex.from_frame(df[series_columns]).factorize(sort=True)
+        date_codes, dates = pd.factorize(df[date], sort=True)
+        if (series_ids < 0).any() or (date_codes < 0).any():
+            raise ValueError("SeriesStore: claves de serie o fechas nulas.")
+
+        values = np.full((len(keys), len(dates), len(features)), np.nan, dtype=dtype)
+        mask = np.zeros((len(keys), len(dates)), dtype=bool)
+        values[series_ids, date_codes] = df[features].to_numpy(dtype=dtype)
+        mask[series_ids, date_codes] = True
+        store = cls(values, mask, keys.set_names(series_columns), pd.DatetimeIndex(dates), features)
+        logger.info(f"🧱 SeriesStore: {len(keys)} series × {len(dates)} fechas × {len(features)} variables "
+                    f"({values.nbytes / 1e6:.1f} MB)")
+        return store
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def series_id(self, *key):
+        """Id de la serie con clave (store_nbr, family)."""
+        return self.keys.get_loc(key)
+
+    def series_ids(self, frame):
+        """Ids de serie para cada fila de `frame` (-1 si la serie no existe)."""
+        return self.keys.get_indexer(pd.MultiIndex.from_frame(frame[list(self.keys.names)]))
+
+    def feature_index(self, name):
+        return self.features.index(name)
+
+    def series(self, series_id):
+        """
+        Matriz (fechas, variables) de una serie. Si la serie está completa es una vista
+        del arreglo común; si le faltan fechas se devuelven solo las observadas (copia).
+        """
+        if self._dense[series_id]:
+            return self.values[series_id]
+        return self.values[series_id][self.mask[series_id]]
+
+    def items(self):
+        """Itera (clave, matriz) por serie en orden de id."""
+        for series_id, key in enumerate(self.keys):
+            yield key, self.series(series_id)
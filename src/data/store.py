@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.config import CONFIG
+from src.data.filters import build_filter, combine
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def _month_bound(value, lower):
+    """Expresión sobre las particiones year/month para un límite de la ventana de fechas."""
+    value = pd.Timestamp(value)
+    year, month = ds.field("year"), ds.field("month")
+    if lower:
+        return (year > value.year) | ((year == value.year) & (month >= value.month))
+    return (year < value.year) | ((year == value.year) & (month <= value.month))
+
+
+class PartitionedStore:
+    """
+    Almacén local del entrenamiento en Parquet particionado estilo Hive
+    (`year=YYYY/month=M[/store_nbr=N]`).
+
+    `append` escribe solo los días nuevos como archivos adicionales dentro de sus
+    particiones, sin reescribir el histórico; las lecturas con ventana de fechas
+    o tiendas abren únicamente las particiones que tocan.
+    """
+    META = "_store.json"
+
+    def __init__(self, root="data/store/train", by_store=False, date="date", index="id"):
+        self.root = Path(root)
+        self.by_store = by_store
+        self.date = date
+        self.index = index
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        params = config.get_section("store")
+        return cls(
+            root=config.get_path("train_store") or "data/store/train",
+            by_store=params.get("by_store", False),
+            date=config.get_variable('date'),
+            index=config.get_variable('index'),
+        )
+
+    @property
+    def partition_columns(self):
+        return ["year", "month"] + (["store_nbr"] if self.by_store else [])
+
+    def _partitioning(self):
+        fields = [("year", pa.int16()), ("month", pa.int8())]
+        if self.by_store:
+            fields.append(("store_nbr", pa.int16()))
+        return ds.partitioning(pa.schema(fields), flavor="hive")
+
+    def metadata(self):
+        """Resumen del almacén (última fecha, filas y número de escrituras), o {} si está vacío."""
+        path = self.root / self.META
+        if not path.exists():
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_metadata(self, meta):
+        tmp = self.root / (self.META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self.root / self.META)
+
+    def max_date(self):
+        value = self.metadata().get("max_date")
+        return pd.Timestamp(value) if value else None
+
+    def _to_table(self, df):
+        df = df.reset_index() if df.index.name == self.index else df.reset_index(drop=True)
+        df = df.sort_values(self.date, kind="stable")
+        df["year"] = df[self.date].dt.year.astype("int16")
+        df["month"] = df[self.date].dt.month.astype("int8")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Se guardan tipos planos; la compactación se aplica al leer (SchemaRegistry)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+        if self.by_store:
+            table = table.set_column(table.column_names.index("store_nbr"), "store_nbr",
+                                     table.column("store_nbr").cast(pa.int16()))
+        return table
+
+    def append(self, df):
+        """
+        Agrega los días posteriores a la última fecha almacenada.
+        Los días ya presentes se descartan; el histórico no se reescribe.
+
+        Returns:
+            int: número de filas escritas.
+        """
+        last_date = self.max_date()
+        if last_date is not None:
+            old = df[self.date] <= last_date
+            if old.any():
+                logger.warning(f"⚠️ {int(old.sum())} filas con fecha <= {last_date.date()} ya están en el almacén y se omiten.")
+                df = df[~old]
+        if df.empty:
+            logger.info("📂 No hay días nuevos para agregar al almacén.")
+            return 0
+
+        first, last = df[self.date].min(), df[self.date].max()
+        self.root.mkdir(parents=True, exist_ok=True)
+        ds.write_dataset(
+            self._to_table(df), self.root, format="parquet",
+            partitioning=self._partitioning(),
+            # Nombre único por escritura: los archivos existentes no se tocan
+            basename_template=f"part-{first:%Y%m%d}-{last:%Y%m%d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        meta = self.metadata()
+        meta.update({
+            "max_date": str(last.date()),
+            "min_date": meta.get("min_date", str(first.date())),
+            "rows": meta.get("rows", 0) + len(df),
+            "appends": meta.get("appends", 0) + 1,
+            "by_store": self.by_store,
+        })
+        self._save_metadata(meta)
+        logger.info(f"📂 Almacén actualizado: {len(df)} filas de {first.date()} a {last.date()}")
+        return len(df)
+
+    def dataset(self):
+        if not self.root.exists():
+            raise FileNotFoundError(f"Almacén no encontrado en {self.root}")
+        return ds.dataset(self.root, format="parquet", partitioning=self._partitioning())
+
+    def build_filter(self, schema, start_date=None, end_date=None, stores=None, families=None):
+        """
+        Filtro de filas más las condiciones sobre year/month que permiten a pyarrow
+        descartar directorios completos sin abrirlos.
+        """
+        conditions = [build_filter(schema, self.date, start_date, end_date, stores, families)]
+        if start_date is not None:
+            conditions.append(_month_bound(start_date, lower=True))
+        if end_date is not None:
+            conditions.append(_month_bound(end_date, lower=False))
+        return combine([c for c in conditions if c is not None])
+
+    def read_table(self, columns=None, start_date=None, end_date=None, stores=None, families=None):
+        dataset = self.dataset()
+        expr = self.build_filter(dataset.schema, start_date, end_date, stores, families)
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name not in ("year", "month")]
+        return dataset.to_table(columns=columns, filter=expr)
+
+    def read(self, columns=None, start_date=None, end_date=None, stores=None, families=None):
+        """Lee el almacén como DataFrame indexado por `id`, ordenado por fecha."""
+        df = self.read_table(columns, start_date, end_date, stores, families).to_pandas()
+        df = df.sort_values(self.date, kind="stable")
+        return df.set_index(self.index) if self.index in df.columns else df
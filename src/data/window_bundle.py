@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+class WindowBundle:
+    """
+    Arreglos de entrenamiento de HybridModel persistidos como un directorio versionado
+    de archivos `.npy` sin comprimir más un `manifest.json`:
+
+        <root>/<version>/{x_store,x_family,xy_historic,x_current,y_current}.npy
+        <root>/<version>/manifest.json
+        <root>/LATEST  → nombre de la última versión completa
+
+    Los arreglos se escriben por tramos sobre `open_memmap` (sin concatenar en memoria)
+    y se abren con `mmap_mode='r'`: cargar un bundle solo lee cabeceras y las páginas
+    se traen del disco a medida que se tocan los lotes.
+    """
+    MANIFEST = "manifest.json"
+    LATEST = "LATEST"
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def latest(self):
+        path = self.root / self.LATEST
+        return path.read_text().strip() if path.exists() else None
+
+    def exists(self, version=None):
+        version = version or self.latest()
+        return version is not None and (self.root / version / self.MANIFEST).exists()
+
+    def create(self, specs, metadata=None, version=None):
+        """
+        Reserva los arreglos en disco y devuelve (version, dict nombre → memmap escribible).
+        Llamar a `commit` cuando estén completos.
+
+        Args:
+            specs (dict): nombre → (shape, dtype).
+            metadata (dict, opcional): datos extra para el manifest (timesteps, variables...).
+        """
+        version = version or time.strftime("%Y%m%d-%H%M%S")
+        path = self.root / version
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            name: np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=dtype, shape=tuple(shape))
+            for name, (shape, dtype) in specs.items()
+        }
+        self._pending = (version, specs, metadata or {})
+        return version, arrays
+
+    def commit(self, arrays):
+        """Vuelca los memmaps, escribe el manifest y marca la versión como la última."""
+        version, specs, metadata = self._pending
+        for array in arrays.values():
+            array.flush()
+        manifest = {
+            "version": version,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "arrays": {name: {"shape": list(shape), "dtype": np.dtype(dtype).str} for name, (shape, dtype) in specs.items()},
+            **metadata,
+        }
+        path = self.root / version
+        with open(path / self.MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+        tmp = self.root / (self.LATEST + ".tmp")
+        tmp.write_text(version)
+        os.replace(tmp, self.root / self.LATEST)
+        size = sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for shape, dtype in specs.values())
+        logger.info(f"💾 Bundle de ventanas {version} guardado en {path} ({size / 1e6:.1f} MB)")
+        return manifest
+
+    def load(self, version=None):
+        """
+        Abre un bundle en modo solo lectura (memmap).
+        Returns:
+            tuple: (dict nombre → np.memmap, manifest)
+        """
+        version = version or self.latest()
+        if not self.exists(version):
+            raise FileNotFoundError(f"No hay bundle de ventanas en {self.root}")
+        path = self.root / version
+        with open(path / self.MANIFEST, "r") as f:
+            manifest = json.load(f)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in manifest["arrays"]}
+        logger.info(f"📂 Bundle de ventanas {version} abierto desde {path}")
+        return arrays, manifest
+
+    @staticmethod
+    def split(n_samples, test_size=0.2, random_state=42):
+        """Índices de entrenamiento y validación: los arreglos no se copian al dividir."""
+        return train_test_split(np.arange(n_samples), test_size=test_size, random_state=random_state)
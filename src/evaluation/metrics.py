@@ -1,18 +1,133 @@
+import os
 from src.utils.serialization import load_object
 from src.config import CONFIG
-import tensorflow.keras.backend as K # type: ignore
 import numpy as np
+import pandas as pd
 
 def rmsle_k(y_true, y_pred):
+    # Import diferido: el flujo de LightGBM no necesita TensorFlow instalado
+    import tensorflow.keras.backend as K # type: ignore
     return K.sqrt(K.mean(K.square(K.log(1 + y_true) - K.log(1 + y_pred))))
 
+
+class RMSLE:
+    """
+    RMSLE en escala original para un target escalado con MinMaxScaler.
+
+    Los parámetros del scaler (min_, scale_) se capturan una sola vez; cada evaluación
+    deshace el escalado, recorta a 0 y aplica log1p en una pasada vectorizada sobre
+    buffers preasignados (se reutilizan mientras el tamaño del set no cambie). El log1p
+    del target se guarda entre llamadas con el mismo arreglo de etiquetas, que es el caso
+    del set de validación en cada ronda de boosting; se valida con forma, suma y una
+    muestra de valores, así un buffer reutilizado o modificado no devuelve un valor viejo.
+
+    Usos:
+        metric(y_true, y_pred)      → ("rmsle", score, False), eval_metric de LGBMRegressor
+        metric.feval(preds, data)   → feval de lgb.train
+        metric.keras()              → métrica de Keras con los mismos parámetros
+        metric.by_segment(...)      → RMSLE por tienda/familia (bincount)
+    """
+    def __init__(self, min_=0.0, scale_=1.0):
+        self.min_ = float(np.ravel(min_)[0])
+        self.scale_ = float(np.ravel(scale_)[0])
+        self._buffers = None
+        self._labels = (None, None, None)
+
+    @classmethod
+    def from_scaler(cls, scaler):
+        return cls(scaler.min_, scaler.scale_)
+
+    def _log1p(self, values, out):
+        # Inversa de MinMaxScaler: x = (x_scaled - min_) / scale_
+        np.subtract(values, self.min_, out=out)
+        np.divide(out, self.scale_, out=out)
+        np.maximum(out, 0.0, out=out)
+        return np.log1p(out, out=out)
+
+    def _buffer(self, n):
+        if self._buffers is None or len(self._buffers[0]) != n:
+            self._buffers = (np.empty(n), np.empty(n))
+        return self._buffers
+
+    @staticmethod
+    def _checksum(y_true):
+        # Barato frente a log1p: forma, suma y ~64 valores repartidos por el arreglo
+        values = np.ravel(y_true)
+        return values.shape, float(values.sum()), values[::max(1, len(values) // 64)].tobytes()
+
+    def _log_true(self, y_true):
+        # Mismo arreglo de etiquetas (y mismo contenido) que la llamada anterior: se reutiliza su log1p
+        checksum = self._checksum(y_true)
+        labels, cached, log_true = self._labels
+        if labels is y_true and cached == checksum:
+            return log_true
+        log_true = self._log1p(np.ravel(y_true), np.empty(np.size(y_true)))
+        self._labels = (y_true, checksum, log_true)
+        return log_true
+
+    def squared_errors(self, y_true, y_pred):
+        """(log1p(y) - log1p(ŷ))² por fila, en un buffer reutilizable."""
+        y_pred = np.ravel(y_pred)
+        diff, _ = self._buffer(len(y_pred))
+        self._log1p(y_pred, diff)
+        np.subtract(self._log_true(y_true), diff, out=diff)
+        return np.square(diff, out=diff)
+
+    def score(self, y_true, y_pred):
+        return float(np.sqrt(self.squared_errors(y_true, y_pred).mean()))
+
+    def __call__(self, y_true, y_pred):
+        return "rmsle", self.score(y_true, y_pred), False
+
+    def feval(self, preds, eval_data):
+        return self(eval_data.get_label(), preds)
+
+    def by_segment(self, y_true, y_pred, segments):
+        """
+        RMSLE por segmento (p. ej. store_nbr o family) con un solo bincount.
+        Returns:
+            pd.DataFrame: índice = segmento, columnas rmsle y n.
+        """
+        codes, uniques = pd.factorize(np.asarray(segments), sort=True)
+        errors = self.squared_errors(y_true, y_pred)
+        counts = np.bincount(codes, minlength=len(uniques))
+        sums = np.bincount(codes, weights=errors, minlength=len(uniques))
+        return pd.DataFrame({"rmsle": np.sqrt(sums / counts), "n": counts}, index=pd.Index(uniques, name="segment"))
+
+    def keras(self):
+        """Métrica de Keras equivalente (min_/scale_ quedan como constantes del grafo)."""
+        import tensorflow as tf # type: ignore
+        min_, scale_ = self.min_, self.scale_
+
+        def rmsle(y_true, y_pred):
+            y_true = tf.maximum((tf.cast(y_true, tf.float32) - min_) / scale_, 0.0)
+            y_pred = tf.maximum((tf.cast(y_pred, tf.float32) - min_) / scale_, 0.0)
+            return tf.sqrt(tf.reduce_mean(tf.square(tf.math.log1p(y_true) - tf.math.log1p(y_pred))))
+        return rmsle
+
+
+def make_rmsle(scaler=None, path=None):
+    """Crea un RMSLE con el scaler dado o, si no, con el guardado en `path` (por defecto el del config)."""
+    if scaler is None:
+        scaler = load_object(path or CONFIG.get_path("scaler"))
+    return RMSLE.from_scaler(scaler)
+
+
+_DEFAULT = {}
+
+def _default_metric():
+    # El scaler se vuelve a leer solo si el archivo cambió desde la última carga
+    path = CONFIG.get_path("scaler")
+    mtime = os.path.getmtime(path)
+    if _DEFAULT.get("key") != (path, mtime):
+        _DEFAULT.update(key=(path, mtime), metric=make_rmsle(path=path))
+    return _DEFAULT["metric"]
+
 def rmsle(y_true, y_pred):
-    scaler = load_object(CONFIG.get_path("scaler"))
-    y_true = np.asarray(y_true).astype(np.float64)
-    y_pred = np.asarray(y_pred).astype(np.float64)
-    y_true = scaler.inverse_transform(y_true.reshape(-1, 1))
-    y_pred = scaler.inverse_transform(y_pred.reshape(-1, 1))
-    y_true = np.clip(y_true, 0, None)
-    y_pred = np.clip(y_pred, 0, None)
-    score = np.sqrt(np.mean(np.square(np.log1p(y_true) - np.log1p(y_pred))))
-    return "rmsle", score, False
\ No newline at end of file
+    return _default_metric()(y_true, y_pred)
+
+def rmsle_score(y_true, y_pred):
+    """RMSLE sobre valores ya en escala original (predicciones negativas se recortan a 0)."""
+    y_true = np.clip(np.asarray(y_true, dtype=np.float64), 0, None)
+    y_pred = np.clip(np.asarray(y_pred, dtype=np.float64), 0, None)
+    return float(np.sqrt(np.mean(np.square(np.log1p(y_true) - np.log1p(y_pred)))))
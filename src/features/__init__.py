@@ -1,8 +1,11 @@
 from .transformers import (
     DatePartAdder,
     CyclicEncoder,
+    CalendarFeatureAdder,
     DataMerger,
+    LookupJoiner,
     WeekendFlagger,
     CategoricalEncoder,
     AdaptiveScaler
-)
\ No newline at end of file
+)
+from .lags import LagFeatureAdder
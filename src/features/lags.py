@@ -0,0 +1,229 @@
+from sklearn.base import BaseEstimator, TransformerMixin
+import numpy as np
+import pandas as pd
+from src.features.transformers import _maybe_copy
+
+
+def _day_numbers(dates):
+    """Días desde 1970-01-01 como enteros (una fecha por fila)."""
+    return pd.DatetimeIndex(pd.to_datetime(dates)).values.astype("datetime64[D]").astype(np.int64)
+
+
+class LagFeatureAdder(BaseEstimator, TransformerMixin):
+    """
+    Agrega lags, medias/desviaciones móviles y EWMAs del target por serie (store_nbr × family).
+
+    En fit se arma una matriz densa serie × día con el target (una sola dispersión, sin
+    groupby) y todas las variables se calculan de forma vectorizada sobre esa matriz:
+    lags por desplazamiento de columnas, ventanas móviles con sumas acumuladas y EWMAs
+    con una recurrencia sobre los días aplicada a todas las series a la vez.
+    Cada variable del día d usa solo días anteriores a d, por lo que no hay fuga del target.
+    Las ventanas y las EWMAs terminan en el día d - `gap` (por defecto el lag más corto, el
+    horizonte del pronóstico directo): así en entrenamiento ven la misma información que
+    en el último día del horizonte de predicción.
+
+    Al serializarse solo se guarda la cola de la historia (max(lags, windows) días) y el
+    estado de las EWMAs, suficiente para predecir los días siguientes; `partial_fit`
+    agrega días nuevos a esa cola sin recalcular el histórico. `history_days` conserva una
+    cola más larga, p. ej. para reentrenar en caliente sobre una ventana reciente.
+    """
+    def __init__(self, group_columns=["store_nbr", "family"], date_column="date", target="sales",
+                 lags=[16, 21, 28], windows=[7, 28], ewm_alphas=[0.1, 0.5], history_days=None, gap=None, copy=True):
+        self.group_columns = group_columns
+        self.date_column = date_column
+        self.target = target
+        self.lags = lags
+        self.windows = windows
+        self.ewm_alphas = ewm_alphas
+        self.history_days = history_days
+        self.gap = gap
+        self.copy = copy
+
+    @property
+    def feature_names(self):
+        names = [f"{self.target}_lag_{k}" for k in self.lags]
+        for w in self.windows:
+            names += [f"{self.target}_roll_mean_{w}", f"{self.target}_roll_std_{w}"]
+        names += [f"{self.target}_ewm_{alpha:g}" for alpha in self.ewm_alphas]
+        return names
+
+    @property
+    def gap_days(self):
+        """Días entre el último día que ven ventanas y EWMAs y el día que se predice."""
+        gap = getattr(self, "gap", None)
+        if gap is None:
+            gap = min(self.lags) if len(self.lags) else 1
+        return max(int(gap), 1)
+
+    @property
+    def tail_days(self):
+        return max(list(self.lags) + [w + self.gap_days - 1 for w in self.windows] + [1])
+
+    @property
+    def keep_days(self):
+        """Días de historia que se persisten al serializar."""
+        return max(self.tail_days, getattr(self, "history_days", None) or 0)
+
+    def _reset(self):
+        self.keys_ = [pd.Index([]) for _ in self.group_columns]
+        self.series_lookup_ = np.full([0] * len(self.group_columns), -1, dtype=np.int64)
+        self.history_ = np.empty((0, 0), dtype=np.float32)
+        self.start_day_ = None
+        self.ewm_state_ = np.empty((0, len(self.ewm_alphas)))
+        self.trimmed_ = False
+
+    def _codes(self, i, values, grow=False):
+        """Código de cada fila en las claves de la columna i; con grow=True agrega las nuevas."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.cat.categories.dtype)
+        codes = self.keys_[i].get_indexer(values)
+        if grow and (codes < 0).any():
+            new = pd.Index(pd.unique(values[codes < 0]))
+            self.keys_[i] = self.keys_[i].append(new) if len(self.keys_[i]) else new
+            codes = self.keys_[i].get_indexer(values)
+        return codes
+
+    def _series_ids(self, X, grow=False):
+        codes = [self._codes(i, X[col], grow) for i, col in enumerate(self.group_columns)]
+        shape = tuple(len(keys) for keys in self.keys_)
+        if shape != self.series_lookup_.shape:
+            lookup = np.full(shape, -1, dtype=np.int64)
+            lookup[tuple(slice(0, n) for n in self.series_lookup_.shape)] = self.series_lookup_
+            self.series_lookup_ = lookup
+        valid = np.all([c >= 0 for c in codes], axis=0)
+        ids = np.full(len(X), -1, dtype=np.int64)
+        ids[valid] = self.series_lookup_[tuple(c[valid] for c in codes)]
+        if grow and (ids[valid] < 0).any():
+            # Series nuevas: se numeran a continuación de las existentes
+            flat = np.ravel_multi_index(tuple(c[valid] for c in codes), shape)
+            new_flat = np.unique(flat[ids[valid] < 0])
+            n_series = len(self.history_)
+            self.series_lookup_.flat[new_flat] = n_series + np.arange(len(new_flat))
+            self.history_ = np.vstack([self.history_, np.full((len(new_flat), self.history_.shape[1]), np.nan, dtype=np.float32)])
+            self.ewm_state_ = np.vstack([self.ewm_state_, np.full((len(new_flat), len(self.ewm_alphas)), np.nan)])
+            ids[valid] = self.series_lookup_[tuple(c[valid] for c in codes)]
+        return ids
+
+    def _target(self, X, y):
+        if y is not None:
+            return np.asarray(y, dtype=np.float64).ravel()
+        if self.target in X.columns:
+            return X[self.target].to_numpy(dtype=np.float64)
+        raise ValueError(f"LagFeatureAdder necesita el target: pase y o incluya '{self.target}' en X.")
+
+    def fit(self, X, y=None):
+        self._reset()
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """Agrega observaciones (días nuevos o series nuevas) a la historia."""
+        self.fit_flag_ = True
+        if not hasattr(self, "history_"):
+            self._reset()
+        values = self._target(X, y)
+        ids = self._series_ids(X, grow=True)
+        days = _day_numbers(X[self.date_column])
+        if not len(days):
+            return self
+        first, last = days.min(), days.max()
+        if self.start_day_ is None:
+            self.start_day_ = first
+            self.history_ = np.full((len(self.history_), 0), np.nan, dtype=np.float32)
+        if first < self.start_day_:
+            if self.trimmed_:
+                raise ValueError("La historia ya fue recortada: no se pueden agregar días anteriores a su inicio.")
+            pad = np.full((len(self.history_), self.start_day_ - first), np.nan, dtype=np.float32)
+            self.history_ = np.hstack([pad, self.history_])
+            self.start_day_ = first
+        n_days = last - self.start_day_ + 1
+        if n_days > self.history_.shape[1]:
+            pad = np.full((len(self.history_), n_days - self.history_.shape[1]), np.nan, dtype=np.float32)
+            self.history_ = np.hstack([self.history_, pad])
+        keep = ids >= 0
+        self.history_[ids[keep], days[keep] - self.start_day_] = values[keep]
+        return self
+
+    def _ewm(self, history):
+        """Estado de cada EWMA antes de cada día: matriz (series, días + 1, alphas)."""
+        n_series, n_days = history.shape
+        states = np.empty((n_series, n_days + 1, len(self.ewm_alphas)))
+        state = self.ewm_state_.copy()
+        states[:, 0] = state
+        for j in range(n_days):
+            x = history[:, j, None]
+            observed = ~np.isnan(x)
+            updated = np.where(np.isnan(state), x, np.asarray(self.ewm_alphas) * x + (1 - np.asarray(self.ewm_alphas)) * state)
+            state = np.where(observed, updated, state)
+            states[:, j + 1] = state
+        return states
+
+    def features(self, days):
+        """
+        Calcula las variables para un arreglo de días únicos (posiciones relativas al inicio
+        de la historia). Devuelve un dict nombre → matriz (series, len(days)).
+        """
+        history = self.history_.astype(np.float64)
+        n_series, n_days = history.shape
+        out = {}
+        for k in self.lags:
+            source = days - k
+            valid = (source >= 0) & (source < n_days)
+            lagged = np.full((n_series, len(days)), np.nan)
+            lagged[:, valid] = history[:, source[valid]]
+            out[f"{self.target}_lag_{k}"] = lagged
+
+        if self.windows:
+            observed = ~np.isnan(history)
+            filled = np.where(observed, history, 0.0)
+            zeros = np.zeros((n_series, 1))
+            sums = np.hstack([zeros, np.cumsum(filled, axis=1)])
+            squares = np.hstack([zeros, np.cumsum(filled ** 2, axis=1)])
+            counts = np.hstack([zeros, np.cumsum(observed, axis=1)])
+            end = days - self.gap_days + 1
+            hi = np.clip(end, 0, n_days)
+            for w in self.windows:
+                lo = np.clip(end - w, 0, n_days)
+                n = counts[:, hi] - counts[:, lo]
+                total = sums[:, hi] - sums[:, lo]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    mean = np.where(n > 0, total / n, np.nan)
+                    var = (squares[:, hi] - squares[:, lo] - total * mean) / (n - 1)
+                    std = np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+                out[f"{self.target}_roll_mean_{w}"] = mean
+                out[f"{self.target}_roll_std_{w}"] = std
+
+        if self.ewm_alphas:
+            states = self._ewm(history)
+            positions = days - self.gap_days + 1
+            before_start = positions < 0
+            positions = np.clip(positions, 0, n_days)
+            for i, alpha in enumerate(self.ewm_alphas):
+                values = states[:, positions, i]
+                values[:, before_start] = np.nan
+                out[f"{self.target}_ewm_{alpha:g}"] = values
+        return out
+
+    def transform(self, X):
+        X = _maybe_copy(self, X)
+        ids = self._series_ids(X)
+        days = _day_numbers(X[self.date_column]) - self.start_day_
+        unique_days, day_codes = np.unique(days, return_inverse=True)
+        known = ids >= 0
+        for name, matrix in self.features(unique_days).items():
+            values = np.full(len(X), np.nan, dtype=np.float32)
+            values[known] = matrix[ids[known], day_codes[known]]
+            X[name] = values
+        return X
+
+    def __getstate__(self):
+        # En Python 3.11+ super().__getstate__() devuelve el propio __dict__: se recorta una copia
+        state = dict(super().__getstate__())
+        if state.get("history_") is None or state["history_"].shape[1] <= self.keep_days:
+            return state
+        # Solo se persiste la cola: el estado de las EWMAs avanza hasta el nuevo inicio
+        drop = state["history_"].shape[1] - self.keep_days
+        state["ewm_state_"] = self._ewm(self.history_[:, :drop].astype(np.float64))[:, -1] if self.ewm_alphas else self.ewm_state_
+        state["history_"] = self.history_[:, drop:].copy()
+        state["start_day_"] = self.start_day_ + drop
+        state["trimmed_"] = True
+        return state
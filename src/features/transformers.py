@@ -2,6 +2,37 @@ from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import MinMaxScaler
 import numpy as np
 import pandas as pd
+from src.data.cache import read_source
+
+# date(1970, 1, 1).toordinal(): permite calcular el ordinal sin llamar a Python por fila
+_EPOCH_ORDINAL = 719163
+
+
+def _factorize_dates(dates):
+    """Devuelve los códigos por fila y las fechas únicas (DatetimeIndex)."""
+    codes, uniques = pd.factorize(dates)
+    return codes, pd.DatetimeIndex(uniques)
+
+
+def _broadcast(values, codes):
+    """Propaga a cada fila valores calculados por valor único. Código -1 (nulo) → NaN."""
+    values = np.asarray(values)
+    if (codes < 0).any():
+        values = np.append(values.astype(float), np.nan)
+        codes = np.where(codes < 0, len(values) - 1, codes)
+    return values[codes]
+
+
+def _maybe_copy(transformer, X):
+    """
+    Copia la entrada salvo que el transformer esté en modo in-place (copy=False).
+    Los pipelines guardados antes de existir `copy` se comportan como copy=True.
+    """
+    return X.copy() if getattr(transformer, "copy", True) else X
+
+
+def _date_ordinal(dates):
+    return dates.values.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
 
 
 class DatePartAdder(BaseEstimator, TransformerMixin):
@@ -9,8 +40,9 @@ class DatePartAdder(BaseEstimator, TransformerMixin):
     Extrae componentes temporales (día, mes, día de la semana)
     a partir de una columna de fecha especificada.
     """
-    def __init__(self, date_column="date"):
+    def __init__(self, date_column="date", copy=True):
         self.date_column = date_column
+        self.copy = copy
 
     def fit(self, X, y=None):
         self.fit_flag_ = True 
@@ -19,12 +51,14 @@ class DatePartAdder(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         # Crea nuevas columnas: 'day', 'month', 'weekday' a partir de la fecha
-        X = X.copy()
+        X = _maybe_copy(self, X)
         X[self.date_column] = pd.to_datetime(X[self.date_column])
-        X["day"] = X[self.date_column].dt.day
-        X["month"] = X[self.date_column].dt.month
-        X["weekday"] = X[self.date_column].dt.weekday
-        X["date_ordinal"] = X[self.date_column].dt.date.map(lambda d: d.toordinal())
+        # Se calcula una vez por fecha única y se propaga con los códigos de cada fila
+        codes, dates = _factorize_dates(X[self.date_column])
+        X["day"] = _broadcast(dates.day, codes)
+        X["month"] = _broadcast(dates.month, codes)
+        X["weekday"] = _broadcast(dates.weekday, codes)
+        X["date_ordinal"] = _broadcast(_date_ordinal(dates), codes)
         return X
 
 
@@ -32,59 +66,162 @@ class CategoricalEncoder(BaseEstimator, TransformerMixin):
     """
     Codifica columnas categóricas especificadas como enteros únicos
     mediante asignación por índice ordenado.
+
+    El lookup (un pd.Index ordenado por columna) se construye una vez en fit y transform
+    codifica con `get_indexer`; si la columna ya es `category` solo se traducen sus
+    categorías y se reutilizan sus códigos. Valores no vistos → -1. La salida usa el
+    entero más estrecho. `partial_fit` une las categorías vistas en varios lotes.
     """
-    def __init__(self, columns=["store_nbr", "family"]):
+    def __init__(self, columns=["store_nbr", "family"], copy=True):
         self.columns = columns
-        self.category_maps = {}
+        self.copy = copy
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        # Pipelines guardados con el formato anterior: Series ordenada en `category_maps`
+        if "category_maps" in state and "categories_" not in state:
+            category_maps = self.__dict__.pop("category_maps")
+            self.categories_ = {col: pd.Index(cats.dropna().to_numpy()) for col, cats in category_maps.items()}
+
+    @staticmethod
+    def _uniques(values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Solo las categorías realmente presentes, sin recorrer los valores como objetos
+            codes = pd.unique(values.cat.codes.to_numpy())
+            return values.cat.categories[np.sort(codes[codes >= 0])]
+        return pd.Index(values.dropna().unique())
 
     def fit(self, X, y=None):
+        self.__dict__.pop("categories_", None)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """Agrega las categorías de un lote a las ya vistas, manteniendo el orden."""
         self.fit_flag_ = True
-        # Guarda la lista ordenada de categorías para cada columna
+        if not hasattr(self, "categories_"):
+            self.categories_ = {}
         for col in self.columns:
-            self.category_maps[col] = pd.Series(X[col].unique()).sort_values().reset_index(drop=True)
+            uniques = self._uniques(X[col])
+            known = self.categories_.get(col)
+            merged = uniques if known is None else known.append(uniques).unique()
+            try:
+                self.categories_[col] = pd.Index(merged).sort_values()
+            except TypeError:
+                self.categories_[col] = pd.Index(merged)
         return self
 
+    @staticmethod
+    def _code_dtype(n_categories):
+        for dtype in (np.int8, np.int16, np.int32):
+            if n_categories <= np.iinfo(dtype).max:
+                return dtype
+        return np.int64
+
+    def encode(self, col, values):
+        """Códigos enteros de una columna según las categorías ajustadas (-1 si no se vio)."""
+        categories = self.categories_[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            lookup = np.append(categories.get_indexer(values.cat.categories), -1)
+            encoded = lookup[values.cat.codes.to_numpy()]
+        else:
+            encoded = categories.get_indexer(values)
+        return encoded.astype(self._code_dtype(len(categories)))
+
     def transform(self, X):
         # Convierte las categorías en índices numéricos
-        X = X.copy()
+        X = _maybe_copy(self, X)
         for col in self.columns:
-            cat_list = self.category_maps[col]
-            cat_to_idx = {cat: idx for idx, cat in enumerate(cat_list)}
-            X[col] = X[col].map(cat_to_idx).fillna(-1).astype(int)
+            X[col] = self.encode(col, X[col])
         return X
 
 
 class AdaptiveScaler(BaseEstimator, TransformerMixin):
     """
-    Aplica MinMaxScaler individualmente a columnas numéricas especificadas.
-    Guarda el escalador de cada columna para aplicar la misma transformación en test.
+    Escala min-max las columnas numéricas no excluidas, equivalente a un MinMaxScaler por columna.
+    Mínimos y rangos se calculan en una sola pasada vectorizada y el bloque numérico
+    se transforma como una única matriz. `partial_fit` permite ajustarlo por lotes.
+
+    dtype: tipo de salida del bloque escalado (p. ej. np.float32); None → float64.
     """
-    def __init__(self, excluded_columns=["store_nbr", "family"]):
-        self.excluded_col = excluded_columns
-        self.scalers = {}
+    def __init__(self, excluded_columns=["store_nbr", "family"], dtype=None, copy=True):
+        self.excluded_columns = excluded_columns
+        self.dtype = dtype
+        self.copy = copy
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.__dict__.setdefault("dtype", None)
+        if "excluded_col" in state:
+            self.excluded_columns = self.__dict__.pop("excluded_col")
+        # Pipelines guardados con el formato anterior: un MinMaxScaler por columna
+        if "scalers" in state and "columns_" not in state:
+            scalers = self.__dict__.pop("scalers")
+            self.__dict__.pop("columns", None)
+            self.columns_ = list(scalers)
+            self.data_min_ = np.array([scalers[col].data_min_[0] for col in self.columns_], dtype=np.float64)
+            self.data_max_ = np.array([scalers[col].data_max_[0] for col in self.columns_], dtype=np.float64)
+            self.n_samples_seen_ = max((int(s.n_samples_seen_) for s in scalers.values()), default=0)
+            self._update_scale()
+
+    def _reset(self):
+        for attr in ("columns_", "data_min_", "data_max_", "n_samples_seen_", "scale_", "min_"):
+            self.__dict__.pop(attr, None)
+
+    def _update_scale(self):
+        data_range = self.data_max_ - self.data_min_
+        # Igual que MinMaxScaler: columnas constantes no se dividen por cero
+        data_range[data_range == 0.0] = 1.0
+        self.scale_ = 1.0 / data_range
+        self.min_ = -self.data_min_ * self.scale_
 
     def fit(self, X, y=None):
+        self._reset()
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """Actualiza mínimos y máximos con un lote; las columnas se fijan con el primer lote."""
         self.fit_flag_ = True
-        # Ajusta un MinMaxScaler por cada columna presente
-        cols_to_use = X.columns.difference(self.excluded_col + ["date"])
-        self.columns = X[cols_to_use]
-        for col in self.columns:
-            if col in X.columns:
-                scaler = MinMaxScaler()
-                scaler.fit(X[[col]])
-                self.scalers[col] = scaler
+        if not hasattr(self, "columns_"):
+            self.columns_ = list(X.columns.difference(self.excluded_columns + ["date"]))
+            self.data_min_ = np.full(len(self.columns_), np.inf)
+            self.data_max_ = np.full(len(self.columns_), -np.inf)
+            self.n_samples_seen_ = 0
+        if len(X):
+            block = X[self.columns_].to_numpy(dtype=np.float64)
+            self.data_min_ = np.fmin(self.data_min_, np.nanmin(block, axis=0))
+            self.data_max_ = np.fmax(self.data_max_, np.nanmax(block, axis=0))
+            self.n_samples_seen_ += len(X)
+        self._update_scale()
         return self
 
     def transform(self, X):
-        # Aplica el MinMaxScaler correspondiente a cada columna
-        X = X.copy()
-        for col in self.columns:
-            if col in X.columns and col in self.scalers:
-                X[col] = self.scalers[col].transform(X[[col]])
+        X = _maybe_copy(self, X)
+        positions = [i for i, col in enumerate(self.columns_) if col in X.columns]
+        if not positions:
+            return X
+        cols = [self.columns_[i] for i in positions]
+        # Una sola matriz propia para todo el bloque numérico (con Copy-on-Write la vista es de
+        # solo lectura); las operaciones son in-place sobre ella
+        block = X[cols].to_numpy(dtype=np.float64 if self.dtype is None else self.dtype, copy=True)
+        block *= self.scale_[positions].astype(block.dtype)
+        block += self.min_[positions].astype(block.dtype)
+        X[cols] = block
         return X
-    
+
     def get_scaler(self, col_name):
-        return self.scalers.get(col_name, None)
+        """Devuelve un MinMaxScaler equivalente para una columna, o None si no se escaló."""
+        if col_name not in getattr(self, "columns_", []):
+            return None
+        i = self.columns_.index(col_name)
+        scaler = MinMaxScaler()
+        scaler.n_features_in_ = 1
+        scaler.n_samples_seen_ = self.n_samples_seen_
+        scaler.data_min_ = self.data_min_[i:i + 1].copy()
+        scaler.data_max_ = self.data_max_[i:i + 1].copy()
+        scaler.data_range_ = scaler.data_max_ - scaler.data_min_
+        scaler.scale_ = self.scale_[i:i + 1].copy()
+        scaler.min_ = self.min_[i:i + 1].copy()
+        return scaler
 
 
 class CyclicEncoder(BaseEstimator, TransformerMixin):
@@ -99,36 +236,87 @@ class CyclicEncoder(BaseEstimator, TransformerMixin):
             "day": 31,
             "month": 12,
             "weekday": 7
-        }):
+        }, copy=True):
         self.columns_config = columns_config if columns_config else {}
+        self.copy = copy
 
     def fit(self, X, y=None):
         self.fit_flag_ = True 
         return self  # no entrena nada, es determinista
 
     def transform(self, X):
-        X = X.copy()
+        X = _maybe_copy(self, X)
         for col, period in self.columns_config.items():
-            X[f"{col}_sin"] = np.sin(2 * np.pi * X[col] / period)
-            X[f"{col}_cos"] = np.cos(2 * np.pi * X[col] / period)
+            # Seno y coseno por valor único (31, 12 o 7 valores) en lugar de por fila
+            codes, uniques = pd.factorize(X[col])
+            angle = 2 * np.pi * np.asarray(uniques, dtype=float) / period
+            X[f"{col}_sin"] = _broadcast(np.sin(angle), codes)
+            X[f"{col}_cos"] = _broadcast(np.cos(angle), codes)
             X.drop(columns=[col], inplace=True)
         return X
 
 
+class CalendarFeatureAdder(BaseEstimator, TransformerMixin):
+    """
+    Motor de variables de calendario: equivale a DatePartAdder + WeekendFlagger + CyclicEncoder
+    en un solo paso. Calcula ordinal, fin de semana y codificación cíclica una vez por
+    fecha única (~1.700 en el dataset) y las propaga a las filas con los códigos
+    factorizados de la fecha.
+
+    columns_config: dict {parte de la fecha: periodo}, con partes 'day', 'month' o 'weekday'.
+    """
+    def __init__(self, date_column="date", columns_config={
+            "day": 31,
+            "month": 12,
+            "weekday": 7
+        }, copy=True):
+        self.date_column = date_column
+        self.columns_config = columns_config if columns_config else {}
+        self.copy = copy
+
+    def fit(self, X, y=None):
+        self.fit_flag_ = True
+        return self
+
+    def calendar(self, dates):
+        """Tabla de variables de calendario para un DatetimeIndex de fechas únicas."""
+        parts = {"day": dates.day, "month": dates.month, "weekday": dates.weekday}
+        features = {
+            "date_ordinal": _date_ordinal(dates),
+            "is_weekend": np.isin(dates.weekday, [5, 6]).astype(int),
+        }
+        for col, period in self.columns_config.items():
+            if col not in parts:
+                raise ValueError(f"'{col}' no es una parte de fecha soportada: {list(parts)}")
+            angle = 2 * np.pi * np.asarray(parts[col], dtype=float) / period
+            features[f"{col}_sin"] = np.sin(angle)
+            features[f"{col}_cos"] = np.cos(angle)
+        return features
+
+    def transform(self, X):
+        X = _maybe_copy(self, X)
+        X[self.date_column] = pd.to_datetime(X[self.date_column])
+        codes, dates = _factorize_dates(X[self.date_column])
+        for name, values in self.calendar(dates).items():
+            X[name] = _broadcast(values, codes)
+        return X
+
+
 class WeekendFlagger(BaseEstimator, TransformerMixin):
     """
     Agrega una columna binaria 'is_weekend' basada en la columna 'weekday'.
     Asume que los valores de 'weekday' están en formato 0=Lunes ... 6=Domingo.
     """
-    def __init__(self, weekday_col="weekday"):
+    def __init__(self, weekday_col="weekday", copy=True):
         self.weekday_col = weekday_col
+        self.copy = copy
 
     def fit(self, X, y=None):
         self.fit_flag_ = True
         return self
 
     def transform(self, X):
-        X = X.copy()
+        X = _maybe_copy(self, X)
         if self.weekday_col in X.columns:
             X["is_weekend"] = X[self.weekday_col].isin([5, 6]).astype(int)
         else:
@@ -140,14 +328,15 @@ class DataMerger(BaseEstimator, TransformerMixin):
     """
     Une columnas de metadata de tienda al dataset principal usando 'store_nbr' como clave.
     """
-    def __init__(self, metadata_path='data/raw/stores.csv', on="store_nbr"):
+    def __init__(self, metadata_path='data/raw/stores.csv', on="store_nbr", copy=True):
         self.metadata_path = metadata_path
         self.on = on
+        self.copy = copy
         self.metadata = None
 
     def fit(self, X, y=None):
         self.fit_flag_ = True
-        self.metadata = pd.read_csv(self.metadata_path)
+        self.metadata = read_source(self.metadata_path, pd.read_csv)
         if 'date' in self.metadata.columns:
             self.metadata['date'] = pd.to_datetime(self.metadata['date'])
             self.metadata['dcoilwtico'] = self.metadata['dcoilwtico'].interpolate(method="linear", limit_direction="both")
@@ -156,11 +345,93 @@ class DataMerger(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        X = X.copy()
+        X = _maybe_copy(self, X)
         if self.on not in X.columns:
             raise ValueError(f"La columna '{self.on}' no está en el DataFrame de entrada.")
         X = X.merge(self.metadata, how="left", on=self.on)
         null_cols = X.columns[X.isnull().any()]
         for col in null_cols:
             X[col] = X[col].ffill()
-        return X
\ No newline at end of file
+        return X
+
+class LookupJoiner(BaseEstimator, TransformerMixin):
+    """
+    Une las columnas de una tabla de dimensión pequeña (stores.csv, oil.csv) sin `merge`:
+    en fit precalcula un arreglo denso clave → fila y en transform recoge cada columna
+    por indexación entera. Conserva el orden y el índice de la entrada.
+
+    - Clave entera (store_nbr): arreglo de tamaño max(clave) + 1. Claves desconocidas → NaN.
+    - Clave de fecha (date): calendario diario continuo con las columnas numéricas
+      interpoladas linealmente; fechas fuera del rango toman el valor del extremo más cercano.
+    Las columnas de texto se guardan como códigos + categorías y salen como `category`.
+    """
+    def __init__(self, metadata_path='data/raw/stores.csv', on="store_nbr", copy=True):
+        self.metadata_path = metadata_path
+        self.on = on
+        self.copy = copy
+
+    def fit(self, X, y=None):
+        self.fit_flag_ = True
+        metadata = read_source(self.metadata_path, pd.read_csv)
+        if self.on not in metadata.columns:
+            raise ValueError(f"La columna '{self.on}' no está en la metadata.")
+        self.is_date_ = not pd.api.types.is_numeric_dtype(metadata[self.on])
+        if self.is_date_:
+            metadata = self._calendar(metadata)
+            self.origin_ = int(_date_ordinal(metadata.index[:1])[0])
+            self.n_days_ = len(metadata)
+        else:
+            keys = metadata[self.on].to_numpy(dtype=np.int64)
+            if (keys < 0).any() or pd.Series(keys).duplicated().any():
+                raise ValueError(f"La clave '{self.on}' debe ser entera, no negativa y única.")
+            self.lookup_ = np.full(keys.max() + 1, -1, dtype=np.intp)
+            self.lookup_[keys] = np.arange(len(keys))
+            metadata = metadata.drop(columns=[self.on])
+
+        self.columns_ = {}
+        for col in metadata.columns:
+            if pd.api.types.is_numeric_dtype(metadata[col]):
+                self.columns_[col] = metadata[col].to_numpy()
+            else:
+                self.columns_[col] = pd.Categorical(metadata[col])
+        return self
+
+    def _calendar(self, metadata):
+        """Reindexa la metadata a un calendario diario e interpola los huecos (fines de semana, feriados)."""
+        metadata[self.on] = pd.to_datetime(metadata[self.on])
+        metadata = metadata.drop_duplicates(self.on).set_index(self.on).sort_index()
+        calendar = pd.date_range(metadata.index.min(), metadata.index.max(), freq="D")
+        metadata = metadata.reindex(calendar)
+        numeric = metadata.select_dtypes("number").columns
+        metadata[numeric] = metadata[numeric].interpolate(method="time", limit_direction="both")
+        return metadata.ffill().bfill()
+
+    def _rows(self, keys):
+        """Fila de la metadata para cada clave de la entrada (-1 si no existe)."""
+        if self.is_date_:
+            dates = pd.DatetimeIndex(pd.to_datetime(keys))
+            positions = _date_ordinal(dates) - self.origin_
+            rows = np.clip(positions, 0, self.n_days_ - 1)
+            return np.where(dates.isna(), -1, rows)
+        keys = np.asarray(keys)
+        valid = (keys >= 0) & (keys < len(self.lookup_))
+        return np.where(valid, self.lookup_[np.where(valid, keys, 0)], -1)
+
+    def transform(self, X):
+        X = _maybe_copy(self, X)
+        if self.on not in X.columns:
+            raise ValueError(f"La columna '{self.on}' no está en el DataFrame de entrada.")
+        rows = self._rows(X[self.on])
+        missing = rows < 0
+        has_missing = missing.any()
+        for col, values in self.columns_.items():
+            if isinstance(values, pd.Categorical):
+                codes = np.where(missing, -1, values.codes[rows])
+                X[col] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+            elif has_missing:
+                gathered = values[rows].astype(float)
+                gathered[missing] = np.nan
+                X[col] = gathered
+            else:
+                X[col] = values[rows]
+        return X
@@ -2,12 +2,15 @@ from src.models.generador_modelos_v3 import HybridModel
 from src.pipelines.procesador_datos import DataManager
 from pprint import pprint
 from tensorflow.keras.optimizers import Adam # type: ignore
-from src.evaluation.metrics import rmsle
+from src.evaluation.metrics import make_rmsle
+from src.pipelines.window_dataset import ThroughputLogger
 
 data_manager = DataManager()
 model = HybridModel(data_manager.generate_metadata())
-x_train, y_train, x_val, y_val = data_manager.build_input_data(load=False)
+# Ventanas desde el bundle en memmap (paths.window_bundle); se genera en la primera corrida
+train_ds, val_ds = data_manager.build_input_data(batch_size=1024)
+rmsle = make_rmsle(scaler=data_manager.target_scaler).keras()
 optimizer = Adam(learning_rate=0.01)
 model.compile(optimizer=optimizer, loss='mse', metrics=[rmsle])
 model.summary()
-history = model.fit(x_train, y_train, validation_data=(x_val, y_val), epochs=100, batch_size=1024, shuffle=True)
\ No newline at end of file
+history = model.fit(train_ds, validation_data=val_ds, epochs=100, callbacks=[ThroughputLogger(data_manager.n_train)])
\ No newline at end of file
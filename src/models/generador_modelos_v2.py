@@ -98,8 +98,8 @@ data_manager = DataManager()
 hybridModel = HybridModelBuilder(data_manager.generate_metadata())
 modelo = hybridModel.construir_modelo()
 modelo.summary()
-x_train, y_train, x_val, y_val = data_manager.build_input_data()
+train_ds, val_ds = data_manager.build_input_data(batch_size=1024)
 optimizer = Adam(learning_rate=0.0001)
 modelo.compile(optimizer=optimizer, loss='mse', metrics=['mse'])
-history = modelo.fit(x_train, y_train, validation_data=(x_val, y_val), epochs=100, batch_size=1024)
+history = modelo.fit(train_ds, validation_data=val_ds, epochs=100)
 """
\ No newline at end of file
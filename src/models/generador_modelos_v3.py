@@ -18,7 +18,7 @@ class HybridModel(Model):
         super(HybridModel, self).__init__()
         
         self.categorical_features = metadata['categorical']
-        self.timesteps = self._load_config()['timesteps']
+        self.timesteps = metadata.get('timesteps') or self._load_config()['model']['hybrid']['timesteps']
         self.var_numericas = metadata['var_num']
 
         # Crear módulos de embedding para variables categóricas
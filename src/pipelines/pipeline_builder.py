@@ -1,5 +1,5 @@
 from sklearn.pipeline import Pipeline
-from src.features import DatePartAdder, DataMerger, CategoricalEncoder, CyclicEncoder, WeekendFlagger, AdaptiveScaler 
+from src.features import CalendarFeatureAdder, LookupJoiner, CategoricalEncoder, AdaptiveScaler, LagFeatureAdder
 from lightgbm import LGBMRegressor
 from src.config import CONFIG
 
@@ -7,31 +7,66 @@ class PipelineBuilder:
     def __init__(self, config=CONFIG):
         self.cat_columns = config.get_variable('categorical', flatten=True)
         self.model_params = config.get_model_params()
+        self.inplace = config.get_section("pipeline").get("inplace", False)
+        self.lag_params = config.get_section("features").get("lags", {})
+        self.group_columns = config.get_variable('categorical')['static']['default']
+        self.target = config.get_variable('target')
+        self.date = config.get_variable('date')
         self.preprocessor = self.build_preprocessor_pipeline()
 
-    def build_preprocessor_pipeline(self, metadata_path=CONFIG.get_path('store_metadata'), oil_path=CONFIG.get_path('oil_path')):
-        return Pipeline([
-            # 1. Añadir metadata de tienda (store_nbr → ciudad, tipo, etc.)
-            ("merge_metadata", DataMerger(metadata_path=metadata_path, on='store_nbr')),
+    def build_preprocessor_pipeline(self, metadata_path=CONFIG.get_path('store_metadata'), oil_path=CONFIG.get_path('oil_path'), inplace=None):
+        """
+        Ensambla el pipeline de preprocesamiento.
+        Con inplace=True (por defecto según `pipeline.inplace` del config) solo el primer
+        paso copia la entrada; el resto agrega o reemplaza columnas sobre ese DataFrame.
+        """
+        steps = [
+            # 1. Añadir metadata de tienda (store_nbr → ciudad, tipo, etc.) por lookup entero
+            ("merge_metadata", LookupJoiner(metadata_path=metadata_path, on='store_nbr')),
 
-            # 1. Añadir data de precios del petroleo (date → oil_price)
-            ("merge_oil_price", DataMerger(metadata_path=oil_path, on='date')),
+            # 1. Añadir data de precios del petroleo (date → oil_price) desde un calendario interpolado
+            ("merge_oil_price", LookupJoiner(metadata_path=oil_path, on='date')),
 
-            # 2. Extraer partes de la fecha (day, month, weekday)
-            ("date_parts", DatePartAdder()),
+            # 2. Variables de calendario por fecha única (ordinal, fin de semana, seno/coseno)
+            ("calendar", CalendarFeatureAdder()),
 
             # 3. Codificar categorías a enteros
             ("categorical", CategoricalEncoder(columns=self.cat_columns)),
 
-            # 4. Agregar flag binario para fin de semana
-            ("weekend_flag", WeekendFlagger()),
+            # 4. Escalar numéricos de forma adaptable
+            ("scaling", AdaptiveScaler(excluded_columns=self.cat_columns)),
+        ]
+        lags = self.build_lag_step()
+        if lags is not None:
+            # Lags/ventanas sobre store_nbr y family originales, antes de codificarlas
+            steps.insert(2, ("lags", lags))
+        pipeline = Pipeline(steps)
+        if self.inplace if inplace is None else inplace:
+            self.set_inplace(pipeline)
+        return pipeline
+
+    def build_lag_step(self):
+        """LagFeatureAdder según `features.lags` del config, o None si está deshabilitado."""
+        params = dict(self.lag_params)
+        if not params.pop("enabled", False):
+            return None
+        return LagFeatureAdder(group_columns=self.group_columns, date_column=self.date, target=self.target, **params)
 
-            # 5. Codificación cíclica para variables temporales
-            ("cyclic", CyclicEncoder()),
+    @staticmethod
+    def set_inplace(pipeline):
+        """Copia explícita solo en la frontera del pipeline; los pasos siguientes trabajan in-place."""
+        for i, (_, step) in enumerate(pipeline.steps):
+            step.copy = i == 0
+        return pipeline
 
-            # 6. Escalar numéricos de forma adaptable
-            ("scaling", AdaptiveScaler(excluded_columns=self.cat_columns)),
-        ])
+    @staticmethod
+    def transform_chunks(pipeline, chunks):
+        """
+        Aplica un pipeline ya ajustado sobre un iterador de lotes (p. ej. `DataLoader.iter_train`)
+        y devuelve otro iterador, sin materializar el dataset completo.
+        """
+        for chunk in chunks:
+            yield pipeline.transform(chunk)
 
     def build_lgbm_pipeline(self, model_params=None):
         if model_params is None:
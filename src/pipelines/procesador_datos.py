@@ -1,55 +1,239 @@
+import json
 import yaml
 import time
 import pickle
-import requests
-import tensorflow as tf
+import hashlib
+import logging
+from functools import cached_property, partial
+from pathlib import Path
 from tqdm import tqdm
-from pandas import read_csv, Categorical
-from numpy import array, full, concatenate, newaxis
+from pandas import read_csv, read_feather, Categorical, Index
+from numpy import float32, int32, newaxis
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
+from src.data.series_store import SeriesStore, sliding_windows
+from src.data.window_bundle import WindowBundle
+from src.data.cache import is_remote, read_source, source_version
+from src.config import CONFIG
+from src.pipelines.window_dataset import BundleDatasetBuilder
+
+logger = logging.getLogger(CONFIG.logger_name)
 
 class DataManager():
+    """
+    Prepara los datos del modelo híbrido en etapas perezosas:
+
+        df_train (carga cruda) → df_encoded (categorías y fechas) → X_train_raw (normalizado)
+        → train_data (bundle de ventanas) ; metadata (dimensiones para HybridModel)
+
+    Cada etapa se calcula la primera vez que se accede a ella, registra su tiempo y,
+    con `transformations.persist`, se guarda en `paths.data_manager/<huella del config>`.
+    Construir HybridModel solo necesita `metadata`, que se lee de disco sin tocar los datos
+    ni la red: para una fuente remota se usa la última versión registrada de la fuente.
+    Cada etapa trabaja sobre una copia de la anterior: `df_train` y `df_encoded` conservan
+    su contenido aunque después se normalice. El scaler del target se guarda junto a la
+    etapa normalize (`target_scaler_path`), así corresponde siempre a esta huella.
+    """
     def __init__(self):
-        # Load data
-        start_time = time.time()
         config = self._load_config()
-        self.df_train = read_csv(config['paths']['train'], parse_dates=['date'], index_col='id')
-        self.df_test = read_csv(config['paths']['test'], parse_dates=['date'], index_col='id')
-        self.train_data_path = config['paths']['train_data']
-        self.scaler_path = config['paths']['scaler']
-        self.timesteps = config['timesteps']
-        self.normalize = config['transformations']['normalize']
-        self.date_columns = config['transformations']['date_columns']
-        self.var_cat_st = config['variables']['categorical']['static']
+        self.config = config
+        self.train_path = config['paths']['train']
+        self.test_path = config['paths']['test']
+        self.window_bundle_path = config['paths']['window_bundle']
+        self.timesteps = config['model']['hybrid']['timesteps']
+        transformations = config.get('transformations', {})
+        self.normalize = transformations.get('normalize', True)
+        self.date_columns = transformations.get('date_columns', True)
+        self.persist = transformations.get('persist', True)
+        self.var_cat_st = config['variables']['categorical']['static']['default']
         self.var_cat_dy = config['variables']['categorical']['dynamic']
         self.var_cat = self.var_cat_st + self.var_cat_dy
         self.target = config['variables']['target']
-        self.categories = {}
-        self.atributos = ['x_store','x_family', 'xy_historic', 'x_current','y_current']       
-        self.X_train_raw = self._transform_df(self.df_train)
-        end_time = time.time()
-        print(f"Inicialización terminada: {end_time - start_time:.4f} segundos")
+        self.atributos = ['x_store','x_family', 'xy_historic', 'x_current','y_current']
+        self.timings = {}
     
     def _load_config(self):
         with open('configs/project_config.yaml', "r") as f:
             return yaml.safe_load(f)
+
+    @cached_property
+    def stage_dir(self):
+        """
+        Directorio de las etapas persistidas; se resuelve al usar la primera etapa.
+        La versión de la fuente se revalida y se registra; si no se puede obtener (sin red),
+        se usa la última registrada.
+        """
+        version = source_version(self.train_path)
+        record = self._version_record()
+        if version is None and record is not None:
+            logger.warning(f"⚠️ Sin versión de {self.train_path}: se usan las etapas de la última registrada")
+            version = record['version']
+        elif version is not None:
+            record = {'version': version}
+            record_path = self._version_record_path()
+            record_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(record_path, "w") as f:
+                json.dump(record, f, indent=2)
+        return self._stage_root() / self._fingerprint(version)
+
+    @cached_property
+    def known_stage_dir(self):
+        """
+        Directorio de la última versión registrada sin revalidar la fuente (sin HEAD).
+        Solo difiere de `stage_dir` para fuentes remotas ya registradas.
+        """
+        record = self._version_record() if is_remote(self.train_path) else None
+        if record is None:
+            return self.stage_dir
+        return self._stage_root() / self._fingerprint(record['version'])
+
+    def _stage_root(self):
+        return Path(self.config['paths']['data_manager'])
+
+    def _config_key(self):
+        return [self.train_path, self.timesteps, self.normalize, self.date_columns, self.var_cat, self.target]
+
+    def _version_record_path(self):
+        digest = hashlib.sha256(json.dumps(self._config_key()).encode()).hexdigest()[:12]
+        return self._stage_root() / f"source-{digest}.json"
+
+    def _version_record(self):
+        path = self._version_record_path()
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _fingerprint(self, version):
+        """
+        Huella de lo que determina las etapas: si cambia, no se reutiliza lo persistido.
+        Incluye la versión de la fuente (validador de la caché o fecha del archivo local),
+        así un train.csv actualizado en la misma ruta invalida las etapas guardadas.
+        Para una fuente remota la versión requiere un HEAD, por eso no se calcula en `__init__`.
+        """
+        key = [self.train_path, version, self.timesteps, self.normalize,
+               self.date_columns, self.var_cat, self.target]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:12]
+
+    def _stage(self, name, compute, load=None, save=None, suffix="", stage_dir=None):
+        """
+        Ejecuta una etapa: la lee de disco si está persistida; si no, la calcula
+        (y la guarda cuando `persist` está activo). Registra el tiempo en `self.timings`.
+        `stage_dir` permite leerla de otro directorio que `self.stage_dir` (p. ej. `known_stage_dir`).
+        """
+        start_time = time.perf_counter()
+        stage_dir = stage_dir or self.stage_dir
+        path = stage_dir / f"{name}{suffix}"
+        if self.persist and load is not None and path.exists():
+            result, origin = load(path), "disco"
+        else:
+            result, origin = compute(), "calculada"
+            if self.persist and save is not None:
+                stage_dir.mkdir(parents=True, exist_ok=True)
+                save(result, path)
+        self.timings[name] = time.perf_counter() - start_time
+        logger.info(f"⏱️ Etapa {name} ({origin}): {self.timings[name]:.2f}s")
+        return result
+
+    @cached_property
+    def df_train(self):
+        reader = partial(read_csv, parse_dates=['date'])
+        return self._stage("raw", lambda: read_source(self.train_path, reader).set_index('id'))
+
+    @cached_property
+    def df_test(self):
+        reader = partial(read_csv, parse_dates=['date'])
+        return read_source(self.test_path, reader).set_index('id')
+
+    @cached_property
+    def df_encoded(self):
+        def compute():
+            df = self._embed_var_cat(self.df_train.copy())
+            if self.date_columns:
+                df = self._add_date_columns(df)
+            return df
+        return self._stage("encode", compute)
+
+    @property
+    def target_scaler_path(self):
+        return self.stage_dir / "scaler.pkl"
+
+    @cached_property
+    def X_train_raw(self):
+        def load(path):
+            with open(self.target_scaler_path, "rb") as file:
+                self.scaler_data = pickle.load(file)
+            return read_feather(path).set_index('id')
+
+        # Sin el scaler guardado (etapas de versiones anteriores) se vuelve a normalizar
+        return self._stage(
+            "normalize", lambda: self._normalize_data(self.df_encoded.copy()),
+            load=load if self.target_scaler_path.exists() else None,
+            save=lambda df, path: df.reset_index().to_feather(path), suffix=".feather",
+        )
+
+    @cached_property
+    def target_scaler(self):
+        """MinMaxScaler del target de esta huella (p. ej. para `make_rmsle`)."""
+        if not self.target_scaler_path.exists():
+            self.X_train_raw
+        with open(self.target_scaler_path, "rb") as file:
+            return pickle.load(file)
+
+    @cached_property
+    def train_data(self):
+        """Arreglos de ventanas en memmap; la versión del bundle es la huella del config."""
+        bundle = WindowBundle(self.window_bundle_path)
+        if not bundle.exists(self.stage_dir.name):
+            self._stage("windows", self.generate_X_train)
+        return bundle.load(self.stage_dir.name)[0]
+
+    @cached_property
+    def metadata(self):
+        def load(path):
+            with open(path, "r") as f:
+                return json.load(f)
+
+        def save(meta, path):
+            with open(path, "w") as f:
+                json.dump(meta, f, indent=2)
+
+        # Con la metadata ya guardada para la última versión conocida no se revalida la fuente
+        known = self.known_stage_dir if (self.known_stage_dir / "metadata.json").exists() else None
+        return self._stage("metadata", self._compute_metadata, load=load, save=save, suffix=".json", stage_dir=known)
+
+    @property
+    def categories(self):
+        return {var: Index(values) for var, values in self.metadata['categories'].items()}
     
     def __get_n_var_num(self):
         return len(self.X_train_raw.columns) - len(self.var_cat) - 2
 
-    def generate_metadata(self):
+    def _compute_metadata(self):
+        if not hasattr(self, '_categories'):
+            # El normalizado vino de disco: las categorías salen de codificar la carga cruda
+            self.df_encoded
         meta_categories = {}
         for var in self.var_cat:
             n_cat = self.X_train_raw[var].nunique()
             meta_categories[var] = n_cat
-        return {'categorical': meta_categories, 'var_num': self.__get_n_var_num()}
+        return {
+            'categorical': meta_categories,
+            'var_num': self.__get_n_var_num(),
+            'timesteps': self.timesteps,
+            'categories': {var: values.tolist() for var, values in self._categories.items()},
+        }
+
+    def generate_metadata(self):
+        return {key: self.metadata[key] for key in ('categorical', 'var_num', 'timesteps')}
     
     def _embed_var_cat(self, df, test=False):
+        if not test:
+            self._categories = {}
         for var in self.var_cat:
             if not test:
-                df[var] = df[var].astype('category').cat.codes
-                self.categories[var] = df[var].astype('category').cat.categories
+                categorical = df[var].astype('category')
+                self._categories[var] = categorical.cat.categories
+                df[var] = categorical.cat.codes
             else:
                 df[var] = Categorical(df[var], categories=self.categories[var]).codes
         return df
@@ -68,82 +252,64 @@ class DataManager():
         excluded_columns = [self.target, 'date'] + self.var_cat
         cols_norm = df.columns.difference(excluded_columns)
         df[cols_norm] = scaler.fit_transform(df[cols_norm])
-        with open(self.scaler_path, "wb") as file:
+        self.stage_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.target_scaler_path, "wb") as file:
             pickle.dump(self.scaler_data, file)
         return df
     
-    def _transform_df(self, df):
-        df = self._embed_var_cat(df)
-        if self.date_columns:
-            df = self._add_date_columns(df)
-        df = self._normalize_data(df)
-        return df
-        
-    
-    def _create_dataset(self, store_nbr, family):
-        filter_col = (self.df_train.store_nbr == store_nbr) & (self.df_train.family == family)
-        return self.X_train_raw[filter_col].drop(columns=['store_nbr', 'family'])
+    def _create_dataset(self):
+        # Una sola dispersión a (serie, fecha, variable); cada serie es luego una vista
+        return SeriesStore.from_frame(self.X_train_raw, series_columns=['store_nbr', 'family'], date='date')
     
-    def _create_steps(self, df):
-        df= df.drop(columns=['date'])
-        xy_historic = array([df.iloc[i:i+self.timesteps].values for i in range(len(df) - self.timesteps)])
-        x_current = df.drop(columns=[self.target]).iloc[self.timesteps:].values
-        y_current = df[self.target].iloc[self.timesteps:].values
+    def _create_steps(self, values, target_idx):
+        # Vista por strides sobre el buffer de la serie: sin una copia por ventana
+        xy_historic = sliding_windows(values, self.timesteps)
+        x_current = values[self.timesteps:, [i for i in range(values.shape[1]) if i != target_idx]]
+        y_current = values[self.timesteps:, target_idx]
         return [xy_historic, x_current, y_current]
     
     def generate_X_train(self):
-        train_data = {attr: [] for attr in self.atributos}
-        for store in tqdm(self.X_train_raw.store_nbr.unique()):
-            for family in self.X_train_raw.family.unique():
-                df = self._create_dataset(store, family)
-                n_dim = len(df) - self.timesteps
-                new_values =  [full(n_dim, store), full(n_dim, family)] + self._create_steps(df)
-                for attr, new_value in zip(self.atributos, new_values):
-                    train_data[attr].append(new_value) 
-        for attr in self.atributos:
-            train_data[attr] = concatenate(train_data[attr], axis=0)
-        
-        with open(self.train_data_path, "wb") as file:
-            pickle.dump(train_data, file)
-
+        series_store = self._create_dataset()
+        target_idx = series_store.feature_index(self.target)
+        n_features = len(series_store.features)
+        # Tamaño final conocido de antemano: cada serie se escribe en su tramo del bundle
+        n_dims = (series_store.mask.sum(axis=1) - self.timesteps).clip(min=0)
+        n_total = int(n_dims.sum())
+        specs = {
+            'x_store': ((n_total,), int32),
+            'x_family': ((n_total,), int32),
+            'xy_historic': ((n_total, self.timesteps, n_features), float32),
+            'x_current': ((n_total, n_features - 1), float32),
+            'y_current': ((n_total,), float32),
+        }
+        bundle = WindowBundle(self.window_bundle_path)
+        _, train_data = bundle.create(specs, version=self.stage_dir.name, metadata={'timesteps': self.timesteps, 'features': series_store.features, 'target': self.target})
+        start = 0
+        for ((store, family), values), n_dim in tqdm(zip(series_store.items(), n_dims), total=len(series_store)):
+            new_values = [store, family] + self._create_steps(values, target_idx)
+            for attr, new_value in zip(self.atributos, new_values):
+                train_data[attr][start:start + n_dim] = new_value
+            start += n_dim
+        bundle.commit(train_data)
         return train_data
     
     def __get_split_data(self):
         if self.load:
-            train_data = self.generate_X_train()
-        else:
-            response = requests.get(self.train_data_path)
-            train_data = pickle.loads(response.content)
-        # Apply train_test_split to all attributes in `data_list`
-        split_results = train_test_split(*train_data.values(), test_size=0.2, random_state=42)
-
-        # Dynamically assign train and test variables
-        for i, attr in enumerate(self.atributos):
-            setattr(self, f"{attr}_train", split_results[2 * i])  # Train
-            setattr(self, f"{attr}_test", split_results[2 * i + 1])  # Test
-
-        # Return train and test data as dictionaries for easy access
-        return {attr: getattr(self, f"{attr}_train") for attr in self.atributos}, \
-            {attr: getattr(self, f"{attr}_test") for attr in self.atributos}
+            self._stage("windows", self.generate_X_train)
+            self.__dict__.pop('train_data', None)
+        # Arreglos en memmap de solo lectura; el split son solo índices
+        train_data = self.train_data
+        self.train_idx, self.test_idx = WindowBundle.split(len(train_data['y_current']))
+        return train_data
     
-    def build_input_data(self, load=False):
+    def build_input_data(self, load=False, batch_size=1024, seed=42):
+        """
+        `tf.data.Dataset` de entrenamiento y validación leídos por lote del bundle de
+        ventanas en memmap (se genera si no existe, o se regenera con `load=True`).
+        """
         self.load = load
-        data_train, data_test = self.__get_split_data()
-        input_mapping = {
-            "seq_input": "xy_historic",
-            "target_input": "x_current",
-            "store_nbr_input": "x_store",
-            "family_input": "x_family"
-        }
-        datasets = {} 
-        for split, dataset in zip(["train", "test"], [data_train, data_test]):
-            datasets[f"x_{split}"] = {key: tf.convert_to_tensor(dataset[value], dtype=tf.int32) if key in ["store_nbr_input", "family_input"]
-                                    else tf.convert_to_tensor(dataset[value], dtype=tf.float32)
-                                    for key, value in input_mapping.items()}
-            datasets[f"y_{split}"] = tf.convert_to_tensor(dataset["y_current"], dtype=tf.float32)
-        return datasets["x_train"], datasets["y_train"], datasets["x_test"], datasets["y_test"]
-
-    
-
-
-        
+        builder = BundleDatasetBuilder(self.__get_split_data())
+        self.n_train, self.n_test = len(self.train_idx), len(self.test_idx)
+        train = builder.build(self.train_idx, batch_size, shuffle=True, seed=seed)
+        test = builder.build(self.test_idx, batch_size, shuffle=False)
+        return train, test
@@ -0,0 +1,69 @@
+import logging
+import time
+import numpy as np
+import tensorflow as tf
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+class BundleDatasetBuilder:
+    """
+    Construye `tf.data.Dataset` de entrenamiento para HybridModel sobre los arreglos en
+    memmap de un WindowBundle.
+
+    El dataset solo recorre índices; cada lote se lee del memmap con `tf.numpy_function`
+    (índices ordenados, así las páginas se leen en orden) y solo ese lote pasa a memoria.
+    """
+    INPUTS = {
+        "seq_input": "xy_historic",
+        "target_input": "x_current",
+        "store_nbr_input": "x_store",
+        "family_input": "x_family",
+    }
+    DTYPES = {"xy_historic": tf.float32, "x_current": tf.float32, "x_store": tf.int32, "x_family": tf.int32, "y_current": tf.float32}
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.names = list(self.INPUTS.values()) + ["y_current"]
+
+    def _read(self, indices):
+        indices = np.sort(indices)
+        return tuple(np.asarray(self.arrays[name][indices], dtype=self.DTYPES[name].as_numpy_dtype) for name in self.names)
+
+    def _gather(self, indices):
+        values = tf.numpy_function(self._read, [indices], [self.DTYPES[name] for name in self.names])
+        for value, name in zip(values, self.names):
+            value.set_shape((None,) + tuple(self.arrays[name].shape[1:]))
+        inputs = dict(zip(self.INPUTS, values[:-1]))
+        return inputs, values[-1]
+
+    def build(self, indices, batch_size=1024, shuffle=True, seed=42):
+        """
+        Args:
+            indices (np.ndarray): filas del bundle a incluir (p. ej. un split de `WindowBundle.split`).
+            batch_size (int): tamaño de lote.
+            shuffle (bool): baraja los índices en cada época.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+        if shuffle:
+            dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+        return (dataset
+                .batch(batch_size)
+                .map(self._gather, num_parallel_calls=tf.data.AUTOTUNE)
+                .prefetch(tf.data.AUTOTUNE))
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Registra ejemplos/segundo por época durante `model.fit`."""
+    def __init__(self, n_examples):
+        super().__init__()
+        self.n_examples = n_examples
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        rate = self.n_examples / elapsed if elapsed else float("nan")
+        logger.info(f"⚡ Época {epoch + 1}: {self.n_examples} ejemplos en {elapsed:.1f}s ({rate:,.0f} ejemplos/s)")
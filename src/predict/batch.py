@@ -0,0 +1,228 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from src.config import CONFIG
+from src.data import DataLoader
+from src.training.segments import load_prediction_model
+from src.utils import load_object
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def date_chunks(dates, batch_rows=500_000):
+    """
+    Parte las fechas en rangos [inicio, fin] consecutivos de fechas completas con a lo
+    sumo ~batch_rows filas cada uno (una fecha con más filas forma su propio rango).
+    """
+    days, counts = np.unique(pd.DatetimeIndex(dates).values.astype("datetime64[D]"), return_counts=True)
+    chunks, start, rows = [], 0, 0
+    for i, count in enumerate(counts):
+        if rows and rows + count > batch_rows:
+            chunks.append((pd.Timestamp(days[start]), pd.Timestamp(days[i - 1])))
+            start, rows = i, 0
+        rows += count
+    if rows:
+        chunks.append((pd.Timestamp(days[start]), pd.Timestamp(days[-1])))
+    return chunks
+
+
+class PredictionWriter:
+    """
+    Escribe (id, sales) por lotes a medida que llegan: Parquet si la ruta termina en
+    .parquet, CSV (escritor de pyarrow) en otro caso. Nada se acumula en memoria.
+    """
+    SCHEMA = pa.schema([("id", pa.int64()), ("sales", pa.float64())])
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix == ".parquet":
+            self._writer = pq.ParquetWriter(self.path, self.SCHEMA)
+        else:
+            # Encabezado sin comillas, igual que `save_predictions`
+            options = pcsv.WriteOptions(quoting_style="needed")
+            self._writer = pcsv.CSVWriter(str(self.path), self.SCHEMA, write_options=options)
+        self.rows = 0
+
+    def write(self, ids, predictions):
+        table = pa.table({"id": np.asarray(ids, dtype=np.int64), "sales": np.asarray(predictions, dtype=np.float64)},
+                         schema=self.SCHEMA)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merge_runs(paths, writer, batch_rows=500_000):
+    """
+    Escribe en orden global de id lotes ya ordenados por id (archivos Arrow IPC de un
+    solo record batch). Los lotes se abren con memory-map y se recorren por ventanas de
+    ids de ~batch_rows filas: de cada lote se toma su tramo con `searchsorted` y solo la
+    ventana se ordena en memoria.
+    """
+    runs = []
+    for path in paths:
+        batch = pa.ipc.open_file(pa.memory_map(str(path))).get_batch(0)
+        runs.append((batch.column(0).to_numpy(), batch.column(1).to_numpy()))
+    if not runs:
+        return
+    # Límites de las ventanas a partir de una muestra de ids de cada lote
+    step = max(1, batch_rows // len(runs))
+    samples = np.sort(np.concatenate([ids[::step] for ids, _ in runs]))
+    bounds = list(samples[max(1, batch_rows // step)::max(1, batch_rows // step)]) + [None]
+    starts = [0] * len(runs)
+    for bound in bounds:
+        parts = []
+        for i, (ids, sales) in enumerate(runs):
+            end = len(ids) if bound is None else int(np.searchsorted(ids, bound))
+            parts.append((ids[starts[i]:end], sales[starts[i]:end]))
+            starts[i] = end
+        ids = np.concatenate([part[0] for part in parts])
+        if len(ids):
+            order = np.argsort(ids, kind="stable")
+            writer.write(ids[order], np.concatenate([part[1] for part in parts])[order])
+
+
+# Modelo, pipeline y scaler cargados una sola vez por proceso del pool
+_STATE = {}
+
+
+def _init_worker(model_path, pipeline_path, scaler_path, source, threads, config):
+    _STATE.update(
+        model=load_object(model_path) if model_path else load_prediction_model(config),
+        pipeline=load_object(pipeline_path),
+        scaler=load_object(scaler_path),
+        loader=DataLoader(config),
+        source=source,
+        threads=threads,
+        drop=[config.get_variable("date"), config.get_variable("target")],
+    )
+
+
+def _predict_chunk(start_date, end_date):
+    start_time = time.perf_counter()
+    X = getattr(_STATE["loader"], f"load_{_STATE['source']}")(start_date=start_date, end_date=end_date)
+    X = X.sort_index()
+    ids = X.index.to_numpy()
+    X = _STATE["pipeline"].transform(X).drop(columns=_STATE["drop"], errors="ignore")
+    model = _STATE["model"]
+    # Hilos de LightGBM repartidos entre procesos para no sobresuscribir la CPU
+    kwargs = {"num_threads": _STATE["threads"]} if isinstance(model, lgb.Booster) else {}
+    preds = model.predict(X, **kwargs)
+    preds = _STATE["scaler"].inverse_transform(np.asarray(preds).reshape(-1, 1)).ravel()
+    return ids, preds, time.perf_counter() - start_time
+
+
+class BatchPredictor:
+    """
+    Inferencia por lotes en paralelo.
+
+    `source` es la fuente del DataLoader ("test_parquet" o "train_parquet", p. ej. para
+    escenarios). La entrada se parte en rangos de fechas completas (`date_chunks`, leyendo solo la
+    columna de fecha); cada proceso del pool carga modelo, pipeline y scaler una sola vez
+    y lee su rango con el filtro empujado al lector de Parquet, así los lotes no viajan
+    entre procesos. Cada lote terminado se vuelca ordenado por id a un archivo Arrow
+    temporal (con a lo sumo 2 × max_workers lotes en vuelo) y al final `merge_runs` los
+    escribe en orden global de id, aunque los ids no crezcan con la fecha.
+
+    Con un paso de lags, el pipeline guardado solo conserva la cola de la historia: las
+    fechas anteriores a lo que esa cola cubre (p. ej. histórico de "train_parquet")
+    quedan con variables de lags vacías y se avisa en el log.
+
+    Sin `model_path` el modelo sale del config (`load_prediction_model`): el modelo global
+    o, con `segments.enabled`, el router del set de modelos por segmento.
+    """
+    def __init__(self, model_path=None, pipeline_path=None, scaler_path=None, source="test_parquet",
+                 batch_rows=500_000, max_workers=None, config=CONFIG):
+        self.model_path = model_path
+        self.pipeline_path = pipeline_path or config.get_path("pipeline")
+        self.scaler_path = scaler_path or config.get_path("scaler")
+        self.source = source
+        self.batch_rows = batch_rows
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.config = config
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        params = config.get_section("prediction")
+        return cls(
+            source=params.get("source", "test_parquet"),
+            batch_rows=params.get("batch_rows", 500_000),
+            max_workers=params.get("max_workers"),
+            config=config,
+        )
+
+    def chunks(self):
+        date = self.config.get_variable("date")
+        dates = getattr(DataLoader(self.config), f"load_{self.source}")(columns=[date])[date]
+        return date_chunks(dates, self.batch_rows)
+
+    def check_lag_history(self, chunks):
+        """Avisa si hay rangos con fechas anteriores a la historia de lags del pipeline guardado."""
+        lags = getattr(load_object(self.pipeline_path), "named_steps", {}).get("lags")
+        if lags is None or lags.start_day_ is None:
+            return None
+        covered_from = pd.Timestamp(np.datetime64(int(lags.start_day_ + lags.tail_days), "D"))
+        uncovered = [(start, end) for start, end in chunks if start < covered_from]
+        if uncovered:
+            logger.warning(f"⚠️ {len(uncovered)} lotes de {self.source} tienen fechas anteriores a {covered_from.date()}, "
+                           f"primer día cubierto por la historia de lags guardada: sus variables de lags quedan vacías")
+        return covered_from
+
+    def run(self, output_path):
+        """
+        Returns:
+            int: filas escritas en `output_path`.
+        """
+        chunks = self.chunks()
+        self.check_lag_history(chunks)
+        threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        logger.info(f"🧠 Prediciendo {len(chunks)} lotes en {self.max_workers} procesos × {threads} hilos")
+        initargs = (self.model_path, self.pipeline_path, self.scaler_path, self.source, threads, self.config)
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=output_path.parent, prefix=".runs-") as tmp:
+            runs = []
+            with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=initargs) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_predict_chunk, *chunk))
+                    if len(pending) >= 2 * self.max_workers:
+                        runs.append(self._spill(Path(tmp) / f"{len(runs)}.arrow", pending.popleft().result()))
+                while pending:
+                    runs.append(self._spill(Path(tmp) / f"{len(runs)}.arrow", pending.popleft().result()))
+            with PredictionWriter(output_path) as writer:
+                merge_runs(runs, writer, self.batch_rows)
+        logger.info(f"✅ {writer.rows} predicciones guardadas en {output_path}")
+        return writer.rows
+
+    @staticmethod
+    def _spill(path, result):
+        """Vuelca un lote terminado, ordenado por id, a un archivo Arrow IPC sin comprimir."""
+        ids, preds, seconds = result
+        batch = pa.record_batch([pa.array(ids, pa.int64()), pa.array(preds, pa.float64())], schema=PredictionWriter.SCHEMA)
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, PredictionWriter.SCHEMA) as ipc:
+            ipc.write_batch(batch)
+        logger.info(f"   🔹 {len(ids)} filas ({seconds:.1f}s)")
+        return path
@@ -1,26 +1,32 @@
+import numpy as np
 from src.data import DataLoader
+from src.predict.batch import BatchPredictor
+from src.training.segments import load_prediction_model
 from src.utils import load_object, save_predictions, setup_logger
 from src.config import CONFIG
 
 logger = setup_logger(CONFIG.logger_name, CONFIG.get_path('predict_log'))
 
-def run_prediction():
-    logger.info("🔄 Cargando datos de test...")
-    loader = DataLoader()
-    X_test = loader.load_test_parquet()
-    indexes = X_test.index.values
-
+def run_prediction(batch_rows=500_000):
+    if CONFIG.get_section("prediction").get("parallel", False):
+        # Lotes por rango de fechas en un pool de procesos, escritos a medida que terminan
+        return BatchPredictor.from_config().run(CONFIG.get_path("predictions"))
     logger.info("🧠 Cargando modelo, scaler y pipeline...")
-    model = load_object(CONFIG.get_path("model"))
+    model = load_prediction_model()
     scaler = load_object(CONFIG.get_path("scaler"))
     pipeline = load_object(CONFIG.get_path("pipeline"))
 
-    logger.info("⚙️ Aplicando pipeline de transformación...")
-    X_test = pipeline.transform(X_test)
-    X_test = X_test.drop(columns=["date","sales"])
-
-    logger.info("📈 Generando predicciones...")
-    preds = model.predict(X_test)
+    # El test se procesa por lotes: la memoria pico la marca el lote, no el archivo
+    logger.info("⚙️ Aplicando pipeline y generando predicciones por lotes de test...")
+    loader = DataLoader()
+    indexes, preds = [], []
+    for X_test in loader.iter_test(batch_rows=batch_rows, by="date"):
+        indexes.append(X_test.index.values)
+        X_test = pipeline.transform(X_test)
+        X_test = X_test.drop(columns=["date","sales"])
+        preds.append(model.predict(X_test))
+    indexes = np.concatenate(indexes)
+    preds = np.concatenate(preds)
     preds = scaler.inverse_transform(preds.reshape(-1, 1)).ravel()
 
     logger.info("💾 Guardando resultados...")
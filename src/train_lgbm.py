@@ -1,17 +1,41 @@
-from src.training import prepare_data, train_model_lgbm, evaluate_model
-from src.utils import save_model
+from src.training import prepare_data, train_model_lgbm, evaluate_model, SegmentedTrainer
+from src.training.incremental import warm_start, latest_date, save_model_with_lineage
+from src.utils.cli import parse_args
+from src.utils.tracking import async_logging, get_tracker
 from src.utils.logging import setup_logger
 from src.config import CONFIG
 import mlflow
 
 logger = setup_logger(CONFIG.logger_name, CONFIG.get_path('train_log'))
 
+def train_segments(X_train, X_val, y_train, y_val, segment=None):
+    trainer = SegmentedTrainer.from_config()
+    get_tracker().log_param("segment_by", trainer.segment_by)
+    if segment is None:
+        router = trainer.fit(X_train, y_train, X_val, y_val)
+    else:
+        # El valor original (p. ej. "BEVERAGES") se traduce al código con las categorías del encoder
+        router = trainer.fit_segment(segment, X_train, y_train, X_val, y_val)
+    logger.info(f"✅ Entrenamiento finalizado y modelos por segmento guardados en {trainer.model_dir}")
+    return router
+
 def main():
+    args = parse_args()
     mlflow.set_experiment("store-sales")
-    with mlflow.start_run(run_name="LGBM_Training"):
+    # El registro en MLflow corre en segundo plano y se vacía antes de cerrar el run
+    with mlflow.start_run(run_name="LGBM_Training"), async_logging():
+        if args.incremental:
+            model, X_val, y_val, _ = warm_start(**CONFIG.get_section("incremental"))
+            logger.info(f"✅ Reentrenamiento incremental finalizado y modelo guardado en {CONFIG.get_path('model')}")
+            evaluate_model(model, X_val, y_val)
+            return
         X_train, X_val, y_train, y_val = prepare_data()
-        model = train_model_lgbm(X_train, X_val, y_train, y_val)
-        logger.info(f"✅ Entrenamiento finalizado y modelo guardado en {CONFIG.get_path('model')}")
+        if CONFIG.get_section("segments").get("enabled", False):
+            model = train_segments(X_train, X_val, y_train, y_val, args.segment)
+        else:
+            model = train_model_lgbm(X_train, X_val, y_train, y_val)
+            save_model_with_lineage(model, CONFIG.get_path('model'), latest_date())
+            logger.info(f"✅ Entrenamiento finalizado y modelo guardado en {CONFIG.get_path('model')}")
         evaluate_model(model, X_val, y_val)
     
 if __name__ == "__main__":
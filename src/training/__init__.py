@@ -1,3 +1,6 @@
 from .data import prepare_data
 from .model import train_model_lgbm
-from .evaluation import evaluate_model
\ No newline at end of file
+from .evaluation import evaluate_model
+from .backtest import WalkForwardBacktest, walk_forward_folds
+from .tuning import SuccessiveHalvingTuner, sample_space
+from .segments import SegmentedTrainer, SegmentRouter, load_prediction_model
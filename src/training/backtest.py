@@ -0,0 +1,235 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import lightgbm as lgb
+from sklearn.base import clone
+from sklearn.preprocessing import MinMaxScaler
+
+from src.config import CONFIG
+from src.evaluation.metrics import rmsle_score
+from src.training.dataset_cache import LGBMDatasetCache
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+@dataclass
+class Fold:
+    """
+    Un corte walk-forward: índices posicionales sobre el frame base y sus fechas límite.
+    `stop_idx` son los últimos días de la ventana de entrenamiento, reservados para el
+    early stopping (vacío si el fold entrena un número fijo de rondas).
+    """
+    number: int
+    train_idx: np.ndarray
+    val_idx: np.ndarray
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    val_start: pd.Timestamp
+    val_end: pd.Timestamp
+    stop_idx: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+
+
+def walk_forward_folds(dates, n_folds=5, horizon=16, mode="expanding", train_days=None, gap=0, stopping_days=0):
+    """
+    Construye K folds walk-forward a partir de límites de fecha.
+
+    Los últimos `n_folds * horizon` días se parten en bloques de validación consecutivos;
+    el entrenamiento de cada fold termina `gap` días antes de su bloque y empieza en el
+    primer día (mode="expanding") o `train_days` días antes (mode="sliding").
+    Los últimos `stopping_days` días de esa ventana forman `stop_idx` y no entran en
+    `train_idx`: el early stopping nunca mira el bloque que se evalúa.
+    Solo se devuelven arreglos de índices: el frame no se copia.
+
+    Args:
+        dates (array-like): fecha de cada fila del frame base (en cualquier orden).
+    """
+    if mode not in ("expanding", "sliding"):
+        raise ValueError(f"mode debe ser 'expanding' o 'sliding', no {mode!r}")
+    if mode == "sliding" and not train_days:
+        raise ValueError("mode='sliding' requiere train_days")
+    days = pd.DatetimeIndex(dates).values.astype("datetime64[D]")
+    unique_days = np.unique(days)
+    first_val = len(unique_days) - n_folds * horizon
+    if first_val - gap - stopping_days <= 0:
+        raise ValueError(f"No hay días suficientes para {n_folds} folds de {horizon} días")
+
+    # Orden estable por día: cada ventana de fechas es un tramo contiguo de `order`
+    order = np.argsort(days, kind="stable")
+    sorted_days = days[order]
+
+    def rows(start, stop):
+        lo = np.searchsorted(sorted_days, unique_days[start], side="left")
+        hi = np.searchsorted(sorted_days, unique_days[stop - 1], side="right")
+        return order[lo:hi]
+
+    folds = []
+    for k in range(n_folds):
+        val_start = first_val + k * horizon
+        train_stop = val_start - gap
+        train_start = 0 if mode == "expanding" else max(0, train_stop - train_days)
+        fit_stop = max(train_start + 1, train_stop - stopping_days)
+        folds.append(Fold(
+            number=k + 1,
+            train_idx=rows(train_start, fit_stop),
+            val_idx=rows(val_start, val_start + horizon),
+            train_start=pd.Timestamp(unique_days[train_start]),
+            train_end=pd.Timestamp(unique_days[fit_stop - 1]),
+            val_start=pd.Timestamp(unique_days[val_start]),
+            val_end=pd.Timestamp(unique_days[val_start + horizon - 1]),
+            stop_idx=rows(fit_stop, train_stop) if fit_stop < train_stop else np.empty(0, dtype=np.int64),
+        ))
+    return folds
+
+
+# Estado por proceso: la tabla base se abre una sola vez (memory map) en cada worker
+_BASE = {}
+
+
+def _init_worker(path, index):
+    source = pa.memory_map(path, "r")
+    _BASE["table"] = pa.ipc.open_file(source).read_all()
+    _BASE["index"] = index
+
+
+def _fold_frame(idx):
+    df = _BASE["table"].take(pa.array(idx)).to_pandas()
+    index = _BASE["index"]
+    return df.set_index(index) if index in df.columns else df
+
+
+def _run_fold(fold, preprocessor, model_params, target, date, categorical, stopping_rounds, dataset_cache=None):
+    start_time = time.perf_counter()
+    train, val = _fold_frame(fold.train_idx), _fold_frame(fold.val_idx)
+    X_train, y_train = train.drop(columns=[target]), train[target]
+    X_val, y_val = val.drop(columns=[target]), val[target]
+
+    pipeline = clone(preprocessor)
+    X_train = pipeline.fit_transform(X_train, y_train).drop(columns=[date])
+    X_val = pipeline.transform(X_val).drop(columns=[date])
+    scaler = MinMaxScaler()
+    y_train_scaled = scaler.fit_transform(y_train.to_numpy().reshape(-1, 1)).ravel()
+
+    params = dict(model_params)
+    num_boost_round = params.pop("n_estimators", 100)
+    categorical = [c for c in categorical if c in X_train.columns]
+    # El early stopping usa la cola de la ventana de entrenamiento; el fold solo se evalúa
+    X_stop = y_stop_scaled = None
+    if len(fold.stop_idx):
+        stop = _fold_frame(fold.stop_idx)
+        X_stop = pipeline.transform(stop.drop(columns=[target])).drop(columns=[date])
+        y_stop_scaled = scaler.transform(stop[target].to_numpy().reshape(-1, 1)).ravel()
+    if dataset_cache is not None:
+        train_set, stop_set = dataset_cache.datasets(X_train, y_train_scaled, X_stop, y_stop_scaled, categorical, params)
+    else:
+        train_set = lgb.Dataset(X_train, y_train_scaled, categorical_feature=categorical, params={"feature_pre_filter": False})
+        stop_set = lgb.Dataset(X_stop, y_stop_scaled, reference=train_set) if X_stop is not None else None
+    model = lgb.train(
+        {**params, "verbose": -1}, train_set, num_boost_round=num_boost_round,
+        valid_sets=[stop_set] if stop_set is not None else [],
+        callbacks=[lgb.early_stopping(stopping_rounds=stopping_rounds, verbose=False)] if stop_set is not None else [],
+    )
+    best_iteration = model.best_iteration or model.current_iteration()
+    preds = scaler.inverse_transform(model.predict(X_val, num_iteration=best_iteration).reshape(-1, 1)).ravel()
+    return {
+        "fold": fold.number,
+        "train_start": fold.train_start, "train_end": fold.train_end,
+        "val_start": fold.val_start, "val_end": fold.val_end,
+        "n_train": len(fold.train_idx), "n_stop": len(fold.stop_idx), "n_val": len(fold.val_idx),
+        "best_iteration": best_iteration,
+        "rmsle": rmsle_score(y_val, preds),
+        "seconds": time.perf_counter() - start_time,
+    }
+
+
+class WalkForwardBacktest:
+    """
+    Backtest walk-forward de pipeline de preprocesamiento + LightGBM.
+
+    El frame base se escribe una vez como Feather sin comprimir (Arrow IPC) y cada
+    proceso del pool lo abre por memory map; los folds solo viajan como índices.
+    Cada fold ajusta su propia copia del pipeline y del modelo; con `dataset_cache`
+    los lgb.Dataset de cada fold se reutilizan entre corridas del backtest.
+    El early stopping usa los últimos `stopping_days` días de cada ventana de entrenamiento;
+    con `stopping_days=0` cada fold entrena `n_estimators` rondas fijas.
+    """
+    def __init__(self, preprocessor, model_params=None, n_folds=5, horizon=16, mode="expanding",
+                 train_days=None, gap=0, max_workers=None, stopping_rounds=200, stopping_days=16,
+                 dataset_cache=None, config=CONFIG):
+        self.preprocessor = preprocessor
+        self.model_params = dict(model_params if model_params is not None else config.get_model_params())
+        self.n_folds = n_folds
+        self.horizon = horizon
+        self.mode = mode
+        self.train_days = train_days
+        self.gap = gap
+        self.max_workers = max_workers or min(n_folds, os.cpu_count() or 1)
+        self.stopping_rounds = stopping_rounds
+        self.stopping_days = stopping_days
+        self.dataset_cache = dataset_cache
+        self.target = config.get_variable('target')
+        self.date = config.get_variable('date')
+        self.index = config.get_variable('index')
+        self.categorical = config.get_variable('categorical', flatten=True)
+
+    @classmethod
+    def from_config(cls, preprocessor, config=CONFIG):
+        params = config.get_section("backtest")
+        return cls(
+            preprocessor,
+            n_folds=params.get("n_folds", 5),
+            horizon=params.get("horizon", 16),
+            mode=params.get("mode", "expanding"),
+            train_days=params.get("train_days"),
+            gap=params.get("gap", 0),
+            max_workers=params.get("max_workers"),
+            stopping_rounds=params.get("stopping_rounds", 200),
+            stopping_days=params.get("stopping_days", params.get("horizon", 16)),
+            dataset_cache=LGBMDatasetCache.from_config(config),
+            config=config,
+        )
+
+    def folds(self, df):
+        return walk_forward_folds(df[self.date], self.n_folds, self.horizon, self.mode, self.train_days, self.gap,
+                                  self.stopping_days)
+
+    def run(self, df):
+        """
+        Ejecuta todos los folds en paralelo.
+        Returns:
+            pd.DataFrame: una fila por fold con fechas, tamaños, mejor iteración y RMSLE.
+        """
+        folds = self.folds(df)
+        model_params = dict(self.model_params)
+        # Hilos de LightGBM repartidos entre los procesos para no sobresuscribir la CPU
+        model_params.setdefault("n_jobs", max(1, (os.cpu_count() or 1) // self.max_workers))
+        logger.info(f"🔁 Backtest walk-forward: {len(folds)} folds ({self.mode}, {self.horizon} días) en {self.max_workers} procesos")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "base.feather")
+            table = pa.Table.from_pandas(df.reset_index() if df.index.name == self.index else df, preserve_index=False)
+            feather.write_feather(table, path, compression="uncompressed")
+            del table
+            with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(path, self.index)) as pool:
+                futures = [
+                    pool.submit(_run_fold, fold, self.preprocessor, model_params, self.target,
+                                self.date, self.categorical, self.stopping_rounds, self.dataset_cache)
+                    for fold in folds
+                ]
+                results = [future.result() for future in futures]
+
+        report = pd.DataFrame(results).sort_values("fold", ignore_index=True)
+        for row in report.itertuples():
+            logger.info(f"   🔹 Fold {row.fold}: {row.val_start.date()} → {row.val_end.date()} "
+                        f"RMSLE {row.rmsle:.4f} ({row.seconds:.1f}s)")
+        logger.info(f"📊 RMSLE walk-forward: {report['rmsle'].mean():.4f} ± {report['rmsle'].std():.4f}")
+        return report
@@ -1,16 +1,20 @@
 import logging
-import mlflow.sklearn
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 from src.data import DataLoader
 from src.pipelines import PipelineBuilder
-from src.utils import save_object, log_pipeline_readable
+from src.training.matrix import TrainingMatrixBuilder
+from src.utils import save_object, log_pipeline_readable, get_tracker
 from src.config import CONFIG
 
 
 logger = logging.getLogger(CONFIG.logger_name)
 
 def prepare_data():
+    params = dict(CONFIG.get_section("matrix"))
+    if params.pop("enabled", False):
+        return prepare_matrix(**params)
     loader = DataLoader()
     logger.info("📦 Cargando datos...")
     df = loader.load_train_parquet()
@@ -19,18 +23,36 @@ def prepare_data():
     y = df[CONFIG.get_variable("target")]
     X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
     logger.info("⚙️ Aplicando transformaciones del pipeline...")
-    X_train, X_val = transform_data(X_train, X_val)
+    X_train, X_val = transform_data(X_train, X_val, y_train)
     X_train = X_train.drop(columns=["date"])
     X_val = X_val.drop(columns=["date"])
     y_train, y_val = scale_target(y_train, y_val)
     return X_train, X_val, y_train, y_val
 
-def transform_data(X_train, X_val=None):
+def prepare_matrix(batch_rows=500_000, test_size=0.2, random_state=42):
+    """
+    Igual que `prepare_data`, pero por lotes hacia una matriz float32 preasignada
+    (ver `TrainingMatrixBuilder`): el dataset nunca está entero como DataFrame.
+    """
+    logger.info("📦 Construyendo matriz de entrenamiento por lotes...")
+    pipeline = PipelineBuilder().build_preprocessor_pipeline()
+    builder = TrainingMatrixBuilder(pipeline, batch_rows=batch_rows, test_size=test_size, random_state=random_state)
+    X_train, X_val, y_train, y_val = builder.build()
+    log_preprocessor(pipeline)
+    y_train, y_val = scale_target(y_train, y_val)
+    return X_train, X_val, y_train, y_val
+
+def log_preprocessor(pipeline):
+    get_tracker().log_model(pipeline, "preprocessing_pipeline")
+    save_object(pipeline, CONFIG.get_path('pipeline'))
+    log_pipeline_readable(pipeline)
+
+def transform_data(X_train, X_val=None, y_train=None):
     builder = PipelineBuilder()
     pipeline = builder.build_preprocessor_pipeline()
-    X_train = pipeline.fit_transform(X_train)
-    mlflow.sklearn.log_model(pipeline, artifact_path="preprocessing_pipeline")
-    log_pipeline_readable(pipeline)
+    # y_train alimenta la historia de los lags (features.lags); el resto de pasos lo ignora
+    X_train = pipeline.fit_transform(X_train, y_train)
+    log_preprocessor(pipeline)
     if X_val is not None:
         X_val = pipeline.transform(X_val)
         return X_train, X_val
@@ -38,8 +60,8 @@ def transform_data(X_train, X_val=None):
 
 def scale_target(y_train, y_val):
     scaler = MinMaxScaler()
-    y_train = scaler.fit_transform(y_train.values.reshape(-1, 1))
-    y_val = scaler.transform(y_val.values.reshape(-1, 1))
-    mlflow.sklearn.log_model(scaler, artifact_path="scaler")
+    y_train = scaler.fit_transform(np.asarray(y_train).reshape(-1, 1))
+    y_val = scaler.transform(np.asarray(y_val).reshape(-1, 1))
+    get_tracker().log_model(scaler, "scaler")
     save_object(scaler, CONFIG.get_path('scaler'))
     return y_train, y_val
\ No newline at end of file
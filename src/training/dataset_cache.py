@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+# Parámetros que cambian cómo se binan los datos: forman parte de la clave del caché
+BINNING_PARAMS = (
+    "max_bin", "max_bin_by_feature", "min_data_in_bin", "bin_construct_sample_cnt", "data_random_seed",
+    "feature_pre_filter", "use_missing", "zero_as_missing", "enable_bundle",
+    "linear_tree", "max_cat_threshold", "min_data_per_group",
+)
+
+
+def frame_digest(X, y=None):
+    """SHA-256 de columnas, tipos y contenido de X (y del target si se pasa)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, X.columns)), list(map(str, X.dtypes))]).encode())
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    if y is not None:
+        h.update(np.ascontiguousarray(np.ravel(y), dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class LGBMDatasetCache:
+    """
+    Caché en disco de `lgb.Dataset` en el formato binario de LightGBM.
+
+    La clave es un hash del contenido (features + target), las variables categóricas y
+    los parámetros de binado. El set de validación se guarda con la clave del de
+    entrenamiento, porque comparte sus bin mappers (`reference`). En un acierto no se
+    vuelve a binar: LightGBM carga directamente el binario.
+
+    Con `max_bytes` el directorio queda acotado: tras cada `build` se borran los binarios
+    usados hace más tiempo (LRU por fecha de modificación, que se renueva en cada acierto).
+    """
+    def __init__(self, cache_dir="data/lgbm", params=None, max_bytes=None):
+        self.cache_dir = Path(cache_dir)
+        self.params = {"feature_pre_filter": False, "verbose": -1, **(params or {})}
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        params = config.get_section("lgbm_dataset")
+        if not params.get("enabled", True):
+            return None
+        return cls(cache_dir=config.get_path("lgbm_datasets") or "data/lgbm", params=params.get("params"),
+                   max_bytes=params.get("max_bytes"))
+
+    def dataset_params(self, params=None):
+        """Parámetros de binado efectivos: los del caché más los de binado del modelo."""
+        params = params or {}
+        return {**self.params, **{k: v for k, v in params.items() if k in BINNING_PARAMS}}
+
+    def _key(self, X, y, categorical, params, reference_key=""):
+        payload = json.dumps({"categorical": sorted(categorical), "params": params, "reference": reference_key},
+                             sort_keys=True, default=str)
+        return hashlib.sha256((frame_digest(X, y) + payload).encode()).hexdigest()[:32]
+
+    def _build(self, path, X, y, categorical, params, reference=None):
+        if path.exists():
+            self.stats["hits"] += 1
+            os.utime(path)
+            return
+        self.stats["misses"] += 1
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        dataset = lgb.Dataset(X, np.ravel(y), categorical_feature=categorical or "auto",
+                              params=params, reference=reference, free_raw_data=True).construct()
+        tmp = path.with_suffix(".tmp")
+        dataset.save_binary(str(tmp))
+        os.replace(tmp, path)
+        return dataset
+
+    def build(self, X_train, y_train, X_val=None, y_val=None, categorical=None, params=None):
+        """
+        Asegura que los binarios existan y devuelve sus rutas (train, valid | None).
+        Args:
+            params (dict, opcional): parámetros del modelo; solo se usan los de binado.
+        """
+        categorical = [c for c in (categorical or []) if c in X_train.columns]
+        params = self.dataset_params(params)
+        train_key = self._key(X_train, y_train, categorical, params)
+        train_path = self.cache_dir / f"{train_key}.train.bin"
+        train = self._build(train_path, X_train, y_train, categorical, params)
+        valid_path = None
+        if X_val is not None:
+            valid_path = self.cache_dir / f"{self._key(X_val, y_val, categorical, params, train_key)}.valid.bin"
+            if not valid_path.exists():
+                # El set de validación se bina con los bin mappers del de entrenamiento
+                train = train or lgb.Dataset(str(train_path), params=params).construct()
+            self._build(valid_path, X_val, y_val, categorical, params, reference=train)
+        self.prune(keep=(train_path, valid_path))
+        logger.info(f"🗄️ Caché de lgb.Dataset: {self.stats['hits']} aciertos, {self.stats['misses']} construcciones")
+        return train_path, valid_path
+
+    def prune(self, keep=()):
+        """Borra los binarios menos usados hasta quedar bajo `max_bytes` (salvo los de `keep`)."""
+        if self.max_bytes is None or not self.cache_dir.exists():
+            return
+        files = sorted((f.stat().st_mtime, f.stat().st_size, f) for f in self.cache_dir.glob("*.bin"))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats["evicted"] += 1
+            logger.info(f"🧹 Caché de lgb.Dataset: se descarta {path.name} ({size / 1e6:.1f} MB)")
+
+    def load(self, train_path, valid_path=None, params=None):
+        """
+        Abre los binarios como `lgb.Dataset`; el de validación referencia al de entrenamiento.
+        `params` deben ser los efectivos con los que se construyeron (`dataset_params`).
+        """
+        params = params if params is not None else self.params
+        train = lgb.Dataset(str(train_path), params=params)
+        valid = lgb.Dataset(str(valid_path), reference=train, params=params) if valid_path is not None else None
+        return train, valid
+
+    def datasets(self, X_train, y_train, X_val=None, y_val=None, categorical=None, params=None):
+        paths = self.build(X_train, y_train, X_val, y_val, categorical, params)
+        return self.load(*paths, params=self.dataset_params(params))
@@ -1,19 +1,44 @@
+import os
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from numpy import sqrt
-from src.evaluation.metrics import rmsle
+import pandas as pd
+from src.evaluation.metrics import make_rmsle
 import logging
 from src.utils import load_object
 from src.config import CONFIG
-import mlflow
+from src.utils import get_tracker
 
 logger = logging.getLogger(CONFIG.logger_name)
 
-def evaluate_model(model, X, y_true):
+def encoder_categories(pipeline_path=None):
+    """Categorías por columna del CategoricalEncoder del pipeline guardado ({} si no hay)."""
+    pipeline_path = pipeline_path or CONFIG.get_path('pipeline')
+    if not os.path.exists(pipeline_path):
+        return {}
+    encoder = load_object(pipeline_path).named_steps.get("categorical")
+    return getattr(encoder, "categories_", {})
+
+def decode_segments(breakdown, categories):
+    """Índice de códigos del encoder → valores originales (código i → categories[i]; -1 queda igual)."""
+    if categories is None:
+        return breakdown
+    n = len(categories)
+    # Con la matriz float32 los códigos llegan como 3.0: se aceptan si son enteros
+    labels = [categories[int(code)] if 0 <= code < n and code == int(code) else code for code in breakdown.index]
+    return breakdown.set_axis(pd.Index(labels, name=breakdown.index.name))
+
+def evaluate_model(model, X, y_true, segments=("store_nbr", "family"), categories=None):
+    """
+    Métricas de validación y RMSLE por segmento. Los segmentos se reportan con sus valores
+    originales usando `categories` (por defecto las del encoder del pipeline guardado).
+    """
     logger.info("✅ Evaluando modelo...")
     preds = model.predict(X)
     mae_score = mean_absolute_error(y_true, preds)
     rmse_score = sqrt(mean_squared_error(y_true, preds))
-    _, rmsle_score, _ = rmsle(y_true, preds)
+    metric = make_rmsle()
+    tracker = get_tracker()
+    rmsle_score = metric.score(y_true, preds)
     
     # Impresión bonita
     logger.info("📊 Resultados de evaluación:")
@@ -21,11 +46,22 @@ def evaluate_model(model, X, y_true):
     logger.info(f"   🔹 MAE   : {mae_score:.4f}")
     logger.info(f"   🔹 RMSLE : {rmsle_score:.4f}")
 
+    # Desglose por segmento (tienda / familia) en una pasada con bincount
+    breakdown = {}
+    categories = encoder_categories() if categories is None else categories
+    for column in segments:
+        if column in X.columns:
+            breakdown[column] = decode_segments(metric.by_segment(y_true, preds, X[column]), categories.get(column))
+            worst = breakdown[column]["rmsle"].nlargest(3)
+            logger.info(f"   🔸 Peores {column}: " + ", ".join(f"{k} ({v:.4f})" for k, v in worst.items()))
+            tracker.log_dict(breakdown[column].reset_index().to_dict(orient="list"), f"rmsle_by_{column}.json")
+
     #mlflow.log_metric("RMSE", rmse_score)
     #mlflow.log_metric("MAE", mae_score)
-    mlflow.log_metric("RMSLE_final", rmsle_score)
+    tracker.log_metric("RMSLE_final", rmsle_score)
 
     return {
         "RMSLE": rmsle_score,
         "RMSE": rmse_score,
-        "MAE": mae_score}
\ No newline at end of file
+        "MAE": mae_score,
+        "RMSLE_by_segment": breakdown}
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import mlflow
+import numpy as np
+import pandas as pd
+
+from src.config import CONFIG
+from src.data import DataLoader
+from src.features.lags import _day_numbers
+from src.training.model import train_model_lgbm
+from src.utils import get_tracker, load_object, save_object
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def lineage_path(model_path):
+    """El linaje vive junto al modelo: models/model_lgbm.pkl → models/model_lgbm.json."""
+    return Path(model_path).with_suffix(".json")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_lineage(model_path):
+    path = lineage_path(model_path)
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_model_with_lineage(model, model_path, data_end, parent=None):
+    """
+    Guarda el Booster y su registro de linaje: run de MLflow que lo produjo, árboles,
+    última fecha de datos vista y, si fue un warm start, el modelo del que partió.
+    """
+    save_object(model, model_path)
+    run = mlflow.active_run()
+    lineage = {
+        "run_id": run.info.run_id if run else None,
+        "num_trees": model.num_trees(),
+        "data_end": str(pd.Timestamp(data_end).date()),
+        "sha256": file_sha256(model_path),
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "warm_start": parent is not None,
+        "parent": {k: parent[k] for k in ("run_id", "num_trees", "data_end", "sha256")} if parent else None,
+    }
+    path = lineage_path(model_path)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(lineage, f, indent=2)
+    os.replace(tmp, path)
+    get_tracker().log_dict(lineage, "lineage.json")
+    return lineage
+
+
+def latest_date(loader=None):
+    """Última fecha del entrenamiento leyendo solo la columna de fecha."""
+    loader = loader or DataLoader()
+    date = CONFIG.get_variable("date")
+    return pd.Timestamp(loader.load_train_parquet(columns=[date])[date].max())
+
+
+def refresh_history(pipeline, X, y):
+    """
+    Extiende la historia del paso de lags con los días de la ventana reciente (`partial_fit`);
+    codificación de categorías y escalado conservan su estado ajustado.
+
+    La historia guardada está recortada: solo se agregan los días desde su inicio, así el
+    estado de las EWMAs continúa en lugar de reiniciarse.
+    Returns:
+        pd.Timestamp | None: primer día con todas las variables de lags cubiertas por la
+        historia (None si el pipeline no tiene lags).
+    """
+    lags = pipeline.named_steps.get("lags")
+    if lags is None:
+        return None
+    keep = _day_numbers(X[lags.date_column]) >= lags.start_day_
+    lags.partial_fit(X[keep], y[keep])
+    return pd.Timestamp(np.datetime64(int(lags.start_day_ + lags.tail_days), "D"))
+
+
+def prepare_recent_data(pipeline, scaler, start_date, val_days=16, loader=None):
+    """
+    Carga solo los días desde `start_date` (filtro empujado al lector de Parquet) y los
+    transforma con el pipeline y el scaler ya ajustados. Los últimos `val_days` días
+    quedan como validación temporal.
+    Returns:
+        X_train, X_val, y_train, y_val, data_end
+    """
+    loader = loader or DataLoader()
+    target, date = CONFIG.get_variable("target"), CONFIG.get_variable("date")
+    df = loader.load_train_parquet(start_date=start_date)
+    X, y = df.drop(columns=[target]), df[target]
+    days = pd.to_datetime(X[date])
+    data_end = days.max()
+    is_val = (days > data_end - pd.Timedelta(days=val_days)).to_numpy()
+
+    covered_from = refresh_history(pipeline, X, y)
+    if covered_from is not None and covered_from > days.min():
+        # Días anteriores a la historia guardada tendrían lags vacíos: no entran al ajuste
+        logger.info(f"📅 Historia de lags disponible desde {covered_from.date()}: se descartan días anteriores")
+        is_train = ~is_val & (days >= covered_from).to_numpy()
+    else:
+        is_train = ~is_val
+    X_train = pipeline.transform(X[is_train]).drop(columns=[date])
+    X_val = pipeline.transform(X[is_val]).drop(columns=[date])
+    y_train = scaler.transform(y[is_train].to_numpy().reshape(-1, 1))
+    y_val = scaler.transform(y[is_val].to_numpy().reshape(-1, 1))
+    logger.info(f"📅 Ventana reciente {pd.Timestamp(start_date).date()} → {data_end.date()}: "
+                f"{len(X_train)} filas de entrenamiento, {len(X_val)} de validación")
+    return X_train, X_val, y_train, y_val, data_end
+
+
+def warm_start(recent_days=90, val_days=16, extra_rounds=500, stopping_rounds=100, learning_rate=None, loader=None):
+    """
+    Reentrenamiento incremental: continúa el boosting del modelo guardado (`init_model`)
+    sobre los datos nuevos más una ventana reciente, con a lo sumo `extra_rounds` rondas.
+    Reutiliza el pipeline y el scaler guardados para que las codificaciones no cambien.
+    Returns:
+        (Booster, X_val, y_val, lineage)
+    """
+    model_path = CONFIG.get_path("model")
+    previous = load_object(model_path)
+    pipeline = load_object(CONFIG.get_path("pipeline"))
+    scaler = load_object(CONFIG.get_path("scaler"))
+    parent = load_lineage(model_path) or {
+        "run_id": None, "num_trees": previous.num_trees(), "data_end": None, "sha256": file_sha256(model_path)}
+
+    # Sin linaje (modelo anterior a este registro) la ventana se ancla al final de los datos
+    anchor = pd.Timestamp(parent["data_end"]) if parent["data_end"] else latest_date(loader)
+    start_date = anchor - pd.Timedelta(days=recent_days)
+    X_train, X_val, y_train, y_val, data_end = prepare_recent_data(pipeline, scaler, start_date, val_days, loader)
+
+    tracker = get_tracker()
+    tracker.set_tags({
+        "warm_start": "true",
+        "parent_run_id": parent["run_id"] or "",
+        "parent_model_sha256": parent["sha256"],
+    })
+    tracker.log_params({"init_trees": previous.num_trees(), "extra_rounds": extra_rounds,
+                       "data_start": str(start_date.date()), "data_end": str(data_end.date())})
+    logger.info(f"♻️ Warm start desde {previous.num_trees()} árboles (+{extra_rounds} rondas como máximo)")
+    params = {"learning_rate": learning_rate} if learning_rate else None
+    model = train_model_lgbm(X_train, X_val, y_train, y_val, init_model=previous,
+                             num_boost_round=extra_rounds, stopping_rounds=stopping_rounds, params=params)
+
+    # El pipeline guardado lleva la historia de lags actualizada para predecir
+    save_object(pipeline, CONFIG.get_path("pipeline"))
+    lineage = save_model_with_lineage(model, model_path, data_end, parent=parent)
+    return model, X_val, y_val, lineage
@@ -0,0 +1,137 @@
+import gc
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from src.config import CONFIG
+from src.data import DataLoader
+from src.features import (CalendarFeatureAdder, CyclicEncoder, DataMerger, DatePartAdder, LookupJoiner,
+                          WeekendFlagger)
+from src.utils import peak_rss_mb
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+class TrainingMatrixBuilder:
+    """
+    Construye la matriz de entrenamiento sin materializar el dataset como DataFrame.
+
+    El entrenamiento se lee en lotes (`DataLoader.iter_train`) y nunca está entero en memoria:
+    1. Una pasada de conteo (solo la columna target) fija el tamaño y el split train/val,
+       expresado como la posición de destino de cada fila.
+    2. Una pasada por cada paso del pipeline con `partial_fit` (lags, categorías, escalado),
+       solo con las filas de entrenamiento; los pasos sin estado (`STATELESS`, cuyo ajuste
+       no depende de las filas) se ajustan con un lote. Cualquier otro paso es un error.
+    3. Una pasada final transforma cada lote y lo escribe en una matriz float32
+       preasignada: train ocupa las primeras filas y val las últimas, así ambos son vistas.
+
+    Se respeta el orden y el split de `train_test_split` del camino en memoria, por lo
+    que el resultado es el mismo que `prepare_data` con menos memoria pico.
+    """
+    # Pasos cuyo fit no aprende de los datos (tablas de dimensión, calendario)
+    STATELESS = (LookupJoiner, DataMerger, CalendarFeatureAdder, DatePartAdder, CyclicEncoder, WeekendFlagger)
+
+    def __init__(self, pipeline, loader=None, batch_rows=500_000, test_size=0.2, random_state=42,
+                 dtype=np.float32, config=CONFIG):
+        self.pipeline = pipeline
+        self.loader = loader or DataLoader(config)
+        self.batch_rows = batch_rows
+        self.test_size = test_size
+        self.random_state = random_state
+        self.dtype = dtype
+        self.target = config.get_variable('target')
+        self.date = config.get_variable('date')
+        self.stages = []
+
+    def _batches(self, columns=None):
+        """Lotes (X, y) con su desplazamiento global de filas."""
+        offset = 0
+        for df in self.loader.iter_train(batch_rows=self.batch_rows, columns=columns):
+            y = df.pop(self.target).to_numpy(dtype=np.float64)
+            yield offset, df, y
+            offset += len(df)
+
+    def _stage(self, name, start_time):
+        record = {"stage": name, "seconds": time.perf_counter() - start_time, "peak_rss_mb": peak_rss_mb()}
+        self.stages.append(record)
+        logger.info(f"🧮 {name}: {record['seconds']:.2f} s | RSS pico {record['peak_rss_mb']:.0f} MB")
+
+    def _through(self, X, y, stop):
+        """Aplica los pasos [0, stop); los que no tienen estado se ajustan con el primer lote."""
+        for name, step in self.pipeline.steps[:stop]:
+            if name not in self.fitted_:
+                step.fit(X, y)
+                self.fitted_.add(name)
+            X = step.transform(X)
+        return X
+
+    def split(self):
+        """Conteo de filas y destino de cada una: train → [0, n_train), val → [n_train, n)."""
+        start_time = time.perf_counter()
+        n_rows = sum(len(y) for _, _, y in self._batches(columns=[self.target]))
+        train_idx, val_idx = train_test_split(np.arange(n_rows), test_size=self.test_size,
+                                              random_state=self.random_state)
+        self.n_train_ = len(train_idx)
+        self.destination_ = np.empty(n_rows, dtype=np.int64)
+        self.destination_[train_idx] = np.arange(len(train_idx))
+        self.destination_[val_idx] = np.arange(len(train_idx), n_rows)
+        self._stage(f"conteo ({n_rows} filas)", start_time)
+        return self
+
+    def fit(self):
+        """Ajusta el pipeline por pasadas sobre las filas de entrenamiento."""
+        unsupported = [name for name, step in self.pipeline.steps
+                       if not hasattr(step, "partial_fit") and not isinstance(step, self.STATELESS)]
+        if unsupported:
+            raise TypeError(f"Pasos sin partial_fit que aprenden de los datos: {unsupported}. "
+                            "No se pueden ajustar por lotes; agregar partial_fit o usar prepare_data en memoria.")
+        if not hasattr(self, "destination_"):
+            self.split()
+        self.fitted_ = set()
+        for i, (name, step) in enumerate(self.pipeline.steps):
+            if not hasattr(step, "partial_fit"):
+                continue
+            start_time = time.perf_counter()
+            for offset, X, y in self._batches():
+                is_train = self.destination_[offset:offset + len(X)] < self.n_train_
+                if is_train.any():
+                    step.partial_fit(self._through(X[is_train], y[is_train], i), y[is_train])
+            self.fitted_.add(name)
+            self._stage(f"ajuste de {name}", start_time)
+        return self
+
+    def transform(self):
+        """
+        Escribe cada lote transformado en la matriz preasignada.
+        Returns:
+            (np.ndarray de features, np.ndarray del target, nombres de columnas)
+        """
+        start_time = time.perf_counter()
+        matrix, target, columns = None, np.empty(len(self.destination_)), None
+        for offset, X, y in self._batches():
+            X = self._through(X, y, len(self.pipeline.steps)).drop(columns=[self.date])
+            if matrix is None:
+                columns = list(X.columns)
+                matrix = np.empty((len(self.destination_), len(columns)), dtype=self.dtype)
+            rows = self.destination_[offset:offset + len(X)]
+            matrix[rows] = X[columns].to_numpy(dtype=self.dtype)
+            target[rows] = y
+            del X
+        gc.collect()
+        self._stage(f"transformación ({matrix.nbytes / 1e6:.0f} MB)", start_time)
+        return matrix, target, columns
+
+    def build(self):
+        """
+        Returns:
+            X_train, X_val (DataFrames sobre vistas de la matriz, sin copia), y_train, y_val
+        """
+        self.split().fit()
+        matrix, target, columns = self.transform()
+        n_train = self.n_train_
+        X_train = pd.DataFrame(matrix[:n_train], columns=columns, copy=False)
+        X_val = pd.DataFrame(matrix[n_train:], columns=columns, copy=False)
+        return X_train, X_val, target[:n_train], target[n_train:]
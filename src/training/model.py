@@ -1,47 +1,54 @@
-from lightgbm import LGBMRegressor, early_stopping, log_evaluation
-from src.evaluation.metrics import rmsle
+import lightgbm as lgb
+from lightgbm import early_stopping, log_evaluation
+from src.evaluation.metrics import make_rmsle
+from src.training.dataset_cache import LGBMDatasetCache
 import logging
 from src.config import CONFIG
-import mlflow
-import mlflow.sklearn
-import mlflow.lightgbm
-from mlflow.models.signature import infer_signature
+from src.utils import get_tracker
 
 logger = logging.getLogger(CONFIG.logger_name)
 
-def train_model_lgbm(X_train, X_val, y_train, y_val):
+def train_model_lgbm(X_train, X_val, y_train, y_val, init_model=None, num_boost_round=None, stopping_rounds=1000, params=None):
+    """
+    Entrena LightGBM con early stopping sobre la validación.
 
-    model_params = CONFIG.get_model_params()
-    categorical = CONFIG.get_variable('categorical')
-    mlflow.lightgbm.autolog()
-    
-    model = LGBMRegressor(**model_params)
-    
-    #mlflow.log_params(model_params)
-    mlflow.log_param("model", CONFIG.get_active_model_name())
+    Con `init_model` (Booster previo) el boosting continúa desde sus árboles y agrega a
+    lo sumo `num_boost_round` rondas; `params` reemplaza parámetros del config
+    (p. ej. un learning_rate menor para el reentrenamiento incremental).
+    """
+    model_params = {**CONFIG.get_model_params(), **(params or {})}
+    categorical = CONFIG.get_variable('categorical', flatten=True)
+    n_estimators = model_params.pop("n_estimators", 100)
+    num_boost_round = num_boost_round or n_estimators
+    tracker = get_tracker()
+
+    # Dataset binado una sola vez y reutilizado desde disco en corridas siguientes
+    # Con init_model LightGBM calcula el init_score desde los datos crudos: no sirve el binario
+    cache = LGBMDatasetCache.from_config() if init_model is None else None
+    if cache is not None:
+        train_set, val_set = cache.datasets(X_train, y_train, X_val, y_val, categorical=categorical, params=model_params)
+    else:
+        categorical = [c for c in categorical if c in X_train.columns]
+        train_set = lgb.Dataset(X_train, y_train.ravel(), categorical_feature=categorical, params={"feature_pre_filter": False})
+        val_set = lgb.Dataset(X_val, y_val.ravel(), reference=train_set)
+
+    tracker.log_params({**model_params, "num_boost_round": num_boost_round, "model": CONFIG.get_active_model_name()})
     logger.info("🚀 Entrenando modelo LightGBM...")
-    model.fit(
-        X_train, y_train, eval_set=[(X_val, y_val)],
-        categorical_feature=categorical,
-        eval_metric= rmsle,
+    model = lgb.train(
+        {**model_params, "verbose": -1}, train_set, num_boost_round=num_boost_round,
+        valid_sets=[val_set], valid_names=["valid"], init_model=init_model,
+        # Parámetros del scaler capturados una vez, no en cada ronda
+        feval=make_rmsle().feval,
         callbacks=[
-            early_stopping(stopping_rounds=1000, min_delta=1e-7),
-            log_evaluation(period=1000)
+            early_stopping(stopping_rounds=stopping_rounds, min_delta=1e-7),
+            log_evaluation(period=1000),
+            # Métricas por ronda encoladas; el envío a MLflow ocurre en segundo plano
+            tracker.lightgbm_callback(period=10),
         ]
     )
+    tracker.log_metric("best_iteration", model.best_iteration)
 
-    # Ejemplo de datos de entrada usados en el modelo
-    input_example = X_train.iloc[:5]  # muestra representativa
-
-    # Inferencia de la firma
-    signature = infer_signature(X_train, model.predict(X_train))
-
-    #mlflow.sklearn.log_model(
-    #    sk_model=model,
-    #    artifact_path="model",
-    #    signature=signature,
-    #    input_example=input_example,
-    #    registered_model_name="lgbm_store_sales"
-    #)
+    # Firma inferida con una muestra: sin predecir sobre todo el entrenamiento
+    tracker.log_model(model, "model", flavor="lightgbm", sample=X_train)
 
-    return model
\ No newline at end of file
+    return model
@@ -0,0 +1,250 @@
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from src.config import CONFIG
+from src.utils import load_object
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def group_rows(values):
+    """
+    Agrupa filas por valor con un solo argsort estable.
+    Returns:
+        list[(valor, np.ndarray de posiciones)]
+    """
+    codes, uniques = pd.factorize(np.asarray(values), sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    groups = np.split(order, bounds)
+    return [(uniques[codes[g[0]]], g) for g in groups if len(g) and codes[g[0]] >= 0]
+
+
+def _segment_name(key, categories=None):
+    """Nombre del segmento: su valor original según las categorías del encoder, o el código."""
+    key = key.item() if hasattr(key, "item") else key
+    # Con la matriz float32 los códigos llegan como 3.0: se nombran igual que el código entero
+    if isinstance(key, float) and key.is_integer():
+        key = int(key)
+    if categories is not None and isinstance(key, int) and 0 <= key < len(categories):
+        return str(categories[key])
+    return str(key)
+
+
+def _file_name(name):
+    """Nombre de archivo seguro para un segmento (p. ej. "BREAD/BAKERY" → "BREAD_BAKERY.txt")."""
+    return re.sub(r"[^\w.-]+", "_", name) + ".txt"
+
+
+def _fit_segment(key, X_train, y_train, X_val, y_val, params, num_boost_round, stopping_rounds, categorical):
+    start_time = time.perf_counter()
+    categorical = [c for c in categorical if c in X_train.columns]
+    train_set = lgb.Dataset(X_train, np.ravel(y_train), categorical_feature=categorical, params={"feature_pre_filter": False})
+    valid_sets, callbacks = [], []
+    if X_val is not None and len(X_val):
+        valid_sets = [lgb.Dataset(X_val, np.ravel(y_val), reference=train_set)]
+        callbacks = [lgb.early_stopping(stopping_rounds, verbose=False)]
+    booster = lgb.train({**params, "verbose": -1}, train_set, num_boost_round=num_boost_round,
+                        valid_sets=valid_sets, callbacks=callbacks)
+    return key, booster.model_to_string(), {
+        "rows": len(X_train),
+        "best_iteration": booster.best_iteration or booster.current_iteration(),
+        "seconds": time.perf_counter() - start_time,
+    }
+
+
+class SegmentedTrainer:
+    """
+    Entrena un modelo LightGBM por segmento (family, cluster o type de stores.csv).
+
+    Los segmentos se entrenan en paralelo en un pool de procesos, cada uno con
+    `threads_per_worker` hilos de LightGBM. El resultado es un set de modelos en
+    `<model_dir>/<segment_by>/`: un booster en texto por segmento y un `manifest.json`.
+    `fit_segment` reentrena un único segmento y actualiza solo su entrada del set.
+
+    `categories` son las categorías del CategoricalEncoder para `segment_by` (código i →
+    categories[i]): con ellas los segmentos se nombran y se piden por su valor original
+    ("BEVERAGES") en lugar del código interno. `from_config` las toma del pipeline guardado.
+    """
+    MANIFEST = "manifest.json"
+
+    def __init__(self, segment_by="family", model_params=None, model_dir="models/segments", threads_per_worker=2,
+                 max_workers=None, stopping_rounds=200, categorical=None, categories=None, config=CONFIG):
+        self.segment_by = segment_by
+        self.model_params = dict(model_params if model_params is not None else config.get_model_params())
+        self.model_dir = Path(model_dir) / segment_by
+        self.threads_per_worker = threads_per_worker
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.stopping_rounds = stopping_rounds
+        self.categorical = categorical if categorical is not None else config.get_variable('categorical', flatten=True)
+        self.categories = None if categories is None else pd.Index(categories)
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        params = config.get_section("segments")
+        segment_by = params.get("segment_by", "family")
+        pipeline_path = Path(config.get_path("pipeline"))
+        categories = None
+        if pipeline_path.exists():
+            encoder = load_object(pipeline_path).named_steps.get("categorical")
+            categories = getattr(encoder, "categories_", {}).get(segment_by)
+        return cls(
+            segment_by=segment_by,
+            model_dir=config.get_path("segment_models") or "models/segments",
+            threads_per_worker=params.get("threads_per_worker", 2),
+            max_workers=params.get("max_workers"),
+            stopping_rounds=params.get("stopping_rounds", 200),
+            categories=categories,
+            config=config,
+        )
+
+    def _train_args(self):
+        params = dict(self.model_params)
+        num_boost_round = params.pop("n_estimators", 100)
+        params.pop("n_jobs", None)
+        params["num_threads"] = self.threads_per_worker
+        return params, num_boost_round, self.stopping_rounds, self.categorical
+
+    def _manifest(self):
+        path = self.model_dir / self.MANIFEST
+        if not path.exists():
+            return {"segment_by": self.segment_by, "segments": {}}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save(self, results, features):
+        """Escribe los boosters y fusiona sus entradas en el manifest (escritura atómica)."""
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._manifest()
+        manifest["features"] = features
+        if self.categories is not None:
+            manifest["categories"] = [str(c) for c in self.categories]
+        for key, model_str, stats in results:
+            name = _segment_name(key, self.categories)
+            file = _file_name(name)
+            with open(self.model_dir / file, "w") as f:
+                f.write(model_str)
+            manifest["segments"][name] = {**stats, "file": file, "trained_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        tmp = self.model_dir / (self.MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.model_dir / self.MANIFEST)
+        return manifest
+
+    def _split(self, X, y, keys=None):
+        """Parte (X, y) por segmento; cada grupo es una copia de sus filas (`X.iloc[rows]`)."""
+        y = np.ravel(y)
+        groups = group_rows(X[self.segment_by])
+        return {key: (X.iloc[rows], y[rows]) for key, rows in groups if keys is None or key in keys}
+
+    def fit(self, X_train, y_train, X_val=None, y_val=None):
+        """
+        Entrena todos los segmentos presentes en X_train.
+        Returns:
+            SegmentRouter: router sobre el set de modelos recién guardado.
+        """
+        train = self._split(X_train, y_train)
+        val = self._split(X_val, y_val) if X_val is not None else {}
+        args = self._train_args()
+        logger.info(f"🧩 Entrenando {len(train)} segmentos por {self.segment_by} "
+                    f"({self.max_workers} procesos × {self.threads_per_worker} hilos)")
+        # spawn: el proceso puede tener hilos vivos (p. ej. el registro de MLflow) y un fork los copiaría a medias
+        with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_fit_segment, key, Xs, ys, *val.get(key, (None, None)), *args)
+                for key, (Xs, ys) in train.items()
+            ]
+            results = [future.result() for future in futures]
+        for key, _, stats in results:
+            logger.info(f"   🔹 {self.segment_by}={_segment_name(key, self.categories)}: {stats['rows']} filas, {stats['best_iteration']} árboles ({stats['seconds']:.1f}s)")
+        self._save(results, list(X_train.columns))
+        return SegmentRouter.load(self.model_dir)
+
+    def encode_segment(self, segment, dtype=None):
+        """
+        Código de la columna codificada para un valor de segmento (p. ej. el texto de `--segment`).
+        Con `categories` se busca el valor original; sin ellas se convierte al tipo `dtype`.
+        """
+        if self.categories is None:
+            return pd.Series([segment]).astype(dtype).iloc[0] if dtype is not None else segment
+        position = pd.Index(self.categories.astype(str)).get_indexer([str(segment)])[0]
+        if position < 0:
+            raise ValueError(f"Segmento desconocido {self.segment_by}={segment!r}; "
+                             f"valores posibles: {', '.join(map(str, self.categories))}")
+        return position
+
+    def fit_segment(self, segment, X_train, y_train, X_val=None, y_val=None):
+        """
+        Reentrena solo el segmento `segment` (valor original, ver `encode_segment`) con las
+        filas de X que le pertenecen y actualiza su entrada del set.
+        """
+        key = self.encode_segment(segment, X_train[self.segment_by].dtype)
+        train = self._split(X_train, y_train, keys=[key])
+        if key not in train:
+            raise ValueError(f"El segmento {self.segment_by}={segment!r} no tiene filas de entrenamiento")
+        Xs, ys = train[key]
+        Xv, yv = self._split(X_val, y_val, keys=[key]).get(key, (None, None)) if X_val is not None else (None, None)
+        result = _fit_segment(key, Xs, ys, Xv, yv, *self._train_args())
+        logger.info(f"🔁 Segmento {self.segment_by}={segment} reentrenado ({result[2]['seconds']:.1f}s)")
+        self._save([result], list(X_train.columns))
+        return SegmentRouter.load(self.model_dir)
+
+
+class SegmentRouter:
+    """
+    Despacha filas de predicción al modelo de su segmento.
+
+    Las filas se agrupan una vez por valor de `segment_by` y cada modelo predice su
+    grupo completo en una sola llamada; el resultado vuelve al orden original.
+    Segmentos sin modelo usan `fallback` (p. ej. el modelo global) o quedan en NaN.
+    Los modelos se indexan por nombre de segmento; con `categories` los códigos de la
+    columna se traducen al valor original.
+    """
+    def __init__(self, segment_by, models, fallback=None, categories=None):
+        self.segment_by = segment_by
+        self.models = models
+        self.fallback = fallback
+        self.categories = categories
+
+    @classmethod
+    def load(cls, model_dir, fallback=None):
+        model_dir = Path(model_dir)
+        with open(model_dir / SegmentedTrainer.MANIFEST, "r") as f:
+            manifest = json.load(f)
+        models = {name: lgb.Booster(model_file=str(model_dir / entry["file"])) for name, entry in manifest["segments"].items()}
+        return cls(manifest["segment_by"], models, fallback, manifest.get("categories"))
+
+    def predict(self, X):
+        preds = np.full(len(X), np.nan)
+        for key, rows in group_rows(X[self.segment_by]):
+            model = self.models.get(_segment_name(key, self.categories), self.fallback)
+            if model is not None:
+                preds[rows] = model.predict(X.iloc[rows])
+        return preds
+
+
+def load_prediction_model(config=CONFIG):
+    """
+    Modelo para inferencia. Con `segments.enabled` es el SegmentRouter del set guardado,
+    con el modelo global como `fallback` si existe; si no, el modelo global.
+    """
+    model_path = Path(config.get_path("model"))
+    params = config.get_section("segments")
+    if not params.get("enabled", False):
+        return load_object(model_path)
+    fallback = load_object(model_path) if model_path.exists() else None
+    model_dir = Path(config.get_path("segment_models") or "models/segments") / params.get("segment_by", "family")
+    router = SegmentRouter.load(model_dir, fallback)
+    logger.info(f"🧩 {len(router.models)} modelos por {router.segment_by} desde {model_dir} "
+                f"({'modelo global' if fallback is not None else 'sin modelo'} para segmentos sin modelo)")
+    return router
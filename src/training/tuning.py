@@ -0,0 +1,207 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import mlflow
+import numpy as np
+import pandas as pd
+
+from src.config import CONFIG
+from src.training.dataset_cache import LGBMDatasetCache
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+
+def sample_space(space, n_trials=None, seed=42):
+    """
+    Combinaciones del search_space: la grilla completa si n_trials es None (o la cubre),
+    o n_trials puntos distintos de la grilla elegidos al azar sin enumerarla entera.
+    """
+    names = list(space)
+    sizes = [len(space[name]) for name in names]
+    total = int(np.prod(sizes)) if names else 0
+    if n_trials is None or n_trials >= total:
+        return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    rng = np.random.default_rng(seed)
+    flat = rng.choice(total, size=n_trials, replace=False)
+    positions = np.unravel_index(flat, sizes)
+    return [{name: space[name][pos[i]] for name, pos in zip(names, positions)} for i in range(n_trials)]
+
+
+# Rutas de los binarios y features en memmap, abiertos una sola vez por proceso del pool
+_DATA = {}
+
+
+def _init_worker(train_path, valid_path, X_train_path, X_val_path, scores_dir, dataset_params):
+    _DATA.update(
+        paths=(train_path, valid_path),
+        dataset_params=dataset_params,
+        X={"train": np.load(X_train_path, mmap_mode="r"), "valid": np.load(X_val_path, mmap_mode="r")},
+        scores_dir=scores_dir,
+    )
+
+
+def _scores_path(trial):
+    return os.path.join(_DATA["scores_dir"], f"trial_{trial}.npz")
+
+
+def _run_trial(trial, params, rounds, done, stopping_rounds, metric):
+    """
+    Lleva el trial de `done` a `rounds` rondas. Si ya tiene rondas, el boosting continúa
+    desde sus predicciones guardadas (init_score) en lugar de reentrenar desde cero.
+    """
+    start_time = time.perf_counter()
+    # Datasets nuevos por trial: el init_score de un trial no puede quedar en el de otro
+    datasets = dict(zip(("train", "valid"), LGBMDatasetCache().load(*_DATA["paths"], params=_DATA["dataset_params"])))
+    init = np.load(_scores_path(trial)) if done else None
+    if init is not None:
+        for name, dataset in datasets.items():
+            dataset.set_init_score(init[name])
+    history = {}
+    booster = lgb.train(
+        {**params, "metric": metric, "verbose": -1},
+        datasets["train"], num_boost_round=rounds - done, valid_sets=[datasets["valid"]], valid_names=["valid"],
+        callbacks=[lgb.early_stopping(stopping_rounds, verbose=False), lgb.record_evaluation(history)],
+    )
+    curve = history["valid"][metric]
+    stopped = len(curve) < rounds - done
+    if not stopped:
+        # Predicción acumulada (init_score + árboles nuevos) para el próximo escalón
+        np.savez(_scores_path(trial), **{
+            name: (init[name] if init is not None else 0.0) + booster.predict(X, raw_score=True, num_iteration=-1)
+            for name, X in _DATA["X"].items()
+        })
+    return {"trial": trial, "rounds": rounds, "curve": curve, "stopped": stopped,
+            "seconds": time.perf_counter() - start_time}
+
+
+class SuccessiveHalvingTuner:
+    """
+    Búsqueda de hiperparámetros de LightGBM sobre `model.lgbm.search_space`.
+
+    - Todos los trials comparten un único `lgb.Dataset` binado, tomado del caché binario
+      (`LGBMDatasetCache`); cada proceso del pool lo carga sin volver a binar.
+    - Los trials corren en paralelo, cada uno con `threads_per_trial` hilos de LightGBM.
+    - Successive halving: todos empiezan con `min_rounds` rondas; en cada escalón
+      sobrevive 1/eta de los trials (mejor métrica de validación) y el presupuesto se
+      multiplica por eta, hasta el `n_estimators` de cada combinación. Los que siguen
+      continúan su boosting desde el escalón anterior: solo se entrenan las rondas nuevas.
+    - Cada trial queda como un run anidado de MLflow con su curva de validación.
+    """
+    def __init__(self, space=None, base_params=None, n_trials=None, seed=42, threads_per_trial=2,
+                 max_workers=None, min_rounds=100, eta=3, stopping_rounds=50, metric="l1",
+                 categorical=None, dataset_cache=None, config=CONFIG):
+        self.space = space if space is not None else config.get_search_space()
+        self.base_params = dict(base_params if base_params is not None else config.get_model_params())
+        self.n_trials = n_trials
+        self.seed = seed
+        self.threads_per_trial = threads_per_trial
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+        self.min_rounds = min_rounds
+        self.eta = eta
+        self.stopping_rounds = stopping_rounds
+        self.metric = metric
+        self.categorical = categorical if categorical is not None else config.get_variable('categorical', flatten=True)
+        self.dataset_cache = dataset_cache
+
+    @classmethod
+    def from_config(cls, config=CONFIG):
+        params = config.get_section("tuning")
+        return cls(
+            n_trials=params.get("n_trials"),
+            seed=params.get("seed", 42),
+            threads_per_trial=params.get("threads_per_trial", 2),
+            max_workers=params.get("max_workers"),
+            min_rounds=params.get("min_rounds", 100),
+            eta=params.get("eta", 3),
+            stopping_rounds=params.get("stopping_rounds", 50),
+            metric=params.get("metric", "l1"),
+            dataset_cache=LGBMDatasetCache.from_config(config),
+            config=config,
+        )
+
+    def _trial_params(self, combination):
+        params = {**self.base_params, **combination, "num_threads": self.threads_per_trial}
+        # n_estimators no es un parámetro de lgb.train: es el tope de rondas del trial
+        max_rounds = params.pop("n_estimators", None) or 1000
+        params.pop("n_jobs", None)
+        return params, max_rounds
+
+    def _save_datasets(self, tmp, X_train, X_val, y_train, y_val):
+        # Sin caché configurado, los binarios viven solo durante la búsqueda
+        cache = self.dataset_cache or LGBMDatasetCache(tmp)
+        # Sin prefiltrado de features: el mismo binado sirve para todos los min_child_samples del espacio
+        params = {**self.base_params, "feature_pre_filter": False}
+        paths = cache.build(X_train, y_train, X_val, y_val, categorical=self.categorical, params=params)
+        # Features crudas para predecir entre escalones (cada proceso las abre en memmap)
+        arrays = os.path.join(tmp, "X_train.npy"), os.path.join(tmp, "X_val.npy")
+        for path, X in zip(arrays, (X_train, X_val)):
+            np.save(path, X.to_numpy(dtype=np.float64))
+        return tuple(str(path) for path in paths) + arrays + (tmp, cache.dataset_params(params))
+
+    def run(self, X_train, X_val, y_train, y_val):
+        """
+        Returns:
+            pd.DataFrame: un trial por fila con sus parámetros, presupuesto alcanzado, mejor
+            métrica y el escalón en el que fue descartado (NaN si llegó al final).
+        """
+        combinations = sample_space(self.space, self.n_trials, self.seed)
+        trials = {i: self._trial_params(c) for i, c in enumerate(combinations)}
+        results = {i: {"trial": i, **combinations[i], "pruned_at": np.nan, "rounds": 0, "curve": []} for i in trials}
+        logger.info(f"🎛️ Tuning: {len(trials)} trials, {self.max_workers} procesos × {self.threads_per_trial} hilos")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = self._save_datasets(tmp, X_train, X_val, y_train, y_val)
+            with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=paths) as pool:
+                survivors, budget, rung = list(trials), self.min_rounds, 0
+                while survivors:
+                    futures = [
+                        pool.submit(_run_trial, i, trials[i][0], min(budget, trials[i][1]), results[i]["rounds"],
+                                    self.stopping_rounds, self.metric)
+                        for i in survivors
+                    ]
+                    scores = {}
+                    for future in futures:
+                        out = future.result()
+                        result = results[out["trial"]]
+                        curve = result["curve"] + out["curve"]
+                        result.update(score=float(min(curve)), rounds=out["rounds"], curve=curve,
+                                      best_iteration=int(np.argmin(curve)) + 1,
+                                      finished=out["stopped"] or out["rounds"] >= trials[out["trial"]][1],
+                                      seconds=result.get("seconds", 0.0) + out["seconds"])
+                        scores[out["trial"]] = result["score"]
+                    ranked = sorted(survivors, key=scores.get)
+                    keep = max(1, len(ranked) // self.eta)
+                    for i in ranked[keep:]:
+                        if not results[i]["finished"]:
+                            results[i]["pruned_at"] = rung
+                    logger.info(f"   🔹 Escalón {rung}: {len(survivors)} trials a {budget} rondas, "
+                                f"mejor {self.metric} {scores[ranked[0]]:.5f}")
+                    # Siguen los mejores que aún no agotaron sus rondas ni pararon por early stopping
+                    survivors = [i for i in ranked[:keep] if not results[i]["finished"]]
+                    budget, rung = budget * self.eta, rung + 1
+
+        self._log_mlflow(results)
+        report = pd.DataFrame([{k: v for k, v in r.items() if k != "curve"} for r in results.values()])
+        report = report.sort_values("score", ignore_index=True)
+        logger.info(f"🏆 Mejor trial {report.loc[0, 'trial']}: {self.metric} {report.loc[0, 'score']:.5f}")
+        return report
+
+    def _log_mlflow(self, results):
+        """Un run anidado por trial (desde el proceso principal), con su curva de validación."""
+        for result in results.values():
+            with mlflow.start_run(run_name=f"trial_{result['trial']}", nested=True):
+                mlflow.log_params({k: result[k] for k in self.space})
+                mlflow.log_metric(f"best_{self.metric}", result["score"])
+                mlflow.log_metric("rounds", result["rounds"])
+                if not np.isnan(result["pruned_at"]):
+                    mlflow.set_tag("pruned_at_rung", int(result["pruned_at"]))
+                curve = result["curve"]
+                for step in range(0, len(curve), max(1, len(curve) // 100)):
+                    mlflow.log_metric(f"valid_{self.metric}", curve[step], step=step + 1)
@@ -0,0 +1,20 @@
+from src.training import prepare_data
+from src.training.tuning import SuccessiveHalvingTuner
+from src.utils.logging import setup_logger
+from src.config import CONFIG
+import mlflow
+
+logger = setup_logger(CONFIG.logger_name, CONFIG.get_path('train_log'))
+
+def main():
+    mlflow.set_experiment("store-sales")
+    with mlflow.start_run(run_name="LGBM_Tuning"):
+        X_train, X_val, y_train, y_val = prepare_data()
+        report = SuccessiveHalvingTuner.from_config().run(X_train, X_val, y_train, y_val)
+        best = report.iloc[0]
+        mlflow.log_params({f"best_{k}": best[k] for k in CONFIG.get_search_space()})
+        mlflow.log_metric("best_score", best["score"])
+        logger.info(f"✅ Tuning finalizado: {len(report)} trials, mejores parámetros {best[list(CONFIG.get_search_space())].to_dict()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,4 @@
 from .serialization import *
-from .logging import *
\ No newline at end of file
+from .logging import *
+from .profiling import *
+from .tracking import *
\ No newline at end of file
@@ -9,4 +9,14 @@ def parse_args():
         choices=["None", "Staging", "Production"],
         help="Registra el modelo. Usa 'Staging' o 'Production' para asignar etapa, o nada para dejarlo sin etapa."
     )
+    parser.add_argument(
+        "--segment",
+        default=None,
+        help="Con segments.enabled, reentrena solo este segmento (valor original de segments.segment_by, p. ej. BEVERAGES)."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Continúa el boosting del modelo guardado sobre los datos recientes (sección incremental del config)."
+    )
     return parser.parse_args()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-import mlflow
+from src.utils.tracking import get_tracker
 
 def setup_logger(name: str = 'store_sales', log_file: str = "logs/default.log", level=logging.INFO) -> logging.Logger:
     """
@@ -55,4 +55,4 @@ def log_pipeline_readable(pipeline):
     Registra en MLflow una representación legible del pipeline en formato JSON.
     """
     pipeline_dict = {name: step.__class__.__name__ for name, step in pipeline.steps}
-    mlflow.log_dict(pipeline_dict, "pipeline_structure.json")
+    get_tracker().log_dict(pipeline_dict, "pipeline_structure.json")
@@ -0,0 +1,51 @@
+import logging
+import resource
+import time
+import tracemalloc
+import pandas as pd
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+__all__ = ["peak_rss_mb", "profile_pipeline"]
+
+
+def peak_rss_mb() -> float:
+    """Memoria residente pico del proceso (MB), según el sistema operativo."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def profile_pipeline(pipeline, X, y=None, fit=False):
+    """
+    Ejecuta un pipeline paso a paso registrando tiempo y memoria de cada paso.
+
+    Args:
+        pipeline (Pipeline): Pipeline de sklearn (ajustado si fit=False).
+        X (pd.DataFrame): Datos de entrada.
+        y (array-like, opcional): Target, solo se usa con fit=True.
+        fit (bool): Si True usa fit_transform en cada paso; si no, transform.
+
+    Returns:
+        tuple: (salida del pipeline, DataFrame con step, seconds, peak_mb, retained_mb y rss_mb).
+            peak_mb es el pico de memoria asignada durante el paso por encima de la que había al empezarlo.
+    """
+    records = []
+    tracemalloc.start()
+    try:
+        for name, step in pipeline.steps:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            start_time = time.perf_counter()
+            X = step.fit_transform(X, y) if fit else step.transform(X)
+            current, peak = tracemalloc.get_traced_memory()
+            records.append({
+                "step": name,
+                "seconds": time.perf_counter() - start_time,
+                "peak_mb": (peak - base) / 1e6,
+                "retained_mb": (current - base) / 1e6,
+                "rss_mb": peak_rss_mb(),
+            })
+            logger.info(f"⏱️ {name}: {records[-1]['seconds']:.2f} s | pico +{records[-1]['peak_mb']:.1f} MB")
+    finally:
+        tracemalloc.stop()
+    return X, pd.DataFrame(records)
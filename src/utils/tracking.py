@@ -0,0 +1,210 @@
+import copy
+import importlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+from src.config import CONFIG
+
+logger = logging.getLogger(CONFIG.logger_name)
+
+__all__ = ["AsyncMlflowLogger", "async_logging", "get_tracker", "sample_signature"]
+
+# Límites de MLflow por llamada a log_batch
+_MAX_METRICS, _MAX_PARAMS_TAGS = 1000, 100
+
+
+def sample_signature(model, sample, method="predict"):
+    """Firma del modelo inferida con una muestra pequeña, no con el dataset completo."""
+    from mlflow.models.signature import infer_signature
+    output = getattr(model, method)(sample) if method else None
+    return infer_signature(sample, output)
+
+
+class AsyncMlflowLogger:
+    """
+    Registro en MLflow fuera del camino de entrenamiento.
+
+    Métricas, parámetros, tags y artefactos se encolan y un hilo de fondo los envía con
+    `MlflowClient` sobre el `run_id` capturado al crearlo: métricas por un lado y
+    parámetros con tags por otro, en lotes (`log_batch`), así un parámetro rechazado no
+    arrastra a las métricas; los modelos se serializan en el hilo de fondo. La cola es
+    acotada (`max_queue`): si se llena, quien registra espera, así la memoria no crece
+    sin límite. `close` (o salir del `with`) vacía la cola antes de cerrar el run.
+    Los errores de registro se informan en el log y no interrumpen el entrenamiento.
+
+    Con background=False las operaciones se ejecutan en el momento (sin hilo).
+    Sin run activo ni run_id las operaciones se descartan.
+    """
+    _STOP = object()
+
+    def __init__(self, run_id=None, max_queue=10_000, background=True, client=None):
+        run = mlflow.active_run()
+        self.run_id = run_id or (run.info.run_id if run else None)
+        self.client = client or (MlflowClient() if self.run_id is not None else None)
+        self.background = background
+        self.stats = {"operations": 0, "errors": 0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        if background and self.run_id is not None:
+            self._thread = threading.Thread(target=self._worker, name="mlflow-logger", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _submit(self, kind, *args):
+        if self.run_id is None:
+            return
+        if self._thread is None:
+            self._process([(kind, args)])
+        else:
+            self._queue.put((kind, args))
+
+    def log_metric(self, key, value, step=None):
+        self._submit("metric", Metric(key, float(value), int(time.time() * 1000), step or 0))
+
+    def log_metrics(self, metrics, step=None):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step)
+
+    def log_param(self, key, value):
+        self._submit("param", Param(key, str(value)))
+
+    def log_params(self, params):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def set_tag(self, key, value):
+        self._submit("tag", RunTag(key, str(value)))
+
+    def set_tags(self, tags):
+        for key, value in tags.items():
+            self.set_tag(key, value)
+
+    def log_dict(self, dictionary, artifact_file):
+        self._submit("dict", copy.deepcopy(dictionary), artifact_file)
+
+    def log_model(self, model, artifact_path, flavor="sklearn", sample=None, method="predict", n_rows=100):
+        """
+        Encola el modelo; se serializa y sube en el hilo de fondo. De `sample` solo se
+        copian `n_rows` filas para inferir la firma.
+        """
+        if sample is not None:
+            sample = (sample.iloc[:n_rows] if hasattr(sample, "iloc") else sample[:n_rows]).copy()
+        self._submit("model", model, artifact_path, flavor, sample, method)
+
+    def lightgbm_callback(self, period=1):
+        """Callback de `lgb.train` que encola las métricas de validación cada `period` rondas."""
+        def _callback(env):
+            if (env.iteration + 1) % period:
+                return
+            for data_name, metric, value, _ in env.evaluation_result_list:
+                self.log_metric(f"{data_name}-{metric}", value, step=env.iteration + 1)
+        return _callback
+
+    def _worker(self):
+        while True:
+            items = [self._queue.get()]
+            # Se drena lo pendiente para enviar métricas, parámetros y tags juntos
+            while len(items) < _MAX_METRICS:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in items)
+            self._process([item for item in items if item is not self._STOP])
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _process(self, items):
+        batch = {"metric": [], "param": [], "tag": []}
+        for kind, args in items:
+            self.stats["operations"] += 1
+            if kind in batch:
+                batch[kind].append(args[0])
+                continue
+            try:
+                if kind == "dict":
+                    self.client.log_dict(self.run_id, *args)
+                elif kind == "model":
+                    self._log_model(*args)
+            except Exception as e:
+                self._error(kind, e)
+        metrics, params, tags = batch["metric"], batch["param"], batch["tag"]
+        for i in range(0, len(metrics), _MAX_METRICS):
+            self._log_batch("métricas", metrics=metrics[i:i + _MAX_METRICS])
+        for i in range(0, max(len(params), len(tags)), _MAX_PARAMS_TAGS):
+            self._log_batch("parámetros/tags", params=params[i:i + _MAX_PARAMS_TAGS], tags=tags[i:i + _MAX_PARAMS_TAGS])
+
+    def _log_batch(self, kind, metrics=(), params=(), tags=()):
+        try:
+            self.client.log_batch(self.run_id, metrics=list(metrics), params=list(params), tags=list(tags))
+        except Exception as e:
+            self._error(kind, e)
+
+    def _log_model(self, model, artifact_path, flavor, sample, method):
+        module = importlib.import_module(f"mlflow.{flavor}")
+        kwargs = {"signature": sample_signature(model, sample, method) if sample is not None else None}
+        if flavor == "sklearn":
+            kwargs["serialization_format"] = module.SERIALIZATION_FORMAT_CLOUDPICKLE
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, os.path.basename(artifact_path))
+            module.save_model(model, path, **kwargs)
+            self.client.log_artifacts(self.run_id, path, artifact_path)
+
+    def _error(self, kind, error):
+        self.stats["errors"] += 1
+        logger.warning(f"⚠️ MLflow: no se pudo registrar {kind}: {error}")
+
+    def flush(self):
+        """Espera a que se envíe todo lo encolado hasta ahora."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        start_time = time.perf_counter()
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        logger.info(f"📨 MLflow: {self.stats['operations']} operaciones registradas en segundo plano "
+                    f"({self.stats['errors']} errores, {time.perf_counter() - start_time:.1f}s de espera al cerrar)")
+
+
+_ACTIVE = None
+
+
+@contextmanager
+def async_logging(**kwargs):
+    """
+    Abre una sesión de registro asíncrono sobre el run activo; `get_tracker` la devuelve
+    mientras dure y al salir se vacía la cola.
+    """
+    global _ACTIVE
+    tracker, previous = AsyncMlflowLogger(**kwargs), _ACTIVE
+    _ACTIVE = tracker
+    try:
+        yield tracker
+    finally:
+        _ACTIVE = previous
+        tracker.close()
+
+
+def get_tracker():
+    """Logger de la sesión `async_logging` abierta o, si no hay, uno síncrono sobre el run activo."""
+    return _ACTIVE if _ACTIVE is not None else AsyncMlflowLogger(background=False)
@@ -61,4 +61,41 @@ def sample_oil_df(tmp_path_factory):
     file_path = tmp_dir / "temp_oil.csv"
     df.to_csv(file_path, index=False)
     yield file_path
-    os.remove(file_path)
\ No newline at end of file
+    os.remove(file_path)
+
+@pytest.fixture
+def local_train_df():
+    dates = pd.date_range("2017-01-01", periods=60, freq="D")
+    stores = [1, 2, 3]
+    families = ["AUTOMOTIVE", "BEVERAGES"]
+    idx = pd.MultiIndex.from_product([dates, stores, families], names=["date", "store_nbr", "family"])
+    df = idx.to_frame(index=False)
+    df.insert(0, "id", range(len(df)))
+    df["sales"] = (df.index % 17).astype(float)
+    df["onpromotion"] = df.index % 3
+    return df
+
+@pytest.fixture
+def local_config(tmp_path, local_train_df):
+    # Config con las fuentes apuntando a archivos locales (sin red ni caché)
+    import yaml
+    from src.config.config_loader import ConfigLoader
+    local_train_df.to_parquet(tmp_path / "train.parquet", index=False, row_group_size=60)
+    local_train_df.drop(columns=["sales"]).to_parquet(tmp_path / "test.parquet", index=False)
+    local_train_df.to_csv(tmp_path / "train.csv", index=False)
+    raw = yaml.safe_load(open("configs/project_config.yaml"))
+    raw["paths"].update({
+        "train": str(tmp_path / "train.csv"),
+        "train_parquet": str(tmp_path / "train.parquet"),
+        "test_parquet": str(tmp_path / "test.parquet"),
+        "cache_dir": str(tmp_path / "cache"),
+    })
+    raw["cache"]["enabled"] = False
+    config_path = tmp_path / "config.yaml"
+    with open(config_path, "w") as f:
+        yaml.safe_dump(raw, f)
+    return ConfigLoader(str(config_path))
+
+@pytest.fixture
+def local_loader(local_config):
+    return DataLoader(config=local_config)
@@ -1,4 +1,9 @@
+import pandas as pd
 from tests.utils import run_pipeline_validation
+from src.pipelines import PipelineBuilder
+from src.utils.profiling import profile_pipeline
+from src.data.schema import SchemaRegistry
+from src.config import CONFIG
 
 def test_build_pipeline_with_metadata_fixture(sample_train_df, sample_store_df, sample_oil_df):
     run_pipeline_validation(sample_train_df, metadata_path=str(sample_store_df), oil_path=str(sample_oil_df))
@@ -10,4 +15,25 @@ def test_pipeline_with_csv_data(data_loader):
 
 def test_pipeline_with_parquet_data(data_loader):
     df = data_loader.load_train_parquet()
-    run_pipeline_validation(df)
\ No newline at end of file
+    run_pipeline_validation(df)
+
+def test_pipeline_with_compact_dtypes(sample_train_df, sample_store_df, sample_oil_df):
+    df = SchemaRegistry.from_config(CONFIG).apply(sample_train_df.copy())
+    run_pipeline_validation(df, metadata_path=str(sample_store_df), oil_path=str(sample_oil_df))
+
+def test_inplace_pipeline_matches_copying_pipeline(sample_train_df, sample_store_df, sample_oil_df):
+    builder = PipelineBuilder()
+    paths = dict(metadata_path=str(sample_store_df), oil_path=str(sample_oil_df))
+    expected = builder.build_preprocessor_pipeline(inplace=False, **paths).fit_transform(sample_train_df)
+    original = sample_train_df.copy()
+    result = builder.build_preprocessor_pipeline(inplace=True, **paths).fit_transform(sample_train_df)
+    pd.testing.assert_frame_equal(result, expected)
+    # La copia de frontera protege el DataFrame del llamador
+    pd.testing.assert_frame_equal(sample_train_df, original)
+
+def test_profile_pipeline_reports_each_step(sample_train_df, sample_store_df, sample_oil_df):
+    pipeline = PipelineBuilder().build_preprocessor_pipeline(metadata_path=str(sample_store_df), oil_path=str(sample_oil_df), inplace=True)
+    transformed, report = profile_pipeline(pipeline, sample_train_df, fit=True)
+    assert report["step"].tolist() == [name for name, _ in pipeline.steps]
+    assert (report["peak_mb"] >= 0).all()
+    assert len(transformed) == len(sample_train_df)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.pipelines import PipelineBuilder
+from src.training.backtest import WalkForwardBacktest, walk_forward_folds
+
+
+def test_walk_forward_folds_expanding_and_sliding(local_train_df):
+    dates = local_train_df["date"].sample(frac=1, random_state=0).reset_index(drop=True)
+    folds = walk_forward_folds(dates, n_folds=3, horizon=7, gap=2)
+    assert [f.val_start for f in folds] == list(pd.to_datetime(["2017-02-09", "2017-02-16", "2017-02-23"]))
+    for fold in folds:
+        assert dates[fold.train_idx].max() == fold.val_start - pd.Timedelta(days=3)
+        assert dates[fold.train_idx].min() == pd.Timestamp("2017-01-01")
+        assert set(dates[fold.val_idx]) == set(pd.date_range(fold.val_start, fold.val_end))
+        assert len(fold.val_idx) == 7 * 6
+    sliding = walk_forward_folds(dates, n_folds=3, horizon=7, mode="sliding", train_days=10)
+    assert all(len(f.train_idx) == 10 * 6 for f in sliding)
+    with pytest.raises(ValueError):
+        walk_forward_folds(dates, n_folds=10, horizon=7)
+
+
+def test_walk_forward_folds_reserve_the_training_tail_for_early_stopping(local_train_df):
+    dates = local_train_df["date"]
+    for fold in walk_forward_folds(dates, n_folds=3, horizon=7, gap=2, stopping_days=5):
+        stop_days = set(dates.iloc[fold.stop_idx])
+        assert stop_days == set(pd.date_range(fold.val_start - pd.Timedelta(days=7), periods=5))
+        assert dates.iloc[fold.train_idx].max() == fold.train_end == min(stop_days) - pd.Timedelta(days=1)
+        assert not set(fold.stop_idx) & set(fold.val_idx)
+
+
+def test_backtest_runs_folds_in_parallel(local_train_df, tmp_path):
+    stores = tmp_path / "stores.csv"
+    pd.DataFrame({"store_nbr": [1, 2, 3], "city": ["Lima", "Cusco", "Lima"], "state": ["Costa", "Sierra", "Costa"],
+                  "type": ["A", "B", "A"], "cluster": [1, 2, 1]}).to_csv(stores, index=False)
+    oil = tmp_path / "oil.csv"
+    pd.DataFrame({"date": pd.date_range("2017-01-01", periods=60), "dcoilwtico": np.linspace(50, 60, 60)}).to_csv(oil, index=False)
+    preprocessor = PipelineBuilder().build_preprocessor_pipeline(metadata_path=str(stores), oil_path=str(oil))
+    backtest = WalkForwardBacktest(preprocessor, model_params={"n_estimators": 20, "min_child_samples": 2, "verbose": -1},
+                                   n_folds=2, horizon=5, max_workers=2, stopping_rounds=5, stopping_days=5)
+    report = backtest.run(local_train_df.set_index("id"))
+    assert report["fold"].tolist() == [1, 2]
+    assert report["n_val"].tolist() == [5 * 6, 5 * 6]
+    assert report["n_stop"].tolist() == [5 * 6, 5 * 6]
+    assert np.isfinite(report["rmsle"]).all()
+
+    # Sin días de early stopping cada fold entrena las rondas fijas de n_estimators
+    backtest.stopping_days = 0
+    report = backtest.run(local_train_df.set_index("id"))
+    assert report["n_stop"].tolist() == [0, 0]
+    assert report["best_iteration"].tolist() == [20, 20]
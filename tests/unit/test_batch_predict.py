@@ -0,0 +1,79 @@
+import logging
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+from src.config import CONFIG
+from src.data import DataLoader
+from src.features import CategoricalEncoder, LagFeatureAdder
+from src.predict.batch import BatchPredictor, PredictionWriter, date_chunks, merge_runs
+from src.utils import save_object
+
+
+def test_date_chunks_keep_whole_days():
+    dates = pd.to_datetime(["2017-01-01"] * 3 + ["2017-01-02"] * 3 + ["2017-01-03"] * 5)
+    chunks = date_chunks(dates, batch_rows=6)
+    assert [(s.day, e.day) for s, e in chunks] == [(1, 2), (3, 3)]
+
+
+def test_merge_runs_writes_global_id_order(tmp_path):
+    rng = np.random.default_rng(0)
+    ids = rng.permutation(1000)
+    paths = []
+    for i, run in enumerate(np.array_split(ids, 7)):
+        run = np.sort(run)
+        BatchPredictor._spill(tmp_path / f"{i}.arrow", (run, run * 0.5, 0.0))
+        paths.append(tmp_path / f"{i}.arrow")
+    with PredictionWriter(tmp_path / "out.csv") as writer:
+        merge_runs(paths, writer, batch_rows=64)
+    out = pd.read_csv(tmp_path / "out.csv")
+    assert out["id"].tolist() == list(range(1000))
+    np.testing.assert_allclose(out["sales"], out["id"] * 0.5)
+
+
+def test_batch_predictor_matches_single_pass(local_config, tmp_path):
+    df = DataLoader(config=local_config).load_train_parquet()
+    X, y = df.drop(columns=["sales", "date"]), df["sales"]
+    pipeline = Pipeline([("categorical", CategoricalEncoder())]).fit(X)
+    scaler = MinMaxScaler().fit(y.to_numpy().reshape(-1, 1))
+    model = lgb.train({"verbose": -1, "num_leaves": 7}, lgb.Dataset(pipeline.transform(X),
+                      scaler.transform(y.to_numpy().reshape(-1, 1)).ravel()), num_boost_round=10)
+    paths = {name: tmp_path / f"{name}.pkl" for name in ("model", "pipeline", "scaler")}
+    for name, obj in zip(paths, (model, pipeline, scaler)):
+        save_object(obj, paths[name])
+
+    # Ids que no crecen con la fecha: la salida igual queda en orden global de id
+    raw = pd.read_parquet(local_config.get_path("test_parquet"))
+    raw["id"] = np.random.default_rng(0).permutation(len(raw))
+    raw.to_parquet(local_config.get_path("test_parquet"), index=False)
+    test = DataLoader(config=local_config).load_test_parquet().sort_index()
+    expected = scaler.inverse_transform(
+        model.predict(pipeline.transform(test.drop(columns=["date"]))).reshape(-1, 1)).ravel()
+    predictor = BatchPredictor(paths["model"], paths["pipeline"], paths["scaler"], batch_rows=50,
+                               max_workers=2, config=local_config)
+    for output in ("preds.csv", "preds.parquet"):
+        assert predictor.run(tmp_path / output) == len(test)
+    csv = pd.read_csv(tmp_path / "preds.csv")
+    assert list(csv.columns) == ["id", "sales"]
+    assert csv["id"].tolist() == list(range(len(test)))
+    np.testing.assert_allclose(csv["sales"], expected)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "preds.parquet"), csv)
+
+
+def test_batch_predictor_warns_before_the_lag_history(local_config, tmp_path, caplog):
+    df = DataLoader(config=local_config).load_train_parquet()
+    pipeline = Pipeline([("lags", LagFeatureAdder(group_columns=["store_nbr", "family"], lags=[2], windows=[], ewm_alphas=[],
+                                                  history_days=10))]).fit(df.drop(columns=["sales"]), df["sales"])
+    save_object(pipeline, tmp_path / "pipeline.pkl")
+    predictor = BatchPredictor(pipeline_path=tmp_path / "pipeline.pkl", source="train_parquet", config=local_config)
+    chunks = date_chunks(df["date"], batch_rows=len(df) // 4)
+    with caplog.at_level(logging.WARNING, logger=CONFIG.logger_name):
+        covered_from = predictor.check_lag_history(chunks)
+    # Historia recortada a los últimos 10 días; el lag 2 queda cubierto desde su tercer día
+    assert covered_from == df["date"].max() - pd.Timedelta(days=9) + pd.Timedelta(days=2)
+    assert "historia de lags" in caplog.text
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger=CONFIG.logger_name):
+        predictor.check_lag_history([(covered_from, covered_from)])
+    assert caplog.text == ""
@@ -0,0 +1,76 @@
+import threading
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+import pandas as pd
+import pytest
+from src.data.cache import DatasetCache, remote_validator
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def http_source(tmp_path):
+    # Servidor HTTP local que expone un CSV como si fuera la fuente remota
+    root = tmp_path / "remote"
+    root.mkdir()
+    pd.DataFrame({"store_nbr": [1, 2, 3], "city": ["Quito", "Cuenca", "Loja"]}).to_csv(root / "stores.csv", index=False)
+    server = HTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/stores.csv", server
+    server.shutdown()
+
+def test_cache_miss_then_hit(tmp_path, http_source):
+    url, _ = http_source
+    cache = DatasetCache(cache_dir=tmp_path / "cache")
+    first = cache.read(url)
+    second = cache.read(url)
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+    assert cache.stats["bytes_saved"] > 0
+    assert cache.fetch(url).suffix == ".feather"
+
+def test_cache_works_offline_once_warm(tmp_path, http_source):
+    url, server = http_source
+    DatasetCache(cache_dir=tmp_path / "cache").read(url)
+    server.shutdown()
+    server.server_close()
+    # Sin servidor: la revalidación falla y se sirve la copia local
+    cache = DatasetCache(cache_dir=tmp_path / "cache", timeout=1)
+    df = cache.read(url, columns=["city"])
+    assert df["city"].tolist() == ["Quito", "Cuenca", "Loja"]
+    assert cache.stats["hits"] == 1
+
+def test_offline_cold_cache_raises(tmp_path):
+    cache = DatasetCache(cache_dir=tmp_path / "cache", offline=True)
+    with pytest.raises(FileNotFoundError):
+        cache.read("http://127.0.0.1:1/stores.csv")
+
+def test_version_follows_the_remote_validator(tmp_path, http_source):
+    url, _ = http_source
+    cache = DatasetCache(cache_dir=tmp_path / "cache")
+    assert cache.version(url)["last_modified"] is not None
+    # Sin caché la versión se pide directamente con un HEAD
+    assert remote_validator(url) == cache.version(url)
+    cache.read(url)
+    # En modo offline la versión es la registrada en el manifest
+    assert DatasetCache(cache_dir=tmp_path / "cache", offline=True).version(url) == cache.version(url)
+
+def test_instances_sharing_a_directory_keep_each_others_entries(tmp_path, http_source):
+    url, _ = http_source
+    other_url = url.replace("stores.csv", "oil.csv")
+    pd.DataFrame({"dcoilwtico": [93.1, 92.9]}).to_csv(tmp_path / "remote" / "oil.csv", index=False)
+    # Como DataLoader (instancia propia) y LookupJoiner (caché del proceso) sobre el mismo directorio
+    first, second = DatasetCache(cache_dir=tmp_path / "cache"), DatasetCache(cache_dir=tmp_path / "cache")
+    first.read(url)
+    second.read(other_url)
+    second.read(url)
+    assert second.stats["hits"] == 1 and second.stats["misses"] == 1
+
+    fresh = DatasetCache(cache_dir=tmp_path / "cache", offline=True)
+    fresh.read(url)
+    fresh.read(other_url)
+    assert fresh.stats["hits"] == 2
+    assert not (tmp_path / "cache" / "manifest.json.lock").exists()
@@ -0,0 +1,103 @@
+import os
+import pandas as pd
+import pytest
+import yaml
+
+pytest.importorskip("tensorflow")
+from src.data.window_bundle import WindowBundle  # noqa: E402
+from src.pipelines.procesador_datos import DataManager  # noqa: E402
+
+
+@pytest.fixture
+def data_manager_config(tmp_path, local_train_df, monkeypatch):
+    local_train_df.to_csv(tmp_path / "train.csv", index=False)
+    raw = yaml.safe_load(open("configs/project_config.yaml"))
+    raw["paths"].update({
+        "train": str(tmp_path / "train.csv"),
+        "data_manager": str(tmp_path / "stages"),
+        "window_bundle": str(tmp_path / "windows"),
+        "scaler": str(tmp_path / "scaler.pkl"),
+    })
+    raw["transformations"].update({"normalize": True, "date_columns": True, "persist": True})
+    monkeypatch.setattr(DataManager, "_load_config", lambda self: raw)
+    return raw
+
+
+def test_stages_are_timed_persisted_and_reused(data_manager_config):
+    manager = DataManager()
+    X = manager.X_train_raw
+    assert {"raw", "encode", "normalize"} <= set(manager.timings)
+    # Cada etapa trabaja sobre una copia: la carga cruda y la codificada no se normalizan
+    assert manager.df_train["family"].tolist()[:2] == ["AUTOMOTIVE", "BEVERAGES"]
+    assert manager.df_encoded["sales"].max() == 16.0
+    assert X["sales"].max() == 1.0
+    assert manager.metadata["timesteps"] == data_manager_config["model"]["hybrid"]["timesteps"]
+
+    reused = DataManager()
+    assert reused.stage_dir == manager.stage_dir
+    pd.testing.assert_frame_equal(reused.X_train_raw, X)
+    assert reused.metadata == manager.metadata
+    # Normalizado y metadata vienen de disco: no se recalcula la carga cruda
+    assert "raw" not in reused.timings and "encode" not in reused.timings
+    assert set(reused.timings) == {"normalize", "metadata"}
+
+
+def test_fingerprint_changes_with_config_and_source(data_manager_config, local_train_df):
+    stage_dir = DataManager().stage_dir
+    data_manager_config["transformations"]["normalize"] = False
+    assert DataManager().stage_dir != stage_dir
+
+    data_manager_config["transformations"]["normalize"] = True
+    assert DataManager().stage_dir == stage_dir
+    path = data_manager_config["paths"]["train"]
+    local_train_df.iloc[:-1].to_csv(path, index=False)
+    os.utime(path, ns=(0, 0))
+    assert DataManager().stage_dir != stage_dir
+
+
+def test_construction_does_not_version_the_source(data_manager_config, monkeypatch):
+    calls = []
+    monkeypatch.setattr("src.pipelines.procesador_datos.source_version", lambda path: calls.append(path))
+    manager = DataManager()
+    assert calls == []
+    assert manager.stage_dir.parent.name == "stages" and len(calls) == 1
+
+
+def test_input_data_streams_from_the_window_bundle(data_manager_config):
+    manager = DataManager()
+    train, test = manager.build_input_data(batch_size=256)
+    assert WindowBundle(manager.window_bundle_path).exists(manager.stage_dir.name)
+    assert sum(len(y) for _, y in test) == manager.n_test
+    inputs, y = next(iter(train))
+    assert inputs["seq_input"].shape[1] == manager.timesteps
+    assert set(inputs) == {"seq_input", "target_input", "store_nbr_input", "family_input"}
+
+
+def test_target_scaler_is_persisted_with_the_normalize_stage(data_manager_config):
+    manager = DataManager()
+    manager.X_train_raw
+    reused = DataManager()
+    reused.X_train_raw
+    assert "normalize" in reused.timings and "raw" not in reused.timings
+    assert reused.target_scaler_path == manager.stage_dir / "scaler.pkl"
+    for scaler in (reused.scaler_data, reused.target_scaler):
+        assert scaler.data_min_ == manager.scaler_data.data_min_ and scaler.data_max_ == manager.scaler_data.data_max_
+    # El scaler compartido de LightGBM (paths.scaler) no se toca
+    assert not os.path.exists(data_manager_config["paths"]["scaler"])
+
+
+def test_metadata_of_a_remote_source_loads_without_revalidating(data_manager_config, monkeypatch):
+    # La fuente local se trata como remota: su versión solo se registra, no se revalida
+    monkeypatch.setattr("src.pipelines.procesador_datos.is_remote", lambda path: True)
+    metadata = DataManager().metadata
+
+    def offline(path):
+        raise AssertionError("no debe revalidar la fuente")
+
+    monkeypatch.setattr("src.pipelines.procesador_datos.source_version", offline)
+    assert DataManager().metadata == metadata
+
+    # Sin versión disponible (HEAD fallido) las etapas son las de la última registrada
+    monkeypatch.setattr("src.pipelines.procesador_datos.source_version", lambda path: None)
+    manager = DataManager()
+    assert manager.stage_dir == manager.known_stage_dir and (manager.stage_dir / "metadata.json").exists()
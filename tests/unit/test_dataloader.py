@@ -1,5 +1,7 @@
 import pandas as pd
 from src.config import CONFIG
+from src.data import DataLoader
+from src.data.store import PartitionedStore
 
 def test_load_train_data(data_loader):
     df = data_loader.load_train_data(n_rows=5)
@@ -23,4 +25,60 @@ def test_load_store_metadata(data_loader):
 def test_load_train_parquet(data_loader):
     df = data_loader.load_train_parquet()
     assert isinstance(df, pd.DataFrame)
-    assert "store_nbr" in df.columns
\ No newline at end of file
+    assert "store_nbr" in df.columns
+
+def test_load_train_parquet_pushdown_filters(local_loader):
+    df = local_loader.load_train_parquet(start_date="2017-02-01", end_date="2017-02-10", stores=[1, 3], families=["BEVERAGES"])
+    assert df["date"].min() == pd.Timestamp("2017-02-01")
+    assert df["date"].max() == pd.Timestamp("2017-02-10")
+    assert set(df["store_nbr"]) == {1, 3}
+    assert set(df["family"]) == {"BEVERAGES"}
+    assert len(df) == 10 * 2
+    assert df.index.name == "id"
+
+def test_load_train_parquet_projection_and_n_rows(local_loader):
+    df = local_loader.load_train_parquet(columns=["date", "sales"], n_rows=7, stores=[2])
+    assert list(df.columns) == ["date", "sales"]
+    assert len(df) == 7
+
+def test_iter_train_by_row_group_is_bounded(local_loader, local_train_df):
+    chunks = list(local_loader.iter_train(batch_rows=50))
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(local_train_df)
+    assert len({tuple(chunk.dtypes.astype(str)) for chunk in chunks}) == 1
+
+def test_iter_train_by_date_keeps_dates_whole(local_loader):
+    chunks = list(local_loader.iter_train(batch_rows=40, by="date", start_date="2017-01-10"))
+    seen = set()
+    for chunk in chunks:
+        dates = set(chunk["date"])
+        assert not dates & seen
+        seen |= dates
+    assert min(seen) == pd.Timestamp("2017-01-10")
+    assert len(seen) == 51
+
+def test_iter_train_from_csv(local_loader, local_train_df):
+    chunks = list(local_loader.iter_train(batch_rows=100, source="csv"))
+    assert sum(len(chunk) for chunk in chunks) == len(local_train_df)
+    assert chunks[0]["date"].dtype == "datetime64[ns]"
+
+def test_compact_dtypes_at_read_time(local_loader):
+    df = local_loader.load_train_parquet()
+    assert df["family"].dtype == "category"
+    assert df["store_nbr"].dtype == "uint8"
+    assert df["sales"].dtype == "float64"
+    assert df.index.dtype == "uint16"
+    assert df["date"].dtype == "datetime64[ns]"
+
+def test_compact_categories_are_stable_across_chunks(local_loader):
+    chunks = list(local_loader.iter_train(batch_rows=30, stores=[1]))
+    categories = {tuple(chunk["family"].cat.categories) for chunk in chunks}
+    assert categories == {("AUTOMOTIVE", "BEVERAGES")}
+
+def test_load_train_store(local_config, local_train_df, tmp_path):
+    local_config.raw()["paths"]["train_store"] = str(tmp_path / "store")
+    PartitionedStore.from_config(local_config).append(local_train_df)
+    df = DataLoader(config=local_config).load_train_store(start_date="2017-02-20", families=["AUTOMOTIVE"])
+    assert df["date"].is_monotonic_increasing
+    assert set(df["family"]) == {"AUTOMOTIVE"}
+    assert len(df) == 10 * 3
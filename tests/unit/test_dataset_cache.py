@@ -0,0 +1,61 @@
+import os
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from src.training.dataset_cache import LGBMDatasetCache
+
+
+def _data(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({"x": rng.random(n), "store_nbr": rng.integers(0, 5, n)})
+    return X, (X["x"] * 2 + X["store_nbr"]).to_numpy()
+
+
+def test_dataset_cache_reuses_binaries(tmp_path):
+    X, y = _data()
+    cache = LGBMDatasetCache(tmp_path)
+    paths = cache.build(X[:300], y[:300], X[300:], y[300:], categorical=["store_nbr"])
+    assert cache.stats == {"hits": 0, "misses": 2, "evicted": 0}
+    assert cache.build(X[:300], y[:300], X[300:], y[300:], categorical=["store_nbr"]) == paths
+    assert cache.stats == {"hits": 2, "misses": 2, "evicted": 0}
+    # Otros datos u otros parámetros de binado → otra clave
+    X2 = X.assign(x=X["x"] + 1)
+    assert cache.build(X2[:300], y[:300], categorical=["store_nbr"])[0] != paths[0]
+    assert cache.build(X[:300], y[:300], categorical=["store_nbr"], params={"max_bin": 15})[0] != paths[0]
+    # Parámetros que no afectan el binado no cambian la clave
+    assert cache.build(X[:300], y[:300], categorical=["store_nbr"], params={"learning_rate": 0.3})[0] == paths[0]
+
+
+def test_cached_datasets_train_like_in_memory(tmp_path):
+    X, y = _data()
+    params = {"objective": "regression_l1", "verbose": -1, "num_threads": 1, "feature_pre_filter": False}
+    train_set, val_set = LGBMDatasetCache(tmp_path).datasets(X[:300], y[:300], X[300:], y[300:], categorical=["store_nbr"])
+    cached = lgb.train(params, train_set, 30, valid_sets=[val_set])
+    memory_train = lgb.Dataset(X[:300], y[:300], categorical_feature=["store_nbr"], params={"feature_pre_filter": False})
+    memory = lgb.train(params, memory_train, 30, valid_sets=[lgb.Dataset(X[300:], y[300:], reference=memory_train)])
+    np.testing.assert_allclose(cached.predict(X[300:]), memory.predict(X[300:]))
+    assert cached.feature_name() == ["x", "store_nbr"]
+
+
+def test_loaded_datasets_use_the_build_params(tmp_path):
+    X, y = _data()
+    cache = LGBMDatasetCache(tmp_path, params={"max_bin": 63})
+    train_set, val_set = cache.datasets(X[:300], y[:300], X[300:], y[300:], categorical=["store_nbr"],
+                                        params={"min_data_in_bin": 5, "learning_rate": 0.3})
+    expected = {**cache.params, "min_data_in_bin": 5}
+    assert train_set.params == expected and val_set.params == expected
+
+
+def test_dataset_cache_evicts_least_recently_used(tmp_path):
+    X, y = _data()
+    cache = LGBMDatasetCache(tmp_path)
+    first = cache.build(X[:300], y[:300])[0]
+    size = first.stat().st_size
+    cache.max_bytes = 2 * size
+    second = cache.build(X[:300], y[:300] + 1)[0]
+    # Un acierto renueva el binario: el menos usado pasa a ser `second`
+    os.utime(second, (0, 0))
+    assert cache.build(X[:300], y[:300])[0] == first
+    third = cache.build(X[:300], y[:300] + 2)[0]
+    assert cache.stats["evicted"] == 1
+    assert first.exists() and third.exists() and not second.exists()
@@ -0,0 +1,73 @@
+import pickle
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+from src.features import CategoricalEncoder, LagFeatureAdder
+from src.training.incremental import load_lineage, prepare_recent_data, save_model_with_lineage
+
+
+class _Loader:
+    def __init__(self, df):
+        self.df = df
+
+    def load_train_parquet(self, start_date=None, **kwargs):
+        return self.df[self.df["date"] >= start_date].set_index("id")
+
+
+def test_warm_start_lineage_records_parent(tmp_path):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(200, 3)), rng.normal(size=200)
+    params = {"verbose": -1, "num_leaves": 7}
+    base = lgb.train(params, lgb.Dataset(X, y), num_boost_round=10)
+    path = tmp_path / "model_lgbm.pkl"
+    parent = save_model_with_lineage(base, path, "2017-08-01")
+    assert load_lineage(path) == parent and not parent["warm_start"]
+
+    model = lgb.train(params, lgb.Dataset(X, y), num_boost_round=5, init_model=base)
+    lineage = save_model_with_lineage(model, path, "2017-08-15", parent=parent)
+    assert lineage["num_trees"] == 15
+    assert lineage["parent"]["sha256"] == parent["sha256"] != lineage["sha256"]
+    assert load_lineage(path)["data_end"] == "2017-08-15"
+
+
+def test_prepare_recent_data_reuses_fitted_state(local_train_df):
+    df = local_train_df
+    X, y = df.set_index("id").drop(columns=["sales"]), df.set_index("id")["sales"]
+    pipeline = Pipeline([("lags", LagFeatureAdder(lags=[1], windows=[], ewm_alphas=[])),
+                         ("categorical", CategoricalEncoder())])
+    pipeline.fit(X[X["date"] < "2017-02-01"], y[X["date"] < "2017-02-01"])
+    categories = {k: v.copy() for k, v in pipeline.named_steps["categorical"].categories_.items()}
+    scaler = MinMaxScaler().fit(y.to_numpy().reshape(-1, 1))
+
+    X_train, X_val, y_train, y_val, data_end = prepare_recent_data(
+        pipeline, scaler, pd.Timestamp("2017-02-10"), val_days=5, loader=_Loader(df))
+    assert data_end == pd.Timestamp("2017-03-01")
+    assert len(X_val) == 5 * 6 and len(X_train) == 15 * 6
+    assert "date" not in X_train.columns
+    # Las codificaciones no cambian; la historia de lags sí cubre la ventana nueva
+    assert all(pipeline.named_steps["categorical"].categories_[k].equals(v) for k, v in categories.items())
+    assert X_val["sales_lag_1"].notna().all()
+    np.testing.assert_allclose(y_val.ravel(), scaler.transform(y[-30:].to_numpy().reshape(-1, 1)).ravel())
+
+
+def test_refresh_history_continues_trimmed_lags(local_train_df):
+    df = local_train_df.set_index("id")
+    X, y = df.drop(columns=["sales"]), df["sales"]
+    params = dict(lags=[1, 28], windows=[7], ewm_alphas=[0.5])
+    fitted = X["date"] < "2017-02-05"
+    # El pipeline guardado solo conserva la cola de 28 días y el estado de las EWMAs
+    pipeline = pickle.loads(pickle.dumps(Pipeline([("lags", LagFeatureAdder(**params))]).fit(X[fitted], y[fitted])))
+    scaler = MinMaxScaler().fit(y.to_numpy().reshape(-1, 1))
+
+    X_train, X_val, *_ = prepare_recent_data(pipeline, scaler, pd.Timestamp("2017-01-20"), val_days=5,
+                                             loader=_Loader(local_train_df))
+    expected = LagFeatureAdder(**params).fit_transform(X, y)
+    first_day = X.loc[X_train.index, "date"].min()
+    assert first_day == pd.Timestamp("2017-02-05")
+    start = X_train.index[X.loc[X_train.index, "date"] == first_day]
+    for col in ("sales_lag_28", "sales_roll_mean_7", "sales_ewm_0.5"):
+        assert X_train.loc[start, col].notna().all()
+        np.testing.assert_allclose(X_train[col], expected.loc[X_train.index, col], rtol=1e-5)
+    np.testing.assert_allclose(X_val["sales_ewm_0.5"], expected.loc[X_val.index, "sales_ewm_0.5"], rtol=1e-5)
@@ -0,0 +1,86 @@
+import pickle
+import numpy as np
+import pandas as pd
+from src.features import LagFeatureAdder
+
+
+def _reference(df, lags, windows, alphas):
+    # Cálculo directo con groupby sobre series diarias densas
+    df = df.sort_values(["store_nbr", "family", "date"])
+    grouped = df.groupby(["store_nbr", "family"])["sales"]
+    previous = grouped.shift(1)
+    by_series = previous.groupby([df["store_nbr"], df["family"]])
+    out = pd.DataFrame(index=df.index)
+    for k in lags:
+        out[f"sales_lag_{k}"] = grouped.shift(k)
+    for w in windows:
+        out[f"sales_roll_mean_{w}"] = by_series.transform(lambda s: s.rolling(w, min_periods=1).mean())
+        out[f"sales_roll_std_{w}"] = by_series.transform(lambda s: s.rolling(w, min_periods=2).std())
+    for a in alphas:
+        out[f"sales_ewm_{a:g}"] = by_series.transform(lambda s: s.ewm(alpha=a, adjust=False).mean())
+    return out
+
+
+def test_lag_features_match_groupby(local_train_df):
+    df = local_train_df.sample(frac=1, random_state=0)
+    adder = LagFeatureAdder(lags=[1, 7], windows=[3, 14], ewm_alphas=[0.3])
+    transformed = adder.fit_transform(df.drop(columns=["sales"]), df["sales"])
+    expected = _reference(df, [1, 7], [3, 14], [0.3]).loc[df.index]
+    assert list(transformed.index) == list(df.index)
+    for col in adder.feature_names:
+        np.testing.assert_allclose(transformed[col], expected[col], rtol=1e-5, atol=1e-5, err_msg=col)
+
+
+def test_lag_features_do_not_use_same_day_target(local_train_df):
+    adder = LagFeatureAdder(lags=[1], windows=[3], ewm_alphas=[0.5]).fit(local_train_df)
+    changed = local_train_df.copy()
+    last = changed["date"] == changed["date"].max()
+    changed.loc[last, "sales"] = 1e6
+    other = LagFeatureAdder(lags=[1], windows=[3], ewm_alphas=[0.5]).fit(changed)
+    rows = local_train_df[last]
+    pd.testing.assert_frame_equal(adder.transform(rows), other.transform(rows))
+
+
+def test_lag_tail_state_updates_incrementally(local_train_df):
+    params = dict(lags=[2, 5], windows=[4], ewm_alphas=[0.2])
+    cutoff = pd.Timestamp("2017-02-15")
+    history, new = local_train_df[local_train_df["date"] <= cutoff], local_train_df[local_train_df["date"] > cutoff]
+    full = LagFeatureAdder(**params).fit(local_train_df).transform(new)
+
+    restored = pickle.loads(pickle.dumps(LagFeatureAdder(**params).fit(history)))
+    assert restored.history_.shape[1] == restored.tail_days
+    # Día a día: se predicen las variables y luego se agregan las ventas observadas
+    parts = []
+    for _, day in new.groupby("date"):
+        parts.append(restored.transform(day))
+        restored.partial_fit(day)
+    pd.testing.assert_frame_equal(pd.concat(parts).loc[new.index], full, check_exact=False, rtol=1e-5)
+
+
+def test_lag_features_unknown_series_is_null(local_train_df):
+    adder = LagFeatureAdder(lags=[1], windows=[], ewm_alphas=[]).fit(local_train_df)
+    row = local_train_df.tail(1).assign(store_nbr=99)
+    assert adder.transform(row)["sales_lag_1"].isna().all()
+
+
+def test_lag_pickle_leaves_fitted_state_intact(local_train_df):
+    adder = LagFeatureAdder(lags=[2], windows=[3], ewm_alphas=[0.5]).fit(local_train_df)
+    history, start, ewm_state = adder.history_.copy(), adder.start_day_, adder.ewm_state_.copy()
+    restored = pickle.loads(pickle.dumps(adder))
+    assert restored.history_.shape[1] == restored.tail_days
+    np.testing.assert_array_equal(adder.history_, history)
+    np.testing.assert_array_equal(adder.ewm_state_, ewm_state)
+    assert adder.start_day_ == start and not adder.trimmed_
+
+
+def test_lag_horizon_features_match_training(local_train_df):
+    # Pronóstico directo a 3 días: ventanas y EWMAs terminan en d - 3, como el lag más corto
+    params = dict(lags=[3, 5], windows=[4], ewm_alphas=[0.2])
+    cutoff = pd.Timestamp("2017-02-15")
+    history = local_train_df[local_train_df["date"] <= cutoff]
+    horizon = local_train_df[(local_train_df["date"] > cutoff) & (local_train_df["date"] <= cutoff + pd.Timedelta(days=3))]
+    training = LagFeatureAdder(**params).fit(local_train_df).transform(horizon)
+    serving = LagFeatureAdder(**params).fit(history).transform(horizon.drop(columns=["sales"]))
+    for col in LagFeatureAdder(**params).feature_names:
+        assert serving[col].notna().all(), col
+        np.testing.assert_allclose(serving[col], training[col], rtol=1e-5, err_msg=col)
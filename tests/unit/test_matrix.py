@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+from src.data import DataLoader
+from src.features import AdaptiveScaler, CategoricalEncoder, LagFeatureAdder
+from src.training.matrix import TrainingMatrixBuilder
+
+
+def _pipeline():
+    return Pipeline([
+        ("lags", LagFeatureAdder(lags=[1, 7], windows=[3], ewm_alphas=[0.5])),
+        ("categorical", CategoricalEncoder()),
+        ("scaling", AdaptiveScaler()),
+    ])
+
+
+def test_matrix_builder_matches_in_memory_path(local_config):
+    loader = DataLoader(config=local_config)
+    df = loader.load_train_parquet()
+    X, y = df.drop(columns=["sales"]), df["sales"]
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    reference = clone(_pipeline())
+    expected_train = reference.fit_transform(X_train, y_train).drop(columns=["date"])
+    expected_val = reference.transform(X_val).drop(columns=["date"])
+
+    builder = TrainingMatrixBuilder(_pipeline(), loader=loader, batch_rows=50, config=local_config)
+    M_train, M_val, t_train, t_val = builder.build()
+    assert list(M_train.columns) == list(expected_train.columns)
+    assert (M_train.dtypes == np.float32).all()
+    # Train y val son vistas contiguas de una misma matriz
+    train, val = M_train.to_numpy(), M_val.to_numpy()
+    assert train.__array_interface__["data"][0] + train.nbytes == val.__array_interface__["data"][0]
+    np.testing.assert_allclose(M_train.to_numpy(), expected_train.to_numpy(dtype=np.float64), rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(M_val.to_numpy(), expected_val.to_numpy(dtype=np.float64), rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(t_train, y_train.to_numpy())
+    np.testing.assert_array_equal(t_val, y_val.to_numpy())
+    assert [s["stage"].split(" ")[0] for s in builder.stages] == ["conteo", "ajuste", "ajuste", "ajuste", "transformación"]
+
+
+def test_matrix_builder_rejects_stateful_steps_without_partial_fit(local_config):
+    pipeline = Pipeline([("categorical", CategoricalEncoder()), ("ordinal", OrdinalEncoder())])
+    builder = TrainingMatrixBuilder(pipeline, loader=DataLoader(config=local_config), batch_rows=50, config=local_config)
+    with pytest.raises(TypeError, match="ordinal"):
+        builder.fit()
@@ -0,0 +1,72 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from src.evaluation.metrics import RMSLE, make_rmsle
+from src.training.evaluation import decode_segments
+
+
+def _reference(scaler, y_true, y_pred):
+    # Versión original: inverse_transform del scaler, recorte a 0 y log1p
+    y_true = np.clip(scaler.inverse_transform(np.reshape(y_true, (-1, 1))), 0, None)
+    y_pred = np.clip(scaler.inverse_transform(np.reshape(y_pred, (-1, 1))), 0, None)
+    return np.sqrt(np.mean(np.square(np.log1p(y_true) - np.log1p(y_pred))))
+
+
+def _data(n=500):
+    rng = np.random.default_rng(0)
+    sales = rng.gamma(2.0, 50.0, n)
+    scaler = MinMaxScaler().fit(sales.reshape(-1, 1))
+    y_true = scaler.transform(sales.reshape(-1, 1)).ravel()
+    y_pred = y_true + rng.normal(0, 0.05, n)
+    return scaler, y_true, y_pred
+
+
+def test_rmsle_matches_scaler_inverse_transform():
+    scaler, y_true, y_pred = _data()
+    metric = make_rmsle(scaler)
+    name, score, higher_better = metric(y_true, y_pred)
+    assert name == "rmsle" and higher_better is False
+    np.testing.assert_allclose(score, _reference(scaler, y_true, y_pred))
+    # Llamadas repetidas (como en cada ronda) reutilizan buffers y dan el mismo valor
+    buffers = metric._buffers
+    np.testing.assert_allclose(metric.score(y_true, y_pred * 0.9), _reference(scaler, y_true, y_pred * 0.9))
+    assert metric._buffers is buffers
+
+
+def test_rmsle_feval_and_segments():
+    scaler, y_true, y_pred = _data()
+    metric = RMSLE.from_scaler(scaler)
+    dataset = lgb.Dataset(np.zeros((len(y_true), 1)), y_true).construct()
+    # LightGBM guarda las etiquetas en float32
+    np.testing.assert_allclose(metric.feval(y_pred, dataset)[1], metric.score(y_true, y_pred), rtol=1e-6)
+
+    stores = np.arange(len(y_true)) % 4 + 1
+    breakdown = metric.by_segment(y_true, y_pred, stores)
+    assert breakdown.index.tolist() == [1, 2, 3, 4]
+    for store in (1, 2, 3, 4):
+        mask = stores == store
+        np.testing.assert_allclose(breakdown.loc[store, "rmsle"], _reference(scaler, y_true[mask], y_pred[mask]))
+    assert breakdown["n"].sum() == len(y_true)
+
+
+def test_rmsle_cache_follows_label_contents():
+    scaler, y_true, y_pred = _data()
+    metric = make_rmsle(scaler)
+    metric.score(y_true, y_pred)
+    # Buffer de etiquetas reutilizado con otro contenido (incluso con la misma suma)
+    y_true[[0, 1]] = y_true[[1, 0]]
+    y_true[:250] = y_true[:250][::-1].copy()
+    np.testing.assert_allclose(metric.score(y_true, y_pred), _reference(scaler, y_true, y_pred))
+    y_true *= 0.5
+    np.testing.assert_allclose(metric.score(y_true, y_pred), _reference(scaler, y_true, y_pred))
+
+
+def test_segment_breakdown_is_reported_with_original_values():
+    scaler, y_true, y_pred = _data()
+    codes = (np.arange(len(y_true)) % 3).astype(np.float32)
+    breakdown = decode_segments(RMSLE.from_scaler(scaler).by_segment(y_true, y_pred, codes),
+                                pd.Index(["AUTOMOTIVE", "BEVERAGES", "GROCERY I"]))
+    assert breakdown.index.tolist() == ["AUTOMOTIVE", "BEVERAGES", "GROCERY I"]
+    mask = codes == 1
+    np.testing.assert_allclose(breakdown.loc["BEVERAGES", "rmsle"], _reference(scaler, y_true[mask], y_pred[mask]))
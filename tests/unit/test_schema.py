@@ -0,0 +1,27 @@
+import pandas as pd
+import pyarrow as pa
+from src.data.schema import SchemaRegistry, default_pandas_mb, frame_memory_mb, narrowest_int
+
+def test_narrowest_int():
+    assert narrowest_int(1, 54) == pa.uint8()
+    assert narrowest_int(-5, 300) == pa.int16()
+    assert narrowest_int(0, 3_000_000) == pa.uint32()
+
+def test_registry_shrinks_frame(sample_train_df):
+    df = pd.concat([sample_train_df] * 500, ignore_index=True)
+    df.loc[0, "sales"] = 123456.78
+    registry = SchemaRegistry(categorical=["family", "store_nbr"])
+    before_mb = frame_memory_mb(df)
+    compact = registry.apply(df.copy())
+    assert compact["family"].dtype == "category"
+    assert compact["store_nbr"].dtype == "uint8"
+    assert compact["onpromotion"].dtype == "uint8"
+    # El target conserva los centavos: en float32 123456.78 sería 123456.78125
+    assert compact["sales"].dtype == "float64" and compact.loc[0, "sales"] == 123456.78
+    report = registry.memory_report(before_mb, compact)
+    assert report["after_mb"] < report["before_mb"]
+
+def test_default_pandas_estimate_matches_pandas(sample_train_df):
+    df = sample_train_df.drop(columns=["date"])
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    assert abs(default_pandas_mb(table) - df.memory_usage(deep=True, index=False).sum() / 1e6) < 1e-3
@@ -0,0 +1,97 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from src.training.segments import SegmentedTrainer, SegmentRouter, group_rows, load_prediction_model
+from src.utils import save_object
+
+PARAMS = {"n_estimators": 20, "learning_rate": 0.3, "num_leaves": 7, "min_data_in_leaf": 5}
+
+
+def _data(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({"family": rng.integers(0, 3, n), "x": rng.normal(size=n)})
+    y = X["x"] * (X["family"] + 1) + rng.normal(scale=0.1, size=n)
+    return X, y
+
+
+def test_group_rows_covers_every_row_once():
+    groups = group_rows(np.array(["b", "a", "b", None, "a"], dtype=object))
+    assert [(key, rows.tolist()) for key, rows in groups] == [("a", [1, 4]), ("b", [0, 2])]
+
+
+def test_segmented_trainer_routes_and_retrains_one_segment(tmp_path):
+    X, y = _data()
+    trainer = SegmentedTrainer("family", PARAMS, tmp_path, threads_per_worker=1, max_workers=2,
+                               stopping_rounds=5, categorical=[])
+    router = trainer.fit(X[:200], y[:200], X[200:], y[200:])
+    manifest = trainer._manifest()
+    assert sorted(manifest["segments"]) == ["0", "1", "2"]
+
+    X_new = pd.concat([X[200:], pd.DataFrame({"family": [9], "x": [0.0]})], ignore_index=True)
+    preds = router.predict(X_new)
+    rows = (X_new["family"] == 1).to_numpy()
+    np.testing.assert_allclose(preds[rows], router.models["1"].predict(X_new[rows]))
+    assert np.isnan(preds[-1])
+
+    X2, y2 = _data(seed=1)
+    router = trainer.fit_segment(1, X2, y2)
+    updated = trainer._manifest()["segments"]
+    assert updated["0"] == manifest["segments"]["0"]
+    assert updated["1"]["rows"] == int((X2["family"] == 1).sum())
+    assert isinstance(SegmentRouter.load(tmp_path / "family"), SegmentRouter)
+
+
+def test_load_prediction_model_routes_with_global_fallback(local_config, tmp_path):
+    X, y = _data()
+    raw = local_config.raw()
+    raw["segments"]["enabled"] = True
+    raw["paths"].update({"model": str(tmp_path / "model.pkl"), "segment_models": str(tmp_path / "segments")})
+    trainer = SegmentedTrainer("family", PARAMS, tmp_path / "segments", threads_per_worker=1, max_workers=1,
+                               stopping_rounds=5, categorical=[])
+    trainer.fit_segment(0, X, y)
+    global_model = lgb.train({"verbose": -1, "num_leaves": 7}, lgb.Dataset(X, y), num_boost_round=10)
+    save_object(global_model, tmp_path / "model.pkl")
+
+    model = load_prediction_model(local_config)
+    assert isinstance(model, SegmentRouter)
+    preds = model.predict(X)
+    rows = (X["family"] == 0).to_numpy()
+    np.testing.assert_allclose(preds[rows], model.models["0"].predict(X[rows]))
+    np.testing.assert_allclose(preds[~rows], global_model.predict(X[~rows]))
+
+    raw["segments"]["enabled"] = False
+    assert isinstance(load_prediction_model(local_config), lgb.Booster)
+
+
+def test_segments_are_named_and_selected_by_original_value(tmp_path):
+    X, y = _data()
+    categories = ["AUTOMOTIVE", "BREAD/BAKERY", "GROCERY", "PRODUCE"]
+    trainer = SegmentedTrainer("family", PARAMS, tmp_path, threads_per_worker=1, max_workers=1,
+                               stopping_rounds=5, categorical=[], categories=categories)
+    router = trainer.fit_segment("BREAD/BAKERY", X, y)
+    manifest = trainer._manifest()
+    assert manifest["segments"]["BREAD/BAKERY"]["file"] == "BREAD_BAKERY.txt"
+    rows = (X["family"] == 1).to_numpy()
+    np.testing.assert_allclose(router.predict(X)[rows], router.models["BREAD/BAKERY"].predict(X[rows]))
+
+    with pytest.raises(ValueError, match="desconocido"):
+        trainer.fit_segment("DAIRY", X, y)
+    with pytest.raises(ValueError, match="no tiene filas"):
+        trainer.fit_segment("PRODUCE", X, y)
+
+
+def test_float_codes_are_named_like_integer_codes(tmp_path):
+    # La matriz float32 de training.matrix entrega los códigos como 1.0; en inferencia llegan enteros
+    X, y = _data()
+    categories = ["AUTOMOTIVE", "BREAD/BAKERY", "GROCERY"]
+    trainer = SegmentedTrainer("family", PARAMS, tmp_path, threads_per_worker=1, max_workers=1,
+                               stopping_rounds=5, categorical=[], categories=categories)
+    router = trainer.fit(X.astype({"family": np.float32}), y)
+    assert sorted(trainer._manifest()["segments"]) == categories
+
+    trainer.fit_segment("GROCERY", X.astype({"family": np.float32}), y)
+    assert sorted(trainer._manifest()["segments"]) == categories
+    X_int = X.astype({"family": np.int8})
+    rows = (X_int["family"] == 2).to_numpy()
+    np.testing.assert_allclose(router.predict(X_int)[rows], router.models["GROCERY"].predict(X_int[rows]))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from src.data import SeriesStore
+from src.data.series_store import sliding_windows
+
+
+def test_series_store_matches_boolean_mask(local_train_df):
+    df = local_train_df.sample(frac=1, random_state=0).set_index("id")
+    store = SeriesStore.from_frame(df)
+    assert store.shape == (6, 60, 2)
+    assert store.features == ["sales", "onpromotion"]
+    for (store_nbr, family), values in store.items():
+        expected = df[(df.store_nbr == store_nbr) & (df.family == family)].sort_values("date")
+        np.testing.assert_array_equal(values, expected[["sales", "onpromotion"]].to_numpy(np.float32))
+
+
+def test_series_store_slices_are_views(local_train_df):
+    store = SeriesStore.from_frame(local_train_df)
+    series_id = store.series_id(2, "BEVERAGES")
+    assert np.shares_memory(store.series(series_id), store.values)
+    ids = store.series_ids(pd.DataFrame({"store_nbr": [2, 9], "family": ["BEVERAGES", "BEVERAGES"]}))
+    assert ids.tolist() == [series_id, -1]
+
+
+def test_series_store_missing_dates_are_masked(local_train_df):
+    df = local_train_df.drop(index=local_train_df[(local_train_df.store_nbr == 1) & (local_train_df.date == "2017-01-10")].index)
+    store = SeriesStore.from_frame(df)
+    series_id = store.series_id(1, "AUTOMOTIVE")
+    assert store.mask[series_id].sum() == 59
+    assert np.isnan(store.values[series_id, ~store.mask[series_id]]).all()
+    assert len(store.series(series_id)) == 59
+
+
+def test_sliding_windows_match_copies_and_share_memory():
+    values = np.arange(40, dtype=np.float32).reshape(10, 4)
+    windows = sliding_windows(values, 3)
+    expected = np.array([values[i:i + 3] for i in range(len(values) - 3)])
+    np.testing.assert_array_equal(windows, expected)
+    assert np.shares_memory(windows, values)
+    assert sliding_windows(values[:3], 3).shape == (0, 3, 4)
+
@@ -0,0 +1,28 @@
+import pandas as pd
+from src.data.store import PartitionedStore
+
+def test_append_writes_only_new_days(tmp_path, local_train_df):
+    store = PartitionedStore(root=tmp_path / "store")
+    history = local_train_df[local_train_df["date"] < "2017-02-15"]
+    assert store.append(history) == len(history)
+    files_before = {p: p.stat().st_mtime_ns for p in (tmp_path / "store").rglob("*.parquet")}
+
+    # Reentrega con solapamiento: solo se escriben los días posteriores al último almacenado
+    written = store.append(local_train_df[local_train_df["date"] >= "2017-02-10"])
+    assert written == (local_train_df["date"] >= "2017-02-15").sum()
+    assert all(p.stat().st_mtime_ns == mtime for p, mtime in files_before.items())
+    assert store.max_date() == local_train_df["date"].max()
+    assert len(store.read()) == len(local_train_df)
+
+def test_read_prunes_partitions(tmp_path, local_train_df):
+    store = PartitionedStore(root=tmp_path / "store", by_store=True)
+    store.append(local_train_df)
+    dataset = store.dataset()
+    expr = store.build_filter(dataset.schema, start_date="2017-02-03", end_date="2017-02-05", stores=[2])
+    fragments = list(dataset.get_fragments(filter=expr))
+    assert fragments and all("month=2" in f.path and "store_nbr=2" in f.path for f in fragments)
+
+    df = store.read(start_date="2017-02-03", end_date="2017-02-05", stores=[2])
+    assert set(df["store_nbr"]) == {2}
+    assert df["date"].min() == pd.Timestamp("2017-02-03")
+    assert len(df) == 3 * 2
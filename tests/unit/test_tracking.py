@@ -0,0 +1,64 @@
+import mlflow
+import numpy as np
+import pandas as pd
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+from sklearn.preprocessing import MinMaxScaler
+from src.utils.tracking import AsyncMlflowLogger, async_logging, get_tracker
+
+
+def test_async_logging_flushes_batches_and_models_at_run_end(tmp_path, monkeypatch):
+    X = pd.DataFrame({"a": np.arange(500.0), "b": np.arange(500.0) * 2})
+    scaler = MinMaxScaler().fit(X)
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    try:
+        with mlflow.start_run() as run, async_logging(max_queue=50) as tracker:
+            assert get_tracker() is tracker
+            # Más métricas y parámetros que los límites de un log_batch
+            for step in range(1500):
+                tracker.log_metric("loss", 1.0 / (step + 1), step=step)
+            tracker.log_params({f"p{i}": i for i in range(150)})
+            tracker.set_tag("stage", "test")
+            tracker.log_dict({"x": [1, 2]}, "info.json")
+            tracker.log_model(scaler, "scaler", sample=X, method="transform")
+        client = MlflowClient()
+        data = client.get_run(run.info.run_id).data
+        history = client.get_metric_history(run.info.run_id, "loss")
+        artifacts = {a.path for a in client.list_artifacts(run.info.run_id)}
+        model = {a.path for a in client.list_artifacts(run.info.run_id, "scaler")}
+        mlmodel = open(client.download_artifacts(run.info.run_id, "scaler/MLmodel", str(tmp_path))).read()
+    finally:
+        mlflow.set_tracking_uri(previous)
+    assert len(history) == 1500 and len(data.params) == 150
+    assert data.tags["stage"] == "test"
+    assert {"info.json", "scaler"} <= artifacts and "scaler/MLmodel" in model
+    assert "signature" in mlmodel
+    assert tracker.stats == {"operations": 1500 + 150 + 3, "errors": 0}
+
+
+def test_tracker_without_run_discards_operations():
+    tracker = get_tracker()
+    assert tracker.run_id is None
+    tracker.log_metric("loss", 1.0)
+    assert tracker.stats["operations"] == 0
+    assert AsyncMlflowLogger(run_id=None)._thread is None
+
+
+def test_rejected_param_does_not_drop_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    try:
+        with mlflow.start_run() as run:
+            tracker = AsyncMlflowLogger(background=False)
+            tracker.log_param("alpha", 1)
+            # Cambiar un parámetro ya registrado falla en MLflow; las métricas del mismo lote se envían igual
+            tracker._process([("param", (Param("alpha", "2"),))] +
+                             [("metric", (Metric("loss", 1.0 / (step + 1), 0, step),)) for step in range(10)])
+        history = MlflowClient().get_metric_history(run.info.run_id, "loss")
+    finally:
+        mlflow.set_tracking_uri(previous)
+    assert len(history) == 10
+    assert tracker.stats["errors"] == 1
@@ -1,5 +1,9 @@
+import pickle
+import numpy as np
 import pandas as pd
-from src.features import DatePartAdder, CategoricalEncoder, AdaptiveScaler, DataMerger
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.pipeline import Pipeline
+from src.features import DatePartAdder, CategoricalEncoder, AdaptiveScaler, DataMerger, CalendarFeatureAdder, WeekendFlagger, CyclicEncoder, LookupJoiner
 
 # Test para DatePartAdder
 def test_datepart_adder_creates_columns(sample_date_df):
@@ -8,6 +12,7 @@ def test_datepart_adder_creates_columns(sample_date_df):
         assert col in transformed.columns
     assert transformed["day"].tolist() == [1, 15]
     assert transformed["month"].tolist() == [1, 6]
+    assert transformed["date_ordinal"].tolist() == [d.toordinal() for d in pd.to_datetime(sample_date_df["date"])]
 
 # Test para CategoricalEncoder
 def test_categorical_encoder_encodes_correctly(sample_categorical_df):
@@ -34,4 +39,85 @@ def test_store_metadata_merger_adds_columns(sample_store_df):
 
     assert "city" in merged.columns
     assert "type" in merged.columns
-    assert merged.shape[0] == df.shape[0]
\ No newline at end of file
+    assert merged.shape[0] == df.shape[0]
+
+# Test para CalendarFeatureAdder: mismas columnas y valores que la cadena de tres pasos
+def test_calendar_features_match_step_chain(sample_train_df):
+    df = pd.concat([sample_train_df] * 3, ignore_index=True)
+    chain = Pipeline([("date_parts", DatePartAdder()), ("weekend_flag", WeekendFlagger()), ("cyclic", CyclicEncoder())])
+    expected = chain.fit_transform(df)
+    result = CalendarFeatureAdder().fit_transform(df)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+# Test para LookupJoiner
+def test_lookup_joiner_matches_merge_and_keeps_order(sample_store_df):
+    df = pd.DataFrame({"store_nbr": [2, 1, 2, 1]}, index=pd.Index([10, 11, 12, 13], name="id"))
+    expected = DataMerger(metadata_path=str(sample_store_df)).fit_transform(df)
+    joined = LookupJoiner(metadata_path=str(sample_store_df)).fit_transform(df)
+    assert joined.index.tolist() == [10, 11, 12, 13]
+    assert joined["city"].tolist() == expected["city"].tolist()
+    assert joined["cluster"].tolist() == expected["cluster"].tolist()
+
+def test_lookup_joiner_unknown_store_is_null(sample_store_df):
+    joined = LookupJoiner(metadata_path=str(sample_store_df)).fit_transform(pd.DataFrame({"store_nbr": [1, 7]}))
+    assert joined["city"].isna().tolist() == [False, True]
+
+def test_lookup_joiner_interpolates_oil_calendar(tmp_path):
+    oil = pd.DataFrame({"date": ["2023-01-06", "2023-01-09"], "dcoilwtico": [70.0, 73.0]})
+    oil.to_csv(tmp_path / "oil.csv", index=False)
+    df = pd.DataFrame({"date": pd.to_datetime(["2023-01-08", "2023-01-01", "2023-01-07", "2023-01-20"])})
+    joined = LookupJoiner(metadata_path=str(tmp_path / "oil.csv"), on="date").fit_transform(df)
+    # Fin de semana interpolado; fechas fuera de rango toman el extremo más cercano
+    assert joined["dcoilwtico"].tolist() == [72.0, 70.0, 71.0, 73.0]
+
+def test_adaptive_scaler_matches_minmax_and_partial_fit(sample_numeric_df):
+    expected = sample_numeric_df.copy()
+    for col in ["sales", "onpromotion"]:
+        expected[col] = MinMaxScaler().fit_transform(sample_numeric_df[[col]]).ravel()
+    scaled = AdaptiveScaler(excluded_columns=[]).fit_transform(sample_numeric_df)
+    pd.testing.assert_frame_equal(scaled, expected)
+
+    # Ajuste por lotes: mismo resultado que el ajuste completo
+    chunked = AdaptiveScaler(excluded_columns=[], dtype=np.float32)
+    for start in range(0, len(sample_numeric_df), 2):
+        chunked.partial_fit(sample_numeric_df.iloc[start:start + 2])
+    result = chunked.transform(sample_numeric_df)
+    assert result["sales"].dtype == np.float32
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+def test_adaptive_scaler_loads_legacy_pickle(sample_numeric_df):
+    # Formato anterior: un MinMaxScaler por columna en `scalers`
+    legacy = AdaptiveScaler.__new__(AdaptiveScaler)
+    legacy.__dict__.update({
+        "excluded_col": [],
+        "scalers": {col: MinMaxScaler().fit(sample_numeric_df[[col]]) for col in ["sales", "onpromotion"]},
+        "columns": sample_numeric_df,
+        "fit_flag_": True,
+    })
+    restored = pickle.loads(pickle.dumps(legacy))
+    expected = AdaptiveScaler(excluded_columns=[]).fit_transform(sample_numeric_df)
+    pd.testing.assert_frame_equal(restored.transform(sample_numeric_df), expected)
+    assert restored.get_scaler("sales").inverse_transform([[1.0]])[0, 0] == 300
+
+def test_categorical_encoder_lookup_and_dtypes(sample_categorical_df):
+    encoder = CategoricalEncoder(columns=["family"]).fit(sample_categorical_df)
+    unseen = pd.DataFrame({"family": ["C", "Z", "A"]})
+    encoded = encoder.transform(unseen)
+    assert encoded["family"].tolist() == [2, -1, 0]
+    assert encoded["family"].dtype == np.int8
+    # Entrada `category`: mismos códigos que con objetos
+    as_category = unseen.astype({"family": pd.CategoricalDtype(["Z", "C", "A"])})
+    assert encoder.transform(as_category)["family"].tolist() == [2, -1, 0]
+
+def test_categorical_encoder_partial_fit_unions_chunks(sample_categorical_df):
+    encoder = CategoricalEncoder(columns=["family"])
+    encoder.partial_fit(sample_categorical_df.iloc[:2]).partial_fit(sample_categorical_df.iloc[2:])
+    full = CategoricalEncoder(columns=["family"]).fit(sample_categorical_df)
+    assert encoder.categories_["family"].tolist() == full.categories_["family"].tolist() == ["A", "B", "C"]
+
+def test_categorical_encoder_loads_legacy_pickle(sample_categorical_df):
+    legacy = CategoricalEncoder.__new__(CategoricalEncoder)
+    legacy.__dict__.update({"columns": ["family"], "fit_flag_": True,
+                            "category_maps": {"family": pd.Series(["A", "B", "C"])}})
+    restored = pickle.loads(pickle.dumps(legacy))
+    assert restored.transform(sample_categorical_df)["family"].tolist() == [0, 1, 0, 2]
@@ -0,0 +1,71 @@
+import lightgbm as lgb
+import mlflow
+import numpy as np
+import pandas as pd
+from src.training.dataset_cache import LGBMDatasetCache
+from src.training.tuning import SuccessiveHalvingTuner, _init_worker, _run_trial, sample_space
+
+SPACE = {"num_leaves": [3, 15], "learning_rate": [0.05, 0.2], "min_child_samples": [5, 30], "n_estimators": [40, 90]}
+
+
+def test_sample_space_grid_and_random():
+    grid = sample_space(SPACE)
+    assert len(grid) == 16 and len({tuple(c.values()) for c in grid}) == 16
+    sample = sample_space(SPACE, n_trials=5, seed=0)
+    assert len({tuple(c.values()) for c in sample}) == 5
+    assert all(tuple(c.values()) in {tuple(g.values()) for g in grid} for c in sample)
+    assert sample == sample_space(SPACE, n_trials=5, seed=0)
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"x": rng.random(600), "store_nbr": rng.integers(0, 4, 600)})
+    y = np.sin(6 * X["x"]) + X["store_nbr"] * 0.1
+    return X, y
+
+
+def test_successive_halving_prunes_and_logs_nested_runs(tmp_path, monkeypatch):
+    X, y = _data()
+    tuner = SuccessiveHalvingTuner(space=SPACE, base_params={"objective": "regression_l1"},
+                                   threads_per_trial=1, max_workers=2, min_rounds=10, eta=3,
+                                   stopping_rounds=200, categorical=["store_nbr"])
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    try:
+        with mlflow.start_run() as parent:
+            report = tuner.run(X[:450], X[450:], y[:450], y[450:])
+        runs = mlflow.search_runs(filter_string=f"tags.mlflow.parentRunId = '{parent.info.run_id}'")
+    finally:
+        mlflow.set_tracking_uri(previous)
+    assert len(report) == 16
+    assert report["score"].is_monotonic_increasing
+    # 16 → 5 → 1: once trials descartados en el primer escalón y cuatro en el segundo
+    assert (report["pruned_at"] == 0).sum() == 11
+    assert (report["pruned_at"] == 1).sum() == 4
+    finished = report[report["pruned_at"].isna()]
+    assert len(finished) == 1 and (finished["rounds"] == finished["n_estimators"]).all()
+    assert len(runs) == 16
+
+
+def test_rungs_continue_boosting_instead_of_retraining(tmp_path):
+    X, y = _data()
+    params = {"objective": "regression_l1", "num_leaves": 7, "learning_rate": 0.1, "min_child_samples": 10,
+              "num_threads": 1}
+    tuner = SuccessiveHalvingTuner(space={}, base_params=params, categorical=["store_nbr"],
+                                   dataset_cache=LGBMDatasetCache(tmp_path))
+    paths = tuner._save_datasets(str(tmp_path), X[:450], X[450:], y[:450], y[450:])
+    _init_worker(*paths)
+    # Escalones de 10 → 30 → 90 rondas: cada uno entrena solo las rondas nuevas
+    curve = []
+    for done, rounds in ((0, 10), (10, 30), (30, 90)):
+        out = _run_trial(0, params, rounds, done, stopping_rounds=200, metric="l1")
+        assert len(out["curve"]) == rounds - done and not out["stopped"]
+        curve += out["curve"]
+
+    # Mismo resultado que entrenar las 90 rondas de una vez
+    train, valid = LGBMDatasetCache(tmp_path).load(*paths[:2])
+    history = {}
+    lgb.train({**params, "metric": "l1", "verbose": -1}, train, num_boost_round=90,
+              valid_sets=[valid], valid_names=["valid"], callbacks=[lgb.record_evaluation(history)])
+    np.testing.assert_allclose(curve, history["valid"]["l1"], rtol=1e-6)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from src.data.window_bundle import WindowBundle
+
+
+def _write(bundle, version=None):
+    specs = {"x_store": ((10,), np.int32), "xy_historic": ((10, 3, 2), np.float32)}
+    version, arrays = bundle.create(specs, metadata={"timesteps": 3}, version=version)
+    # Escritura por tramos, como una serie tras otra
+    for start in (0, 5):
+        arrays["x_store"][start:start + 5] = start
+        arrays["xy_historic"][start:start + 5] = np.arange(30, dtype=np.float32).reshape(5, 3, 2) + start
+    bundle.commit(arrays)
+    return version
+
+
+def test_window_bundle_roundtrip_is_memory_mapped(tmp_path):
+    bundle = WindowBundle(tmp_path / "windows")
+    assert not bundle.exists()
+    _write(bundle, version="v1")
+    assert bundle.latest() == "v1"
+    arrays, manifest = bundle.load()
+    assert manifest["timesteps"] == 3
+    assert manifest["arrays"]["xy_historic"]["shape"] == [10, 3, 2]
+    assert isinstance(arrays["xy_historic"], np.memmap)
+    assert not arrays["xy_historic"].flags.writeable
+    assert arrays["x_store"].tolist() == [0] * 5 + [5] * 5
+    assert arrays["xy_historic"][7, 1, 0] == 2 * 6 + 1 * 2 + 5
+
+
+def test_window_bundle_split_and_versions(tmp_path):
+    bundle = WindowBundle(tmp_path)
+    _write(bundle, version="v1")
+    _write(bundle, version="v2")
+    assert bundle.latest() == "v2" and bundle.exists("v1")
+    train_idx, test_idx = bundle.split(10)
+    assert sorted(np.concatenate([train_idx, test_idx]).tolist()) == list(range(10))
+    assert len(test_idx) == 2
+    with pytest.raises(FileNotFoundError):
+        WindowBundle(tmp_path / "missing").load()
@@ -0,0 +1,39 @@
+import logging
+import numpy as np
+import pytest
+from src.config import CONFIG
+from src.data.window_bundle import WindowBundle
+
+pytest.importorskip("tensorflow")
+from src.pipelines.window_dataset import BundleDatasetBuilder, ThroughputLogger  # noqa: E402
+
+
+def test_bundle_dataset_reads_batches_from_memmap(tmp_path):
+    bundle = WindowBundle(tmp_path)
+    specs = {"x_store": ((50,), np.int32), "x_family": ((50,), np.int32), "xy_historic": ((50, 4, 3), np.float32),
+             "x_current": ((50, 2), np.float32), "y_current": ((50,), np.float32)}
+    _, arrays = bundle.create(specs)
+    for name, array in arrays.items():
+        array[:] = np.arange(array.size).reshape(array.shape) % 1000
+    bundle.commit(arrays)
+    arrays, _ = bundle.load()
+
+    train_idx, _ = bundle.split(50)
+    batches = list(BundleDatasetBuilder(arrays).build(train_idx, batch_size=16, shuffle=True))
+    assert sum(len(y) for _, y in batches) == len(train_idx)
+    inputs, y = batches[0]
+    assert inputs["seq_input"].shape[1:] == (4, 3) and inputs["store_nbr_input"].dtype.name == "int32"
+    rows = y.numpy().astype(int)
+    np.testing.assert_array_equal(inputs["seq_input"], arrays["xy_historic"][rows])
+    np.testing.assert_array_equal(inputs["target_input"], arrays["x_current"][rows])
+    np.testing.assert_array_equal(inputs["family_input"], arrays["x_family"][rows])
+    seen = np.concatenate([y.numpy() for _, y in batches]).astype(int)
+    assert sorted(seen) == sorted(train_idx)
+
+
+def test_throughput_logger_reports_examples_per_second(caplog):
+    callback = ThroughputLogger(n_examples=1000)
+    with caplog.at_level(logging.INFO, logger=CONFIG.logger_name):
+        callback.on_epoch_begin(0)
+        callback.on_epoch_end(0)
+    assert "Época 1: 1000 ejemplos" in caplog.text